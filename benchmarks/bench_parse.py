@@ -0,0 +1,67 @@
+# compares grammar build time and per-query parse latency of the earley and
+# lalr parsers over the queries in duckcypher/test_cypher.py.
+#
+#   python -m benchmarks.bench_parse [--repeat 200]
+import argparse
+import ast
+import os
+import statistics
+import time
+
+from duckcypher.parser import _build_grammar
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "duckcypher",
+    "test_cypher.py",
+)
+
+
+def load_test_queries(path=TEST_FILE):
+    with open(path, "r") as f:
+        tree = ast.parse(f.read())
+    return [
+        node.value.value
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Assign)
+        and isinstance(node.targets[0], ast.Name)
+        and node.targets[0].id == "cypher_q"
+    ]
+
+
+def bench_build(parser):
+    start = time.perf_counter()
+    grammar = _build_grammar(parser)
+    return grammar, time.perf_counter() - start
+
+
+def bench_parse(grammar, queries, repeat):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            grammar.parse(query)
+        latencies.append((time.perf_counter() - start) / repeat)
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    queries = load_test_queries()
+    print(f"{len(queries)} queries, {args.repeat} parses each")
+    print(f"{'parser':<8}{'build ms':>12}{'median us':>12}{'p95 us':>12}{'max us':>12}")
+    for parser in ["earley", "lalr"]:
+        grammar, build = bench_build(parser)
+        latencies = sorted(bench_parse(grammar, queries, args.repeat))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"{parser:<8}{build * 1e3:>12.2f}{statistics.median(latencies) * 1e6:>12.1f}"
+            f"{p95 * 1e6:>12.1f}{latencies[-1] * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
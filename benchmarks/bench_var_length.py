@@ -0,0 +1,56 @@
+# times anchored variable-length traversals over a synthetic random graph,
+# 10M edges over 1M nodes by default (about 10 out-edges per node).
+#
+#   python -m benchmarks.bench_var_length [--edges 10000000] [--nodes 1000000] [--max-hop 4]
+import argparse
+import time
+
+from duckcypher.session import DuckCypherSession
+
+
+def build_graph(session, nodes, edges):
+    con = session.connection
+    con.execute(f"create table nodes as select range as id from range({nodes})")
+    # deterministic pseudo random endpoints, no sampling state involved.
+    con.execute(
+        f"""
+        create table links as
+        select range % {nodes} as src, hash(range) % {nodes} as dst
+        from range({edges})
+        """
+    )
+    session.add_table("nodes")
+    session.add_table("links")
+    session.add_model(
+        "Node", "nodes", {"columns": [{"name": "id", "type": "int", "primary": True}]}
+    )
+    session.add_relationship_model("LINK", "links", "src", "dst")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--edges", type=int, default=10_000_000)
+    arg_parser.add_argument("--nodes", type=int, default=1_000_000)
+    arg_parser.add_argument("--max-hop", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    with DuckCypherSession() as session:
+        start = time.perf_counter()
+        build_graph(session, args.nodes, args.edges)
+        print(
+            f"built {args.edges} edges over {args.nodes} nodes "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        print(f"{'hops':<8}{'reached':>12}{'seconds':>12}")
+        for max_hop in range(1, args.max_hop + 1):
+            query = (
+                f"match (a:Node {{id: 42}})-[:LINK*1..{max_hop}]->(b:Node) "
+                "return count(b)"
+            )
+            start = time.perf_counter()
+            reached = session.run_cypher(query).fetchall()[0][0]
+            print(f"1..{max_hop:<5}{reached:>12}{time.perf_counter() - start:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
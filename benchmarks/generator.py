@@ -0,0 +1,167 @@
+# deterministic synthetic data shaped like the fixtures: customers (with their
+# company) and customer infos as in testing/test_cases, persons / states /
+# lives_in as in data/. every value is a pure function of the row id and the
+# seed, so the same scale and seed give the same tables on any machine.
+#
+#   python -m benchmarks.generator --scale 1000000 --database bench.duckdb
+import argparse
+import time
+
+from duckcypher.session import DuckCypherSession
+
+FIRST_NAMES = [
+    "michael", "Lisa", "james", "mary", "robert", "patricia", "john", "jennifer",
+    "david", "linda", "william", "elizabeth", "richard", "barbara", "joseph", "susan",
+]  # fmt: skip
+LAST_NAMES = [
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis",
+    "rodriguez", "martinez", "hernandez", "lopez", "gonzalez", "wilson", "anderson",
+]  # fmt: skip
+COMPANIES = [
+    "google", "microsoft", "apple", "amazon", "meta", "netflix", "oracle", "ibm",
+    "intel", "adobe", "salesforce", "nvidia",
+]  # fmt: skip
+STATES = [
+    ("Alabama", "AL"), ("Alaska", "AK"), ("Arizona", "AZ"), ("Arkansas", "AR"),
+    ("California", "CA"), ("Colorado", "CO"), ("Connecticut", "CT"), ("Delaware", "DE"),
+    ("Florida", "FL"), ("Georgia", "GA"), ("Hawaii", "HI"), ("Idaho", "ID"),
+    ("Illinois", "IL"), ("Indiana", "IN"), ("Iowa", "IA"), ("Kansas", "KS"),
+    ("Kentucky", "KY"), ("Louisiana", "LA"), ("Maine", "ME"), ("Maryland", "MD"),
+    ("Massachusetts", "MA"), ("Michigan", "MI"), ("Minnesota", "MN"), ("Mississippi", "MS"),
+    ("Missouri", "MO"), ("Montana", "MT"), ("Nebraska", "NE"), ("Nevada", "NV"),
+    ("New Hampshire", "NH"), ("New Jersey", "NJ"), ("New Mexico", "NM"), ("New York", "NY"),
+    ("North Carolina", "NC"), ("North Dakota", "ND"), ("Ohio", "OH"), ("Oklahoma", "OK"),
+    ("Oregon", "OR"), ("Pennsylvania", "PA"), ("Rhode Island", "RI"), ("South Carolina", "SC"),
+    ("South Dakota", "SD"), ("Tennessee", "TN"), ("Texas", "TX"), ("Utah", "UT"),
+    ("Vermont", "VT"), ("Virginia", "VA"), ("Washington", "WA"), ("West Virginia", "WV"),
+    ("Wisconsin", "WI"), ("Wyoming", "WY"),
+]  # fmt: skip
+
+SCALES = [10**3, 10**4, 10**5, 10**6, 10**7, 10**8]
+
+MODELS = [
+    (
+        "Customer",
+        "customers",
+        [
+            {"name": "id", "type": "int", "primary": True},
+            {"name": "first_name", "type": "string"},
+            {"name": "last_name", "type": "string"},
+        ],
+    ),
+    ("Company", "customers", [{"name": "company", "type": "string", "primary": True}]),
+    (
+        "CustomerInfo",
+        "customer_infos",
+        [
+            {"name": "id", "type": "int", "primary": True},
+            {"name": "age", "type": "int"},
+            {"name": "state", "type": "string"},
+        ],
+    ),
+    (
+        "Person",
+        "persons",
+        [
+            {"name": "id", "type": "int", "primary": True},
+            {"name": "name", "type": "string"},
+            {"name": "age", "type": "int"},
+        ],
+    ),
+    (
+        "State",
+        "states",
+        [
+            {"name": "name", "type": "string", "primary": True},
+            {"name": "short_name", "type": "string"},
+        ],
+    ),
+]
+
+
+def _mix(column, seed, salt):
+    # a 32 bit integer hash of the row id (multiply, then two xorshift rounds so
+    # columns with different salts are independent), stable across duckdb
+    # versions unlike hash().
+    x = f"(({column} * 2654435761 + {seed * 7919 + salt * 40503}) % 4294967296)"
+    x = f"((xor({x}, {x} >> 16) * 73244475) % 4294967296)"
+    return f"xor({x}, {x} >> 16)"
+
+
+def _pick(values, column, seed, salt):
+    literal = ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+    return f"[{literal}][1 + {_mix(column, seed, salt)} % {len(values)}]"
+
+
+def generate(con, scale, seed=0):
+    # creates the tables on the connection, `scale` rows for customers, infos,
+    # persons and lives_in, the 50 states are fixed.
+    state_names = [name for name, _short in STATES]
+    con.execute(
+        f"""
+        create or replace table customers as
+        select range + 1 as id,
+            {_pick(FIRST_NAMES, "range", seed, 1)} as first_name,
+            {_pick(LAST_NAMES, "range", seed, 2)} as last_name,
+            {_pick(COMPANIES, "range", seed, 3)} as company
+        from range({scale})
+        """
+    )
+    con.execute(
+        f"""
+        create or replace table customer_infos as
+        select range + 1 as id,
+            18 + {_mix("range", seed, 4)} % 62 as age,
+            {_pick([short for _name, short in STATES], "range", seed, 5)} as state
+        from range({scale})
+        """
+    )
+    con.execute(
+        f"""
+        create or replace table persons as
+        select range + 1 as id,
+            {_pick(FIRST_NAMES, "range", seed, 6)} || ' '
+                || {_pick(LAST_NAMES, "range", seed, 7)} as name,
+            18 + {_mix("range", seed, 8)} % 62 as age,
+            {_pick(state_names, "range", seed, 9)} as state
+        from range({scale})
+        """
+    )
+    con.execute(
+        "create or replace table states as select * from (values "
+        + ", ".join(
+            "('" + name + "', '" + short + "')" for name, short in STATES
+        )
+        + ") states(name, short_name)"
+    )
+    con.execute("create or replace table lives_in as select id, state from persons")
+
+
+def build_session(scale, seed=0, database=":memory:", **session_args):
+    # a session over freshly generated tables with every model and relationship.
+    session = DuckCypherSession(database, **session_args)
+    generate(session.connection, scale, seed)
+    for table in ["customers", "customer_infos", "persons", "states", "lives_in"]:
+        session.add_table(table)
+    for model_type, table, columns in MODELS:
+        session.add_model(model_type, table, {"columns": columns})
+    session.add_relationship_model(
+        "LIVES_IN", "lives_in", "id", "state", from_model="Person", to_model="State"
+    )
+    return session
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--scale", type=int, default=SCALES[0])
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--database", default=":memory:")
+    args = arg_parser.parse_args()
+    start = time.perf_counter()
+    with DuckCypherSession(args.database) as session:
+        generate(session.connection, args.scale, args.seed)
+    print(f"generated scale {args.scale} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# runs the workloads over generated data and reports parse, translate and execute
+# latency plus memory, as json so runs of different commits can be compared.
+#
+#   python -m benchmarks.runner --scale 100000 --repeat 5 --output new.json
+#   python -m benchmarks.runner --scale 100000 --compare old.json
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import duckdb
+
+from benchmarks.generator import build_session
+from benchmarks.workloads import WORKLOADS
+from duckcypher.constants import NAME, PARAMS, PHASE, QUERY, SECONDS, TYPE
+from duckcypher.parser import compile_cypher
+from duckcypher.tracing import EXECUTE, PARSE, TRANSFORM, TRANSLATE, RecordingTracer
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on linux and in bytes on macos.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summary(seconds):
+    return {
+        "median_ms": statistics.median(seconds) * 1000,
+        "min_ms": min(seconds) * 1000,
+        "max_ms": max(seconds) * 1000,
+    }
+
+
+def run_workload(session, workload, repeat):
+    # translation is timed without the plan cache, execution with it, as queries
+    # are normally repeated. the process peak rss only grows, so a workload reports
+    # how far it raised it: 0 when it stayed below the peak of earlier workloads.
+    # run it alone with --workload to see its own peak.
+    peak = peak_rss_mb()
+    phases = {PARSE: [], TRANSFORM: [], TRANSLATE: []}
+    for _ in range(repeat):
+        tracer = RecordingTracer()
+        compile_cypher(session.schema, workload[QUERY], cache=None, tracer=tracer)
+        for span in tracer.spans:
+            phases[span[PHASE]].append(span[SECONDS])
+    executions, rows = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = session.run_cypher(workload[QUERY], workload[PARAMS]).fetchall()
+        executions.append(time.perf_counter() - start)
+    return {
+        "name": workload[NAME],
+        "category": workload[TYPE],
+        "rows": len(rows),
+        PARSE: _summary(phases[PARSE]),
+        TRANSFORM: _summary(phases[TRANSFORM]),
+        TRANSLATE: _summary(phases[TRANSLATE]),
+        EXECUTE: _summary(executions),
+        "peak_rss_growth_mb": peak_rss_mb() - peak,
+    }
+
+
+def run(scale, repeat=5, seed=0, database=":memory:", names=None):
+    start = time.perf_counter()
+    session = build_session(scale, seed, database)
+    build_seconds = time.perf_counter() - start
+    try:
+        results = [
+            run_workload(session, workload, repeat)
+            for workload in WORKLOADS
+            if not names or workload[NAME] in names
+        ]
+    finally:
+        session.close()
+    return {
+        "commit": _commit(),
+        "scale": scale,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "build_seconds": build_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "workloads": results,
+    }
+
+
+def compare(baseline, report):
+    # prints the execute and translate median of each workload relative to the
+    # baseline, above 1.0 is slower.
+    before = {result["name"]: result for result in baseline["workloads"]}
+    print(f"{'workload':<28}{'execute':>10}{'translate':>11}")
+    for result in report["workloads"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        ratios = [
+            result[phase]["median_ms"] / max(old[phase]["median_ms"], 1e-9)
+            for phase in (EXECUTE, TRANSLATE)
+        ]
+        print(f"{result['name']:<28}{ratios[0]:>10.2f}{ratios[1]:>11.2f}")
+
+
+def print_report(report):
+    print(
+        f"scale {report['scale']}, built in {report['build_seconds']:.2f}s, "
+        f"peak rss {report['peak_rss_mb']:.0f}MB"
+    )
+    print(
+        f"{'workload':<28}{'rows':>8}{'parse ms':>10}{'translate ms':>14}"
+        f"{'execute ms':>12}{'rss +MB':>9}"
+    )
+    for result in report["workloads"]:
+        print(
+            f"{result['name']:<28}{result['rows']:>8}"
+            f"{result[PARSE]['median_ms']:>10.3f}"
+            f"{result[TRANSLATE]['median_ms']:>14.3f}"
+            f"{result[EXECUTE]['median_ms']:>12.3f}"
+            f"{result['peak_rss_growth_mb']:>9.0f}"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--scale", type=int, default=1000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--database", default=":memory:")
+    arg_parser.add_argument("--workload", action="append", help="run only these")
+    arg_parser.add_argument("--output", help="write the report to this json file")
+    arg_parser.add_argument("--compare", help="baseline json report to compare with")
+    args = arg_parser.parse_args()
+
+    report = run(args.scale, args.repeat, args.seed, args.database, args.workload)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
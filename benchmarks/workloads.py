@@ -0,0 +1,80 @@
+# representative queries over the generated data, see benchmarks/generator.py.
+from duckcypher.constants import NAME, PARAMS, QUERY, TYPE
+
+POINT_LOOKUP = "point_lookup"
+MULTI_HOP = "multi_hop"
+AGGREGATION = "aggregation"
+WITH_CHAIN = "with_chain"
+
+WORKLOADS = [
+    {
+        NAME: "customer_by_id",
+        TYPE: POINT_LOOKUP,
+        QUERY: "match (c:Customer {id: $id}) return c.first_name, c.last_name",
+        PARAMS: {"id": 42},
+    },
+    {
+        NAME: "person_by_id",
+        TYPE: POINT_LOOKUP,
+        QUERY: "match (p:Person) where p.id = $id return p.name, p.age",
+        PARAMS: {"id": 7},
+    },
+    {
+        NAME: "customer_info_join",
+        TYPE: MULTI_HOP,
+        QUERY: """match (c:Customer) -- (i:CustomerInfo)
+        where i.age = 32 and i.state = "TX"
+        return c.first_name""",
+        PARAMS: None,
+    },
+    {
+        NAME: "google_customer_infos",
+        TYPE: MULTI_HOP,
+        QUERY: """match (i:CustomerInfo) -- (c:Customer) -- (g:Company {company: "google"})
+        return c.first_name, i.age
+        order by i.age desc
+        limit 10""",
+        PARAMS: None,
+    },
+    {
+        NAME: "persons_lives_in_state",
+        TYPE: MULTI_HOP,
+        QUERY: """match (p:Person)-[:LIVES_IN]->(s:State {short_name: $state})
+        return p.name""",
+        PARAMS: {"state": "WY"},
+    },
+    {
+        NAME: "count_company_customers",
+        TYPE: AGGREGATION,
+        QUERY: """match (g:Company {company: "google"}) -- (c:Customer)
+        return count(c)""",
+        PARAMS: None,
+    },
+    {
+        NAME: "max_customer_age",
+        TYPE: AGGREGATION,
+        QUERY: """match (c:Customer) -- (i:CustomerInfo)
+        return max(i.age)""",
+        PARAMS: None,
+    },
+    {
+        NAME: "older_than_customer",
+        TYPE: WITH_CHAIN,
+        QUERY: """match (c:Customer {id: 1}) -- (i:CustomerInfo)
+        with i.age as first_age
+        match (o:CustomerInfo) where o.age > first_age and o.state = "FL"
+        return count(o)""",
+        PARAMS: None,
+    },
+    {
+        NAME: "older_than_person_chain",
+        TYPE: WITH_CHAIN,
+        QUERY: """match (p:Person {id: 1})
+        with p.age as first_age
+        match (q:Person {id: 2}) where q.age <> first_age
+        with q
+        match (r:Person) where r.age > q.age
+        return count(r)""",
+        PARAMS: None,
+    },
+]
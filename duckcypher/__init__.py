@@ -1,13 +1,19 @@
 __version__ = "0.2.0"
 
 
-from duckcypher.constants import MODELS, TABLES
-from duckcypher.parser import _DuckCypherGrammar, _DuckCypherTransformer
+from duckcypher.constants import MODELS, PARQUET, TABLE, TABLES, VIEW
+from duckcypher.parser import _DuckCypherGrammar, _DuckCypherTransformer, plan_cache
+import duckcypher.parser as parser
 import duckcypher.schema as schema
 from .schema import show_tables
+from .session import DuckCypherSession
+from .intermediates import memory_usage
+from .tracing import NullTracer, RecordingTracer, Tracer, set_tracer
 import duckdb
 
 local_schema = {TABLES: [], MODELS: []}
+# objects registered on the default connection, replayed on the cursors of streams.
+_registered = {}
 
 
 def show_models(*model_types):
@@ -16,21 +22,60 @@ def show_models(*model_types):
 
 def add_model(model_type, table, mappings):
     schema.add_model(local_schema, model_type, table, mappings)
+    plan_cache.invalidate()
 
 
-def add_table_from_csv(table_name, csv_path):
-    schema.add_csv_table(local_schema, table_name, csv_path)
+def add_relationship_model(
+    rel_type, table, from_key, to_key, from_model=None, to_model=None
+):
+    schema.add_relationship_model(
+        local_schema, rel_type, table, from_key, to_key, from_model, to_model
+    )
+    plan_cache.invalidate()
+
+
+def add_table_from_csv(table_name, csv_path, ingest=VIEW, cache_dir=None):
+    schema.add_csv_table(
+        local_schema, table_name, csv_path, ingest=ingest, cache_dir=cache_dir
+    )
+    plan_cache.invalidate()
 
 
 def add_table_from_variable(table_name, table):
-    schema.add_table_from_variable(local_schema, table_name, table)
+    _registered[table_name] = schema.add_table_from_variable(
+        local_schema, table_name, table
+    )
+    plan_cache.invalidate()
 
 
 def head_table(table_name, n=10):
     return duckdb.sql(f"select * from {table_name} limit {n};")
 
 
-def run_cypher(cypher_query):
-    t = _DuckCypherTransformer(local_schema)
-    t.transform(_DuckCypherGrammar.parse(cypher_query))
-    return t.run()
+def run_cypher(cypher_query, params=None, materialize=False):
+    return parser.run_cypher(local_schema, cypher_query, params, materialize=materialize)
+
+
+def run_cypher_stream(cypher_query, batch_size=1_000_000, params=None, materialize=False):
+    # streams on a cursor of the default connection, so other queries neither end
+    # the stream nor get interrupted when it is closed early.
+    default = duckdb.default_connection
+    cursor = (default() if callable(default) else default).cursor()
+    try:
+        for name, table in _registered.items():
+            if table is not None:
+                cursor.register(name, table)
+        yield from parser.run_cypher_stream(
+            local_schema,
+            cypher_query,
+            batch_size,
+            params,
+            materialize=materialize,
+            con=cursor,
+        )
+    finally:
+        cursor.close()
+
+
+def plan_cache_stats():
+    return plan_cache.stats()
@@ -0,0 +1,323 @@
+import os
+import uuid
+
+import numpy as np
+import pyarrow as pa
+
+from duckcypher.constants import (
+    ADJACENCY_INDEXES,
+    DIRECTION,
+    FROM,
+    INCOMING,
+    MAX_HOP,
+    MIN_HOP,
+    NAME,
+    OUTGOING,
+    PATH,
+    SOURCES,
+    TABLE,
+    TARGETS,
+    TO,
+)
+from duckcypher.schema import relationship as get_relationship, set_adjacency_index
+from duckcypher.shortest_paths import anchors
+from duckcypher.traversal import DST, SRC, quote
+
+# adjacency indexes: the edges of a relationship as compressed sparse rows over
+# integer node ids, one copy per direction. variable length edges and
+# shortestPath searches over an indexed relationship walk the arrays instead of
+# joining the relationship table once per hop, and hand the (src, dst) pairs
+# they reach back to duckdb, see to_sql._searches.
+
+_ARRAYS = ("ids", "out_offsets", "out_neighbors", "in_offsets", "in_neighbors")
+
+
+def _positions_type(size):
+    # neighbors are stored as positions in `ids`, 4 bytes each while they fit.
+    return np.int32 if size < 2**31 else np.int64
+
+
+def unique(values):
+    # the sorted distinct values, by sorting: np.unique is several times slower
+    # on large integer arrays.
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]] if len(values) else values
+
+
+def locate(ids, values):
+    # the positions of values in the sorted node ids, which must hold them all.
+    # ids dense enough are looked up in a table, a binary search is much slower.
+    if len(ids) and int(ids[-1]) - int(ids[0]) < 4 * len(ids) + 1024:
+        lookup = np.empty(int(ids[-1]) - int(ids[0]) + 1, np.int64)
+        lookup[ids - ids[0]] = np.arange(len(ids))
+        return lookup[values - ids[0]]
+    return np.searchsorted(ids, values)
+
+
+def _csr(size, src, dst):
+    # offsets and neighbors of the edges src -> dst, both given as positions. the
+    # neighbors of a node are in no particular order.
+    order = np.argsort(src)
+    offsets = np.zeros(size + 1, np.int64)
+    np.cumsum(np.bincount(src, minlength=size), out=offsets[1:])
+    return offsets, dst[order].astype(_positions_type(size))
+
+
+def _insert(offsets, neighbors, src, dst):
+    # adds the edges src -> dst to the rows, after the neighbors already there.
+    order = np.argsort(src)
+    src, dst = src[order], dst[order]
+    neighbors = np.insert(neighbors, offsets[src + 1], dst.astype(neighbors.dtype))
+    added = np.zeros(len(offsets), np.int64)
+    np.cumsum(np.bincount(src, minlength=len(offsets) - 1), out=added[1:])
+    return offsets + added, neighbors
+
+
+def _gather(offsets, neighbors, positions):
+    # every neighbor of the nodes at `positions`, with the index of the node in
+    # `positions` it was reached from.
+    starts = offsets[positions]
+    counts = offsets[positions + 1] - starts
+    owners = np.repeat(np.arange(len(positions)), counts)
+    firsts = np.cumsum(counts) - counts
+    picks = np.arange(counts.sum()) - np.repeat(firsts - starts, counts)
+    return owners, neighbors[picks].astype(np.int64)
+
+
+def integer_ids(values):
+    values = np.asarray(values)
+    if values.dtype.kind not in "iu":
+        raise ValueError(
+            f"adjacency indexes need integer node ids, not {values.dtype}"
+        )
+    return values.astype(np.int64)
+
+
+class AdjacencyIndex:
+    def __init__(self, ids, out_offsets, out_neighbors, in_offsets, in_neighbors):
+        # ids holds the sorted node ids, a node is its position in it.
+        self.ids = ids
+        self.out_offsets, self.out_neighbors = out_offsets, out_neighbors
+        self.in_offsets, self.in_neighbors = in_offsets, in_neighbors
+
+    @classmethod
+    def from_edges(cls, src, dst):
+        src, dst = integer_ids(src), integer_ids(dst)
+        ids = unique(np.concatenate([src, dst]))
+        src, dst = locate(ids, src), locate(ids, dst)
+        return cls(ids, *_csr(len(ids), src, dst), *_csr(len(ids), dst, src))
+
+    @classmethod
+    def build(cls, con, relationship):
+        return cls.from_edges(*_edges(con, relationship))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # the arrays stay on disk and are paged in as searches touch them.
+        mode = "r" if mmap else None
+        return cls(
+            *(np.load(os.path.join(path, f"{a}.npy"), mmap_mode=mode) for a in _ARRAYS)
+        )
+
+    def save(self, path):
+        # each array is written aside and renamed over the old one, indexes
+        # mapping the old files keep reading them.
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            pending = os.path.join(path, f".{name}.{uuid.uuid4().hex}.npy")
+            np.save(pending, getattr(self, name))
+            os.replace(pending, os.path.join(path, f"{name}.npy"))
+
+    @property
+    def num_nodes(self):
+        return len(self.ids)
+
+    @property
+    def num_edges(self):
+        return len(self.out_neighbors)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    def with_edges(self, src, dst):
+        # a new index with the edges added, in place of rebuilding: only the rows
+        # of the nodes they leave grow, new node ids shift the positions of the
+        # old ones. the index itself is never changed, searches reading it
+        # meanwhile see all of its arrays or none of the new ones.
+        src, dst = integer_ids(src), integer_ids(dst)
+        ids = unique(np.concatenate([self.ids, src, dst]))
+        out_offsets, out_neighbors = self.out_offsets, self.out_neighbors
+        in_offsets, in_neighbors = self.in_offsets, self.in_neighbors
+        if len(ids) != len(self.ids):
+            moved = locate(ids, self.ids)
+            out_offsets, out_neighbors = _moved(ids, moved, out_offsets, out_neighbors)
+            in_offsets, in_neighbors = _moved(ids, moved, in_offsets, in_neighbors)
+        src, dst = locate(ids, src), locate(ids, dst)
+        return AdjacencyIndex(
+            ids,
+            *_insert(out_offsets, out_neighbors, src, dst),
+            *_insert(in_offsets, in_neighbors, dst, src),
+        )
+
+    def _positions(self, values):
+        # positions of the values that are nodes of the index, and which they are.
+        values = integer_ids(values)
+        positions = np.searchsorted(self.ids, values)
+        known = positions < len(self.ids)
+        known[known] = self.ids[positions[known]] == values[known]
+        return positions[known], known
+
+    def _step(self, positions, direction):
+        rows = []
+        if direction != INCOMING:
+            rows.append(_gather(self.out_offsets, self.out_neighbors, positions))
+        if direction != OUTGOING:
+            rows.append(_gather(self.in_offsets, self.in_neighbors, positions))
+        if len(rows) == 1:
+            return rows[0]
+        return tuple(np.concatenate(parts) for parts in zip(*rows))
+
+    def expand(self, frontier, direction):
+        # the edges leaving the frontier nodes in the traversal direction, as
+        # (src, dst) id pairs.
+        positions, _known = self._positions(frontier)
+        owners, neighbors = self._step(positions, direction)
+        return self.ids[positions[owners]], self.ids[neighbors]
+
+    def reach(self, sources, direction, min_hop, max_hop):
+        # pairs (src, dst) connected by a walk of min_hop..max_hop edges from the
+        # sources, like traversal.variable_length_sql: every level keeps its
+        # distinct (src, node) pairs and the walk stops at max_hop.
+        sources = unique(integer_ids(sources))
+        roots, known = self._positions(sources)
+        size = max(len(self.ids), 1)
+        pairs = [roots * size + roots] if min_hop == 0 else []
+        nodes = roots
+        for depth in range(1, max_hop + 1):
+            if not len(nodes):
+                break
+            owners, nodes = self._step(nodes, direction)
+            level = unique(roots[owners] * size + nodes)
+            roots, nodes = level // size, level % size
+            if depth >= min_hop:
+                pairs.append(level)
+        pairs = unique(np.concatenate(pairs)) if pairs else np.empty(0, np.int64)
+        src, dst = self.ids[pairs // size], self.ids[pairs % size]
+        if min_hop == 0:
+            # sources without edges still reach themselves.
+            src = np.concatenate([src, sources[~known]])
+            dst = np.concatenate([dst, sources[~known]])
+        return src, dst
+
+
+def _moved(ids, moved, offsets, neighbors):
+    # the rows of an index over more node ids, old node i now sits at moved[i].
+    degrees = np.zeros(len(ids), np.int64)
+    degrees[moved] = np.diff(offsets)
+    grown = np.zeros(len(ids) + 1, np.int64)
+    np.cumsum(degrees, out=grown[1:])
+    return grown, moved[neighbors].astype(_positions_type(len(ids)))
+
+
+def _edges(con, relationship, table=None):
+    # the (from, to) ids of every edge of the relationship, read from `table`
+    # when given (e.g. rows just appended).
+    from_key, to_key = quote(relationship[FROM]), quote(relationship[TO])
+    columns = con.execute(
+        f"select {from_key} as {SRC}, {to_key} as {DST} "
+        f"from {quote(table or relationship[TABLE])} "
+        f"where {from_key} is not null and {to_key} is not null"
+    ).fetchnumpy()
+    return columns[SRC], columns[DST]
+
+
+def add_adjacency_index(con, schema, rel_type, path=None, indexes=None):
+    # builds the index of a relationship, stored under the directory `path` when
+    # given, and records it in the schema so queries walk it.
+    relationship = get_relationship(schema, rel_type)
+    entry = {NAME: relationship[NAME], PATH: path and os.path.abspath(path)}
+    index = AdjacencyIndex.build(con, relationship)
+    if path:
+        index.save(entry[PATH])
+    if indexes is not None:
+        indexes[entry[NAME]] = index
+    set_adjacency_index(schema, entry)
+    return index
+
+
+def _open(con, entry, relationship, appended=None):
+    # the stored index when it holds every edge of the table but those in the
+    # `appended` relation, which are added to it. a new index otherwise.
+    path = entry.get(PATH)
+    if path and os.path.exists(os.path.join(path, "ids.npy")):
+        index = AdjacencyIndex.load(path)
+        src, dst = (
+            _edges(con, relationship, appended)
+            if appended is not None
+            else (np.empty(0, np.int64), np.empty(0, np.int64))
+        )
+        edges = con.execute(
+            f"select count(*) from {quote(relationship[TABLE])} "
+            f"where {quote(relationship[FROM])} is not null "
+            f"and {quote(relationship[TO])} is not null"
+        ).fetchone()[0]
+        if edges == index.num_edges + len(src):
+            if len(src):
+                index = index.with_edges(src, dst)
+                index.save(path)
+            return index
+    index = AdjacencyIndex.build(con, relationship)
+    if path:
+        index.save(path)
+    return index
+
+
+def get_index(con, entry, relationship, indexes=None):
+    # the index of the schema entry, kept in `indexes` (relationship name to
+    # index) once opened.
+    indexes = {} if indexes is None else indexes
+    index = indexes.get(entry[NAME])
+    if index is None:
+        index = indexes[entry[NAME]] = _open(con, entry, relationship)
+    return index
+
+
+def refresh(con, schema, indexes, table, appended=None):
+    # keeps the indexes over `table` in step with it. `appended` names a relation
+    # holding the rows just appended, only they are added. any other change
+    # rebuilds the index. each new index replaces the old one in `indexes` with
+    # a single assignment, concurrent refreshes must be serialized by the caller.
+    for entry in schema.get(ADJACENCY_INDEXES, []):
+        relationship = get_relationship(schema, entry[NAME])
+        if relationship[TABLE] != table:
+            continue
+        index = indexes.get(entry[NAME])
+        if appended is None:
+            index = AdjacencyIndex.build(con, relationship)
+        elif index is None:
+            # not opened yet: the stored index catches up, or is rebuilt.
+            indexes[entry[NAME]] = _open(con, entry, relationship, appended)
+            continue
+        else:
+            index = index.with_edges(*_edges(con, relationship, appended))
+        if entry.get(PATH):
+            index.save(entry[PATH])
+        indexes[entry[NAME]] = index
+
+
+def reach(con, index, search, params):
+    # the (src, dst) pairs of a variable length edge over an indexed relationship.
+    # walks start from the source anchors, or backwards from the target anchors
+    # when only those are filtered, or from every node.
+    direction, min_hop, max_hop = search[DIRECTION], search[MIN_HOP], search[MAX_HOP]
+    if search[SOURCES]:
+        sources = anchors(con, search, params, SOURCES)
+        src, dst = index.reach(sources, direction, min_hop, max_hop)
+    elif search[TARGETS]:
+        backward = {OUTGOING: INCOMING, INCOMING: OUTGOING}.get(direction, direction)
+        targets = anchors(con, search, params, TARGETS)
+        dst, src = index.reach(targets, backward, min_hop, max_hop)
+    else:
+        src, dst = index.reach(index.ids, direction, min_hop, max_hop)
+    return pa.table({SRC: pa.array(src), DST: pa.array(dst)})
@@ -0,0 +1,112 @@
+import numpy as np
+import pyarrow as pa
+
+from duckcypher.adjacency import AdjacencyIndex, integer_ids, locate, unique
+from duckcypher.constants import (
+    ARGS,
+    COMPONENT,
+    DEGREE,
+    NODE,
+    NODE_TABLES,
+    PARAM,
+    PROCEDURE,
+    RELATIONSHIP,
+    SCORE,
+)
+from duckcypher.traversal import quote
+
+# graph algorithms called from cypher as `CALL algo.<name>("REL", ...) YIELD r`.
+# each runs vectorized over the edges of one relationship, read from its
+# adjacency index when it has one, and returns one row per node: the node id
+# and the value computed for it. the rows are registered for the stage's sql to
+# join, see to_sql._procedure_search.
+
+
+def _graph(con, search, index):
+    # the node ids, and every edge as the positions of its ends in them. nodes
+    # of the relationship's models without any edge are nodes too.
+    if index is None:
+        index = AdjacencyIndex.build(con, search[RELATIONSHIP])
+    ids = [index.ids]
+    for table, key in search[NODE_TABLES]:
+        column = con.execute(
+            f"select {quote(key)} as _dc_id from {quote(table)} "
+            f"where {quote(key)} is not null"
+        ).fetchnumpy()["_dc_id"]
+        ids.append(integer_ids(column))
+    nodes = unique(np.concatenate(ids))
+    moved = locate(nodes, index.ids)
+    src = moved[np.repeat(np.arange(index.num_nodes), np.diff(index.out_offsets))]
+    return nodes, src, moved[index.out_neighbors]
+
+
+def _pagerank(nodes, src, dst, damping=0.85, iterations=100, tolerance=1e-6):
+    # power iteration. nodes without outgoing edges spread their rank over every
+    # node, it stops once the ranks move less than tolerance per node.
+    n = len(nodes)
+    if not n:
+        return np.empty(0)
+    out_degree = np.bincount(src, minlength=n)
+    dangling = out_degree == 0
+    share = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)[src]
+    rank = np.full(n, 1.0 / n)
+    for _ in range(int(iterations)):
+        flow = np.bincount(dst, weights=rank[src] * share, minlength=n)
+        previous = rank
+        rank = (1 - damping) / n + damping * (flow + rank[dangling].sum() / n)
+        if np.abs(rank - previous).sum() < n * tolerance:
+            break
+    return rank
+
+
+def _wcc(nodes, src, dst):
+    # weakly connected components by label propagation: every edge pulls both
+    # of its ends to the smaller label, then labels jump to their label's label.
+    # a component is named after its smallest node id.
+    labels = np.arange(len(nodes))
+    while True:
+        low = np.minimum(labels[src], labels[dst])
+        pulled = labels.copy()
+        np.minimum.at(pulled, src, low)
+        np.minimum.at(pulled, dst, low)
+        pulled = pulled[pulled]
+        if np.array_equal(pulled, labels):
+            return nodes[labels]
+        labels = pulled
+
+
+def _degree(nodes, src, dst, direction="both"):
+    if direction not in ("out", "in", "both"):
+        raise ValueError(f"direction must be out, in or both, not {direction}")
+    degree = np.zeros(len(nodes), np.int64)
+    if direction != "in":
+        degree += np.bincount(src, minlength=len(nodes))
+    if direction != "out":
+        degree += np.bincount(dst, minlength=len(nodes))
+    return degree
+
+
+# name: (function, the column its values are yielded as, its optional arguments).
+PROCEDURES = {
+    "algo.pagerank": (_pagerank, SCORE, ("damping", "iterations", "tolerance")),
+    "algo.wcc": (_wcc, COMPONENT, ()),
+    "algo.degree": (_degree, DEGREE, ("direction",)),
+}
+
+
+def columns(procedure):
+    return NODE, PROCEDURES[procedure][1]
+
+
+def run(con, search, params, index=None):
+    # runs the procedure of a CALL, returns its rows as an arrow table.
+    function, column, _options = PROCEDURES[search[PROCEDURE]]
+    args = []
+    for arg in search[ARGS]:
+        if isinstance(arg, dict) and PARAM in arg:
+            if arg[PARAM] not in (params or {}):
+                raise ValueError(f"missing values for parameters: {[arg[PARAM]]}")
+            arg = params[arg[PARAM]]
+        args.append(arg)
+    nodes, src, dst = _graph(con, search, index)
+    return pa.table({NODE: nodes, column: function(nodes, src, dst, *args)})
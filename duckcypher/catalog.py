@@ -0,0 +1,107 @@
+from types import MappingProxyType
+
+from duckcypher.constants import (
+    COLUMNS,
+    FIELD,
+    FROM_MODEL,
+    MODELS,
+    NAME,
+    PRIMARY,
+    RELATIONSHIPS,
+    TABLE,
+    TABLES,
+    TO_MODEL,
+)
+
+
+def _field_name(column):
+    return column.get(FIELD) or column[NAME]
+
+
+# immutable, indexed view of a schema dict, built once per schema version.
+# every lookup that to_sql does during translation is a single dict access.
+class Catalog:
+    def __init__(self, schema, version):
+        self.version = version
+        models, tables, fields, all_fields, primaries, table_fields = (
+            {},
+            {},
+            {},
+            {},
+            {},
+            {},
+        )
+        for table in schema.get(TABLES, []):
+            tables.setdefault(table[NAME], table)
+        # the first model wins on duplicates, same as the linear scans did.
+        for model in schema.get(MODELS, []):
+            name = model[NAME]
+            if name in models:
+                continue
+            models[name] = model
+            columns = model.get(COLUMNS, [])
+            all_fields[name] = tuple(_field_name(col) for col in columns)
+            for col in columns:
+                fields.setdefault((name, col[NAME]), (model[TABLE], _field_name(col)))
+                table_fields.setdefault((model[TABLE], col[NAME]), _field_name(col))
+            primary = next((col for col in columns if col.get(PRIMARY, False)), None)
+            if primary is not None:
+                primaries[name] = _field_name(primary)
+        relationships, between = {}, {}
+        for rel in schema.get(RELATIONSHIPS, []):
+            if rel[NAME] in relationships:
+                continue
+            relationships[rel[NAME]] = rel
+            if rel.get(FROM_MODEL) and rel.get(TO_MODEL):
+                between.setdefault((rel[FROM_MODEL], rel[TO_MODEL]), []).append(rel)
+                if rel[FROM_MODEL] != rel[TO_MODEL]:
+                    between.setdefault((rel[TO_MODEL], rel[FROM_MODEL]), []).append(rel)
+        self.relationships = MappingProxyType(relationships)
+        self._between = MappingProxyType(
+            {key: tuple(rels) for key, rels in between.items()}
+        )
+        self.models = MappingProxyType(models)
+        self.tables = MappingProxyType(tables)
+        self._fields = MappingProxyType(fields)
+        self._all_fields = MappingProxyType(all_fields)
+        self._primaries = MappingProxyType(primaries)
+        self._table_fields = MappingProxyType(table_fields)
+
+    def table_name(self, entity_type):
+        model = self.models.get(entity_type)
+        return model[TABLE] if model else None
+
+    def get_field(self, entity_type, column):
+        # returns tuple of (raw table name, raw field)
+        field = self._fields.get((entity_type, column))
+        if field is None:
+            raise ValueError(f"could not find field {column} in entity {entity_type}")
+        return field
+
+    def get_all_fields(self, entity_type):
+        fields = self._all_fields.get(entity_type)
+        return list(fields) if fields is not None else None
+
+    def get_field_by_table_and_col(self, table, col):
+        return self._table_fields.get((table, col))
+
+    def primary_field(self, entity_type):
+        if entity_type not in self.models:
+            return None
+        field = self._primaries.get(entity_type)
+        if field is None:
+            raise ValueError(f"entity {entity_type} has no primary column")
+        return field
+
+    def relationship(self, rel_type):
+        # an untyped edge resolves to the relationship when there is only one.
+        if rel_type is None and len(self.relationships) == 1:
+            return next(iter(self.relationships.values()))
+        rel = self.relationships.get(rel_type)
+        if rel is None:
+            raise ValueError(f"could not find relationship {rel_type}")
+        return rel
+
+    def relationships_between(self, left_entity_type, right_entity_type):
+        # relationships declared between the two models, in either direction.
+        return list(self._between.get((left_entity_type, right_entity_type), ()))
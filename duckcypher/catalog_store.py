@@ -0,0 +1,59 @@
+import json
+
+from duckcypher.constants import (
+    ADJACENCY_INDEXES,
+    MODELS,
+    PATTERN_VIEWS,
+    RELATIONSHIPS,
+    TABLES,
+    TYPE,
+)
+
+# the model catalog of a file backed database, stored next to the data. one row
+# per schema entry, in schema order since the first model of a name wins.
+CATALOG_TABLE = "duckcypher_catalog"
+
+_KINDS = (TABLES, MODELS, RELATIONSHIPS, PATTERN_VIEWS, ADJACENCY_INDEXES)
+
+
+def _stored(kind, entry):
+    # registered variables only live as long as their connection.
+    return not (kind == TABLES and entry.get(TYPE) == "duckdb_variable")
+
+
+def save_schema(con, schema):
+    rows = [
+        (kind, position, json.dumps(entry))
+        for kind in _KINDS
+        for position, entry in enumerate(schema.get(kind, []))
+        if _stored(kind, entry)
+    ]
+    con.execute(
+        f"create table if not exists {CATALOG_TABLE} "
+        "(kind varchar, position integer, definition varchar)"
+    )
+    con.begin()
+    try:
+        con.execute(f"delete from {CATALOG_TABLE}")
+        if rows:
+            con.executemany(f"insert into {CATALOG_TABLE} values (?, ?, ?)", rows)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+
+def load_schema(con):
+    # returns the stored schema, None when the database has none.
+    exists = con.execute(
+        "select count(*) from information_schema.tables where table_name = ?",
+        [CATALOG_TABLE],
+    ).fetchone()[0]
+    if not exists:
+        return None
+    schema = {TABLES: [], MODELS: []}
+    for kind, definition in con.execute(
+        f"select kind, definition from {CATALOG_TABLE} order by kind, position"
+    ).fetchall():
+        schema.setdefault(kind, []).append(json.loads(definition))
+    return schema
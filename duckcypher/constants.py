@@ -47,3 +47,74 @@ PROPERTY = "property"
 EDGES = "edges"
 DUCKDB = "duckdb"
 DATA = "data"
+VERSION = "version"
+HITS = "hits"
+MISSES = "misses"
+EVICTIONS = "evictions"
+INVALIDATIONS = "invalidations"
+SIZE = "size"
+MAXSIZE = "maxsize"
+PARAM = "param"
+PARAMS = "params"
+CATALOG = "catalog"
+RELATIONSHIPS = "relationships"
+MIN_HOP = "min_hop"
+MAX_HOP = "max_hop"
+OUTGOING = "outgoing"
+INCOMING = "incoming"
+UNDIRECTED = "undirected"
+FROM_MODEL = "from_model"
+TO_MODEL = "to_model"
+CURSOR = "cursor"
+CANCELLED = "cancelled"
+ERROR = "error"
+TRANSLATE_SECONDS = "translate_seconds"
+EXECUTE_SECONDS = "execute_seconds"
+PLAN = "plan"
+EXPLAIN = "explain"
+PROFILE = "profile"
+MODE = "mode"
+QUERIES = "queries"
+PATTERN = "pattern"
+PATTERNS = "patterns"
+OPERATOR = "operator"
+OPERATORS = "operators"
+ROWS = "rows"
+SECONDS = "seconds"
+EXTRA = "extra"
+DEPTH = "depth"
+PHASE = "phase"
+STAGE = "stage"
+BYTES = "bytes"
+INGEST = "ingest"
+VIEW = "view"
+PARQUET = "parquet"
+REGISTRATIONS = "registrations"
+MAX_BYTES = "max_bytes"
+PATTERN_VIEWS = "pattern_views"
+SHORTEST = "shortest"
+SHORTEST_PATH = "shortest_path"
+ALL_SHORTEST_PATHS = "all_shortest_paths"
+PATH_ALIAS = "path_alias"
+SEARCH = "search"
+SEARCHES = "searches"
+RELATIONSHIP = "relationship"
+SOURCES = "sources"
+TARGETS = "targets"
+LENGTH = "length"
+ADJACENCY_INDEXES = "adjacency_indexes"
+INDEX = "index"
+CALL = "call"
+PROCEDURE = "procedure"
+ARGS = "args"
+NODE_TABLES = "node_tables"
+SCORE = "score"
+COMPONENT = "component"
+DEGREE = "degree"
+ROUTE = "route"
+REASON = "reason"
+HOPS = "hops"
+VARIABLE_LENGTH = "variable_length"
+AGGREGATES = "aggregates"
+STAGES = "stages"
+KUZU = "kuzu"
@@ -0,0 +1,89 @@
+import glob
+import hashlib
+import os
+import uuid
+
+from duckcypher.traversal import quote
+
+# where parquet copies of csv files are kept unless told otherwise.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DUCKCYPHER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "duckcypher")
+)
+
+# native tables loaded from csv, with the size and mtime of the file they were
+# loaded from. lives in the database so a file backed one remembers it.
+SOURCES_TABLE = "duckcypher_csv_sources"
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def fingerprint(csv_path):
+    # (absolute path, size, mtime in ns), any change means the file was rewritten.
+    stat = os.stat(csv_path)
+    return os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns
+
+
+def load_table(con, table_name, csv_path):
+    # loads the csv into a native table, unless the table already holds this
+    # exact version of the file. returns True when the file was (re)loaded.
+    path, size, mtime = fingerprint(csv_path)
+    con.execute(
+        f"create table if not exists {SOURCES_TABLE} "
+        "(table_name varchar primary key, path varchar, size bigint, mtime_ns bigint)"
+    )
+    loaded = con.execute(
+        f"select path, size, mtime_ns from {SOURCES_TABLE} where table_name = ?",
+        [table_name],
+    ).fetchone()
+    exists = con.execute(
+        "select count(*) from information_schema.tables where table_name = ?",
+        [table_name],
+    ).fetchone()[0]
+    if exists and loaded == (path, size, mtime):
+        return False
+    con.execute(
+        f"create or replace table {quote(table_name)} as "
+        f"select * from read_csv_auto({_literal(path)})"
+    )
+    con.execute(
+        f"insert or replace into {SOURCES_TABLE} values (?, ?, ?, ?)",
+        [table_name, path, size, mtime],
+    )
+    return True
+
+
+def parquet_path(csv_path, cache_dir=None):
+    # one cache file per version of the csv, named after its path, size and mtime.
+    path, size, mtime = fingerprint(csv_path)
+    key = hashlib.sha1(path.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{key}-{size}-{mtime}.parquet")
+
+
+def load_parquet(con, csv_path, cache_dir=None):
+    # converts the csv to parquet once per version of the file, stale copies are
+    # removed. returns the path of the parquet file.
+    target = parquet_path(csv_path, cache_dir)
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # written aside and renamed, so readers never see a partial file.
+    partial = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        con.execute(
+            f"copy (select * from read_csv_auto({_literal(os.path.abspath(csv_path))})) "
+            f"to {_literal(partial)} (format parquet)"
+        )
+        os.replace(partial, target)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    prefix = os.path.basename(target).split("-", 1)[0]
+    for stale in glob.glob(os.path.join(os.path.dirname(target), f"{prefix}-*.parquet")):
+        if stale != target:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
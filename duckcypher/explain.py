@@ -0,0 +1,182 @@
+import json
+import re
+
+from duckcypher.constants import (
+    ALIAS,
+    AND,
+    COLUMNS,
+    DEPTH,
+    DIRECTION,
+    EDGE,
+    EXTRA,
+    FILTERS,
+    INCOMING,
+    MAX_HOP,
+    MIN_HOP,
+    NODE,
+    OPERATOR,
+    OR,
+    OUTGOING,
+    PARAM,
+    PATTERN,
+    PATTERNS,
+    ROWS,
+    SECONDS,
+    TABLES,
+    TYPE,
+    WHERE,
+)
+
+_OPS = {"eq": "=", "neq": "<>", "gt": ">", "lt": "<", "gte": ">=", "lte": "<="}
+
+# operators wrapping the statement itself rather than any part of the query.
+_WRAPPERS = {"EXPLAIN_ANALYZE", "EXECUTE"}
+
+# quoted strings are skipped, quoted identifiers are unquoted.
+_IDENTIFIER = re.compile(r"'(?:[^']|'')*'|\"((?:[^\"]|\"\")*)\"|([A-Za-z_]\w*)")
+
+
+def _literal(value):
+    if isinstance(value, dict) and PARAM in value:
+        return f"${value[PARAM]}"
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value)
+    return str(value)
+
+
+def node_pattern(entity):
+    label = f":{entity[TYPE]}" if entity[TYPE] else ""
+    properties = ", ".join(
+        f"{key}: {_literal(value)}" for key, value in (entity[FILTERS] or {}).items()
+    )
+    properties = f" {{{properties}}}" if properties else ""
+    return f"({entity[ALIAS] or ''}{label}{properties})"
+
+
+def edge_pattern(left, edge, right):
+    hops = ""
+    if edge[MIN_HOP] is not None:
+        hops = f"*{edge[MIN_HOP]}"
+        if edge[MAX_HOP] != edge[MIN_HOP]:
+            hops += f"..{edge[MAX_HOP]}"
+    inner = f"{edge[ALIAS] or ''}{':' + edge[TYPE] if edge[TYPE] else ''}{hops}"
+    body = f"-[{inner}]-" if inner else "--"
+    if edge[DIRECTION] == OUTGOING:
+        body += ">"
+    elif edge[DIRECTION] == INCOMING:
+        body = "<" + body
+    return f"({left[ALIAS] or ''}){body}({right[ALIAS] or ''})"
+
+
+def condition_text(condition, aliases=()):
+    entity_id, op, value = condition
+    if isinstance(value, str) and (
+        re.fullmatch(r"\w+\.\w+", value) or value in aliases
+    ):
+        rendered = value
+    else:
+        rendered = _literal(value)
+    return f"{entity_id} {_OPS.get(op, op)} {rendered}"
+
+
+def conditions(where):
+    # the atomic conditions of a where clause, left to right.
+    if where[0] in (AND, OR):
+        yield from conditions(where[1])
+        yield from conditions(where[2])
+    else:
+        yield where
+
+
+def _text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_text(v) for v in value)
+    return str(value)
+
+
+def _identifiers(text):
+    return {
+        quoted.replace('""', '"') if quoted else bare
+        for quoted, bare in _IDENTIFIER.findall(text)
+        if quoted or bare
+    }
+
+
+def _operator_tables(extra):
+    tables = set()
+    if "Table" in extra:
+        tables.add(_text(extra["Table"]).split(".")[-1])
+    if "Filename(s)" in extra:
+        tables.update(_text(extra["Filename(s)"]).split())
+    return tables
+
+
+def _matching_patterns(name, extra, patterns):
+    # joins are matched on the columns of their condition, filters on the columns
+    # they test and scans on the table they read.
+    tables = _operator_tables(extra)
+    hits = []
+    if "JOIN" in name and "Conditions" in extra:
+        columns = _identifiers(_text(extra["Conditions"]))
+        hits = [
+            p
+            for p in patterns
+            if p[TYPE] == EDGE and p[COLUMNS] and columns <= p[COLUMNS]
+        ]
+        if not hits:
+            # comparisons across nodes (or against a previous stage) become joins.
+            hits = [
+                p
+                for p in patterns
+                if p[TYPE] == WHERE and p[COLUMNS] and p[COLUMNS] <= columns
+            ]
+    else:
+        expression = extra.get("Expression") or extra.get("Filters")
+        if expression:
+            columns = _identifiers(_text(expression))
+            hits += [
+                p
+                for p in patterns
+                if p[TYPE] in (NODE, WHERE)
+                and p[COLUMNS]
+                and p[COLUMNS] <= columns
+                and (not tables or p[TABLES] & tables)
+            ]
+        if tables:
+            hits += [
+                p for p in patterns if p[TYPE] in (NODE, EDGE) and p[TABLES] & tables
+            ]
+    return list(dict.fromkeys(p[PATTERN] for p in hits))
+
+
+def operators(tree, patterns, depth=0):
+    # flattens a duckdb plan (profiling output or EXPLAIN (FORMAT json)) into
+    # operators in pre-order, each annotated with the cypher patterns it comes from.
+    if isinstance(tree, list):
+        return [op for root in tree for op in operators(root, patterns, depth)]
+    result = []
+    name = tree.get("operator_name") or tree.get("name")
+    if name and name not in _WRAPPERS:
+        extra = tree.get("extra_info") or {}
+        result.append(
+            {
+                OPERATOR: name,
+                DEPTH: depth,
+                ROWS: tree.get("operator_cardinality"),
+                SECONDS: tree.get("operator_timing"),
+                EXTRA: extra,
+                PATTERNS: _matching_patterns(name, extra, patterns),
+            }
+        )
+        depth += 1
+    for child in tree.get("children", []):
+        result += operators(child, patterns, depth)
+    return result
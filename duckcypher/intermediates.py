@@ -0,0 +1,108 @@
+import itertools
+import re
+import threading
+import uuid
+
+import duckdb
+
+from duckcypher.constants import BYTES, REGISTRATIONS, ROWS
+
+
+def stage_name():
+    # name the result of a WITH stage is registered under. random enough to
+    # never meet a user table or another run's stage.
+    return "_dc_with_" + uuid.uuid4().hex
+
+
+_PLACEHOLDER = re.compile(r"_dc_slot_\d+_")
+
+
+def placeholders():
+    # names for the intermediate results of one plan. plans are cached and run
+    # many times, even at once on one connection, so the plan only holds these
+    # and each run binds them to names of its own, see Registrations.bind.
+    slots = itertools.count()
+    return lambda: f"_dc_slot_{next(slots)}_"
+
+
+class MemoryAccount:
+    # the intermediate results currently registered, with their size.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held = {}
+        self._keys = itertools.count()
+
+    def add(self, table):
+        key = next(self._keys)
+        with self._lock:
+            self._held[key] = (table.num_rows, table.nbytes)
+        return key
+
+    def remove(self, key):
+        with self._lock:
+            self._held.pop(key, None)
+
+    def usage(self):
+        with self._lock:
+            held = list(self._held.values())
+        return {
+            REGISTRATIONS: len(held),
+            ROWS: sum(rows for rows, _size in held),
+            BYTES: sum(size for _rows, size in held),
+        }
+
+
+# every registration of the process is accounted here.
+account = MemoryAccount()
+
+
+def memory_usage():
+    # how many intermediate results are registered right now, their rows and bytes.
+    return account.usage()
+
+
+class Registrations:
+    # the intermediate results one execution registers on its connection, by
+    # the placeholder the plan knows them as. each is dropped by release,
+    # whatever is left when the scope closes, even on failure.
+    def __init__(self, con):
+        self._con = con
+        self._keys = {}
+        self._names = {}
+
+    def name(self, placeholder):
+        # the name this execution registers the placeholder under.
+        if placeholder not in self._names:
+            self._names[placeholder] = stage_name()
+        return self._names[placeholder]
+
+    def bind(self, sql):
+        # the sql with the placeholders it reads replaced by their names.
+        return _PLACEHOLDER.sub(lambda match: self.name(match.group()), sql)
+
+    def register(self, placeholder, table):
+        self._con.register(self.name(placeholder), table)
+        self._keys[placeholder] = account.add(table)
+
+    def release(self, placeholder):
+        key = self._keys.pop(placeholder, None)
+        if key is None:
+            return
+        try:
+            self._con.unregister(self.name(placeholder))
+        except duckdb.Error:
+            # the connection is gone, and the registration with it.
+            pass
+        finally:
+            account.remove(key)
+
+    def close(self):
+        for name in list(self._keys):
+            self.release(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
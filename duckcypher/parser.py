@@ -1,49 +1,77 @@
-import toolz as tz
+from functools import lru_cache
+import re
+import duckdb
 from typing import Tuple
 
 
 from lark import Lark, Transformer, v_args, Token
+from lark.exceptions import LarkError
+from lark.lexer import PatternStr
 
 from duckcypher.constants import (
     ALIAS,
+    ALL_SHORTEST_PATHS,
     AND,
+    ARGS,
+    CALL,
     COLUMN,
     DIRECTION,
+    EDGES,
     ENTITY_ID,
+    EXPLAIN,
     FILTERS,
+    INCOMING,
     LIMIT,
     MATCH,
+    MAX_HOP,
+    MIN_HOP,
     OP,
     OR,
     ORDER_BY,
+    OUTGOING,
+    PARAM,
+    PATH_ALIAS,
+    PROCEDURE,
+    PROFILE,
     RETURN,
+    SHORTEST,
+    SHORTEST_PATH,
     TYPE,
+    UNDIRECTED,
     WHERE,
 )
-from duckcypher.to_sql import process_query
+from duckcypher.plan_cache import PlanCache
+from duckcypher.schema import schema_version
+from duckcypher.tracing import PARSE, TRANSFORM, TRANSLATE, get_tracer
+from duckcypher.to_sql import compile_query, execute_plan, process_query, stream_plan
 
 
-_DuckCypherGrammar = Lark(
-    """
-start               : query
+_GRAMMAR = """
+start               : (EXPLAIN | PROFILE)? query
 
-query               : (match_clause (where_clause)? return_clause order_by_clause? limit_clause?)+
+query               : ((call_clause match_clause? | match_clause) (where_clause)? return_clause order_by_clause? limit_clause?)+
 
-match_clause        : "match"i node_match (edge_match node_match)*
+call_clause         : "call"i procedure "(" (value ("," value)*)? ")" "yield"i CNAME
+procedure           : CNAME ("." CNAME)*
+
+match_clause        : "match"i (node_match (edge_match node_match)* | shortest_path)
+
+shortest_path       : (CNAME "=")? (SHORTEST_PATH | ALL_SHORTEST_PATHS) "(" node_match edge_match node_match ")"
 
 where_clause        : "where"i compound_condition
 
-compound_condition  : condition
-                    | "(" compound_condition boolean_arithmetic compound_condition ")"
-                    | compound_condition boolean_arithmetic compound_condition
+// "and" binds tighter than "or", both are left associative.
+?compound_condition : and_condition
+                    | compound_condition where_or and_condition
+?and_condition      : condition_atom
+                    | and_condition where_and condition_atom -> compound_condition
+?condition_atom     : condition
+                    | "(" compound_condition ")"
 
 condition           : entity_id op entity_id_or_value
 
 ?entity_id_or_value : entity_id
                     | value
-                    | "NULL"i -> null
-                    | "TRUE"i -> true
-                    | "FALSE"i -> false
 
 op                  : "==" -> op_eq
                     | "=" -> op_eq
@@ -65,7 +93,7 @@ max_aggregate       : "max"i "(" entity_id ")"
 
 limit_clause        : "limit"i NUMBER
 order_by_clause     : "order"i "by"i (entity_id) order_by_direction
-!order_by_direction  : (("desc"i) | ("asc"i))? 
+!order_by_direction  : (("desc"i) | ("asc"i))?
 skip_clause         : "skip"i NUMBER
 
 
@@ -75,37 +103,35 @@ skip_clause         : "skip"i NUMBER
 node_match          : "(" (CNAME)? (json_dict)? ")"
                     | "(" (CNAME)? ":" TYPE (json_dict)? ")"
 
+// "-[]-" lexes as "-[" "]-", so every bracketed form shares one prefix.
 edge_match          : LEFT_ANGLE? "--" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" CNAME "]-" RIGHT_ANGLE? 
-                    | LEFT_ANGLE? "-[" CNAME ":" TYPE "]-" RIGHT_ANGLE? 
-                    | LEFT_ANGLE? "-[" ":" TYPE "]-" RIGHT_ANGLE? 
-                    | LEFT_ANGLE? "-[" "*" MIN_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" "*" MIN_HOP  ".." MAX_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" CNAME "*" MIN_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" CNAME "*" MIN_HOP  ".." MAX_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" ":" TYPE "*" MIN_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" ":" TYPE "*" MIN_HOP  ".." MAX_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" CNAME ":" TYPE "*" MIN_HOP "]-" RIGHT_ANGLE?
-                    | LEFT_ANGLE? "-[" CNAME ":" TYPE "*" MIN_HOP  ".." MAX_HOP "]-" RIGHT_ANGLE?
+                    | LEFT_ANGLE? "-[" CNAME? (":" TYPE)? (VAR_LENGTH MIN_HOP? (HOP_RANGE MAX_HOP?)?)? "]-" RIGHT_ANGLE?
 
 
 
 LEFT_ANGLE          : "<"
 RIGHT_ANGLE         : ">"
+VAR_LENGTH          : "*"
+HOP_RANGE           : ".."
 MIN_HOP             : INT
 MAX_HOP             : INT
 TYPE                : CNAME
+PARAM               : "$" CNAME
+EXPLAIN             : "explain"i
+PROFILE             : "profile"i
+SHORTEST_PATH       : "shortestPath"i
+ALL_SHORTEST_PATHS  : "allShortestPaths"i
 
 json_dict           : "{" json_rule ("," json_rule)* "}"
 ?json_rule          : CNAME ":" value
 
-boolean_arithmetic  : "and"i -> where_and
-                    | "OR"i -> where_or
+where_and           : "and"i
+where_or            : "or"i
 
 key                 : CNAME
 ?value              : ESTRING
                     | NUMBER
+                    | PARAM
                     | "NULL"i -> null
                     | "TRUE"i -> true
                     | "FALSE"i -> false
@@ -119,15 +145,76 @@ key                 : CNAME
 %import common.WS
 %ignore WS
 
-""",
-    start="start",
-)
+"""
+
+
+def _build_grammar(parser="lalr"):
+    # the lalr tables are pickled to a cache file keyed by the grammar hash,
+    # so only the first process ever builds them.
+    if parser == "lalr":
+        return Lark(_GRAMMAR, start="start", parser="lalr", cache=True)
+    return Lark(_GRAMMAR, start="start", parser=parser)
+
+
+_DuckCypherGrammar = _build_grammar()
+
+# the case insensitive keyword terminals of the grammar, and their words.
+_KEYWORDS = {
+    terminal.name: terminal.pattern.value.lower()
+    for terminal in _DuckCypherGrammar.terminals
+    if isinstance(terminal.pattern, PatternStr) and "i" in terminal.pattern.flags
+}
+_KEYWORD_WORDS = set(_KEYWORDS.values())
+
+_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\s+|\w+|.', re.DOTALL)
+
+
+def _collapse(tokens):
+    return "".join(" " if token.isspace() else token for token in tokens)
+
+
+# query texts, whitespace collapsed, whose key needed the parser, kept so a
+# repeated query is never lexed again.
+NORMALIZED_TEXTS = 1024
+
+
+def normalize_cypher(cypher_query):
+    # the plan cache key: whitespace collapsed and keywords lowercased, string
+    # literals are kept verbatim. a word is a keyword only where the parser
+    # lexes it as one, `as Count` keeps the alias's case. the lexer alone cannot
+    # tell them apart, lexing takes a parse, so it only runs when some
+    # keyword-like word is not lowercase already and once per distinct text.
+    tokens = _TOKEN.findall(cypher_query.strip())
+    if not any(
+        token.lower() in _KEYWORD_WORDS and token != token.lower() for token in tokens
+    ):
+        return _collapse(tokens)
+    return _fold_keywords(_collapse(tokens))
+
+
+@lru_cache(maxsize=NORMALIZED_TEXTS)
+def _fold_keywords(cypher_query):
+    text = list(cypher_query)
+    try:
+        for token in _DuckCypherGrammar.parse_interactive(cypher_query).iter_parse():
+            if token.type in _KEYWORDS:
+                text[token.start_pos : token.end_pos] = token.lower()
+    except LarkError:
+        # the parse raises it again when the query is compiled.
+        pass
+    return _collapse(_TOKEN.findall("".join(text).strip()))
 
 
 class _DuckCypherTransformer(Transformer):
     def __init__(self, schema):
         self.schema = schema
         self._query = None
+        self._mode = None
+
+    def start(self, start):
+        # an EXPLAIN or PROFILE prefix makes the query report on its plan.
+        if isinstance(start[0], Token):
+            self._mode = {"EXPLAIN": EXPLAIN, "PROFILE": PROFILE}[start[0].type]
 
     def count_star(self, count):
         return {
@@ -205,8 +292,45 @@ class _DuckCypherTransformer(Transformer):
             return ".".join(entity_id)
         return entity_id.value
 
-    def edge_match(self, edge_name):
-        return None
+    def edge_match(self, edge_match):
+        cname = edge_type = min_hop = max_hop = None
+        left = right = variable_length = hop_range = False
+        for token in edge_match:
+            if token.type == "VAR_LENGTH":
+                variable_length = True
+            elif token.type == "HOP_RANGE":
+                hop_range = True
+            elif token.type == "CNAME":
+                cname = token.value
+            elif token.type == "TYPE":
+                edge_type = token.value
+            elif token.type == "MIN_HOP":
+                min_hop = int(token.value)
+            elif token.type == "MAX_HOP":
+                max_hop = int(token.value)
+            elif token.type == "LEFT_ANGLE":
+                left = True
+            elif token.type == "RIGHT_ANGLE":
+                right = True
+        if left == right:
+            direction = UNDIRECTED
+        else:
+            direction = OUTGOING if right else INCOMING
+        if min_hop is not None and max_hop is None and not hop_range:
+            # -[*n]- is exactly n hops.
+            max_hop = min_hop
+        elif variable_length and min_hop is None:
+            # -[*..n]- is 1 to n hops, -[*]- any number of hops.
+            min_hop = 1
+        if max_hop is not None and max_hop < min_hop:
+            raise ValueError(f"invalid hop range {min_hop}..{max_hop}")
+        return {
+            ALIAS: cname,
+            TYPE: edge_type,
+            DIRECTION: direction,
+            MIN_HOP: min_hop,
+            MAX_HOP: max_hop,
+        }
 
     def node_match(self, node_name):
         cname = node_type = json_data = None
@@ -219,15 +343,38 @@ class _DuckCypherTransformer(Transformer):
                 node_type = token.value
         return {ALIAS: cname, TYPE: node_type, FILTERS: json_data or {}}
 
+    def shortest_path(self, shortest_path):
+        # p = shortestPath((a)-[*..k]-(b)), the edge carries the kind of search
+        # and the name of the path.
+        path_alias = None
+        if shortest_path[0].type == "CNAME":
+            path_alias, shortest_path = shortest_path[0].value, shortest_path[1:]
+        kind, left, edge, right = shortest_path
+        mode = {
+            "SHORTEST_PATH": SHORTEST_PATH,
+            "ALL_SHORTEST_PATHS": ALL_SHORTEST_PATHS,
+        }[kind.type]
+        return [left, {**edge, SHORTEST: mode, PATH_ALIAS: path_alias}, right]
+
+    def procedure(self, names):
+        return ".".join(name.value for name in names)
+
+    def call_clause(self, call_clause):
+        # CALL algo.pagerank("REL") YIELD r binds the rows of the procedure to r.
+        procedure, *args, alias = call_clause
+        return {
+            TYPE: CALL,
+            CALL: {PROCEDURE: procedure, ARGS: args, ALIAS: alias.value},
+        }
+
     def match_clause(self, match_clause: Tuple):
+        # nodes and edges alternate, EDGES[i] connects MATCH[i] and MATCH[i + 1].
+        if isinstance(match_clause[0], list):
+            match_clause = match_clause[0]
         return {
             TYPE: MATCH,
-            MATCH: list(
-                tz.thread_last(
-                    match_clause,
-                    (filter, lambda x: x is not None),
-                )
-            ),
+            MATCH: list(match_clause[0::2]),
+            EDGES: list(match_clause[1::2]),
         }
 
     def where_clause(self, where_clause: tuple):
@@ -256,6 +403,10 @@ class _DuckCypherTransformer(Transformer):
     ESTRING = v_args(inline=True)(eval)
     NUMBER = v_args(inline=True)(eval)
 
+    def PARAM(self, token):
+        # bound at execution time, see to_sql.execute_plan.
+        return {PARAM: token.value[1:]}
+
     def op(self, operator):
         return operator
 
@@ -289,14 +440,80 @@ class _DuckCypherTransformer(Transformer):
     def query(self, clause):
         self._query = clause
 
+    def compile(self, materialize=False):
+        if not self._query:
+            raise ValueError("No query to compile")
+        return compile_query(self.schema, self._query, materialize, self._mode)
+
     def run(self):
-        if not self.query:
+        if not self._query:
             raise ValueError("No query to run")
         res = process_query(self.schema, self._query)
         return res
 
 
-def run_cypher(schema, cypher_query):
-    t = _DuckCypherTransformer(schema)
-    t.transform(_DuckCypherGrammar.parse(cypher_query))
-    return t.run()
+plan_cache = PlanCache()
+
+
+def parse_pattern(pattern):
+    # the nodes and edges of a bare MATCH pattern such as "(a:A)--(b:B)".
+    t = _DuckCypherTransformer(None)
+    t.transform(_DuckCypherGrammar.parse(f"match {pattern} return _"))
+    if len(t._query) != 2:
+        raise ValueError(f"not a single match pattern: {pattern}")
+    return t._query[0][MATCH], t._query[0][EDGES]
+
+
+def compile_cypher(
+    schema, cypher_query, cache=plan_cache, materialize=False, tracer=None
+):
+    key = (normalize_cypher(cypher_query), schema_version(schema), materialize)
+    plan = cache.get(key) if cache is not None else None
+    if plan is None:
+        tracer = get_tracer(tracer)
+        t = _DuckCypherTransformer(schema)
+        with tracer.span(PARSE):
+            tree = _DuckCypherGrammar.parse(cypher_query)
+        with tracer.span(TRANSFORM):
+            t.transform(tree)
+        with tracer.span(TRANSLATE):
+            plan = t.compile(materialize)
+        if cache is not None:
+            cache.put(key, plan)
+    return plan
+
+
+def run_cypher(
+    schema,
+    cypher_query,
+    params=None,
+    cache=plan_cache,
+    materialize=False,
+    con=duckdb,
+    tracer=None,
+):
+    return execute_plan(
+        compile_cypher(schema, cypher_query, cache, materialize, tracer),
+        params,
+        con,
+        tracer,
+    )
+
+
+def run_cypher_stream(
+    schema,
+    cypher_query,
+    batch_size=1_000_000,
+    params=None,
+    cache=plan_cache,
+    materialize=False,
+    con=duckdb,
+    tracer=None,
+):
+    return stream_plan(
+        compile_cypher(schema, cypher_query, cache, materialize, tracer),
+        batch_size,
+        params,
+        con,
+        tracer,
+    )
@@ -0,0 +1,93 @@
+import duckdb
+
+from duckcypher.constants import (
+    ALIAS,
+    CATALOG,
+    EDGES,
+    FILTERS,
+    INGEST,
+    MATCH,
+    MIN_HOP,
+    MODELS,
+    NAME,
+    PATTERN,
+    PATH,
+    PATTERN_VIEWS,
+    RELATIONSHIPS,
+    TABLE,
+    TYPE,
+    VERSION,
+    VIEW,
+)
+from duckcypher.parser import parse_pattern
+from duckcypher.schema import get_catalog, set_pattern_view
+from duckcypher.to_sql import pattern_view_sql, pattern_view_tables
+from duckcypher.traversal import quote
+
+# a pattern view materializes every match of a MATCH pattern into a duckdb
+# table. queries whose join contains the pattern read that table instead, see
+# to_sql._use_pattern_views.
+
+
+def add_pattern_view(schema, name, pattern, con=duckdb):
+    match, edges = parse_pattern(pattern)
+    if len(match) < 2:
+        raise ValueError(f"a pattern view joins at least two nodes: {pattern}")
+    for position, entity in enumerate(match):
+        if not entity[TYPE]:
+            raise ValueError(f"every node of a pattern view needs a type: {pattern}")
+        if entity[FILTERS]:
+            raise ValueError(f"pattern views cannot filter nodes: {pattern}")
+        # aliases only name the nodes, queries are matched by types.
+        entity[ALIAS] = entity[ALIAS] or f"_n{position}"
+    if any(edge[MIN_HOP] is not None for edge in edges):
+        raise ValueError(f"pattern views cannot hold variable length edges: {pattern}")
+    catalog = get_catalog(schema)
+    read = {model[TABLE] for model in catalog.models.values()} | {
+        rel[TABLE] for rel in catalog.relationships.values()
+    }
+    if name in catalog.tables or name in read:
+        raise ValueError(f"{name} is already a table")
+    view = {NAME: name, PATTERN: pattern, MATCH: match, EDGES: edges}
+    for table in pattern_view_tables(schema, view):
+        entry = catalog.tables.get(table, {})
+        # the csv is read again on every query, nothing tells the view it changed.
+        if entry.get(PATH) and entry.get(INGEST, VIEW) == VIEW:
+            raise ValueError(
+                f"pattern views cannot read {table}, a csv ingested as a view: "
+                "add it with ingest=TABLE or PARQUET"
+            )
+    con.execute(
+        f"create or replace table {quote(name)} as {pattern_view_sql(schema, view)}"
+    )
+    set_pattern_view(schema, view)
+
+
+def _reading(schema, table, other):
+    # the schema with every model and relationship of `table` backed by `other`.
+    swap = lambda entry: {**entry, TABLE: other} if entry[TABLE] == table else entry
+    swapped = {
+        key: value for key, value in schema.items() if key not in (VERSION, CATALOG)
+    }
+    swapped[MODELS] = [swap(model) for model in schema.get(MODELS, [])]
+    swapped[RELATIONSHIPS] = [swap(rel) for rel in schema.get(RELATIONSHIPS, [])]
+    return swapped
+
+
+def refresh(con, schema, table, appended=None):
+    # brings the views reading `table` up to date. `appended` names a relation
+    # holding the rows just appended to the table: a view reading the table once
+    # only inserts the matches those rows add. a view joining the table with
+    # itself, or any change but an append, rebuilds the view.
+    for view in schema.get(PATTERN_VIEWS, []):
+        reads = pattern_view_tables(schema, view).get(table, 0)
+        if not reads:
+            continue
+        if appended is not None and reads == 1:
+            sql = pattern_view_sql(_reading(schema, table, appended), view)
+            con.execute(f"insert into {quote(view[NAME])} {sql}")
+        else:
+            con.execute(
+                f"create or replace table {quote(view[NAME])} as "
+                f"{pattern_view_sql(schema, view)}"
+            )
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+from duckcypher.constants import (
+    EVICTIONS,
+    HITS,
+    INVALIDATIONS,
+    MAXSIZE,
+    MISSES,
+    SIZE,
+)
+
+# bounded LRU cache of compiled plans, keyed by (normalized cypher, schema version)
+# so a schema change never serves a stale plan. invalidate() drops everything eagerly.
+class PlanCache:
+    def __init__(self, maxsize=256):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, not {maxsize}")
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, key, plan):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._plans.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                HITS: self.hits,
+                MISSES: self.misses,
+                EVICTIONS: self.evictions,
+                INVALIDATIONS: self.invalidations,
+                SIZE: len(self._plans),
+                MAXSIZE: self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._plans)
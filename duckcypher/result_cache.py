@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+
+from duckcypher.constants import (
+    BYTES,
+    EVICTIONS,
+    HITS,
+    INGEST,
+    INVALIDATIONS,
+    MAX_BYTES,
+    MISSES,
+    MODE,
+    PARAMS,
+    PATH,
+    SEARCHES,
+    SIZE,
+    SQL,
+    TABLES,
+    VIEW,
+)
+import duckcypher.csv_cache as csv_cache
+from duckcypher.schema import get_catalog
+
+
+def result_key(schema, plan, params, cache):
+    # the sql of every stage, the values bound to it and the version of every
+    # table it reads. csv files scanned through a view are read on every query,
+    # so their size and mtime stand in for the version. None when the result
+    # must not be cached.
+    if plan[-1].get(MODE):
+        return None
+    tables = sorted({table for stage in plan for table in stage[TABLES]})
+    catalog = get_catalog(schema)
+    files = []
+    for table in tables:
+        entry = catalog.tables.get(table, {})
+        if entry.get(PATH) and entry.get(INGEST, VIEW) == VIEW:
+            try:
+                files.append(csv_cache.fingerprint(entry[PATH]))
+            except OSError:
+                return None
+    names = [name for stage in plan for name in stage[PARAMS]] + [
+        name
+        for stage in plan
+        for search in stage[SEARCHES]
+        for name in search.get(PARAMS, [])
+    ]
+    bound = tuple((name, repr((params or {}).get(name))) for name in names)
+    return (
+        tuple(stage[SQL] for stage in plan),
+        bound,
+        cache.versions(tables),
+        tuple(files),
+    )
+
+
+# LRU cache of query results as pyarrow tables, bounded by their total size.
+# keys hold the version of every table the query reads: touch(table) bumps it,
+# so entries over the old data are never served again and age out of the LRU.
+class ResultCache:
+    def __init__(self, max_bytes):
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, not {max_bytes}")
+        self.max_bytes = max_bytes
+        self._results = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def versions(self, tables):
+        with self._lock:
+            return tuple((table, self._versions.get(table, 0)) for table in tables)
+
+    def touch(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        # a result larger than the whole cache is not kept.
+        if result.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._results[key] = result
+            self._bytes += result.nbytes
+            while self._bytes > self.max_bytes:
+                _key, evicted = self._results.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                HITS: self.hits,
+                MISSES: self.misses,
+                EVICTIONS: self.evictions,
+                INVALIDATIONS: self.invalidations,
+                SIZE: len(self._results),
+                BYTES: self._bytes,
+                MAX_BYTES: self.max_bytes,
+            }
+
+    def __len__(self):
+        return len(self._results)
@@ -1,8 +1,55 @@
+import itertools
 import re
-from duckcypher.constants import COLUMNS, FIELD, MODELS, NAME, TABLE, TABLES, TYPE
+from duckcypher.catalog import Catalog
+import duckcypher.csv_cache as csv_cache
+from duckcypher.traversal import quote
+from duckcypher.constants import (
+    ADJACENCY_INDEXES,
+    CATALOG,
+    COLUMNS,
+    FIELD,
+    FROM,
+    FROM_MODEL,
+    INGEST,
+    MODELS,
+    NAME,
+    PARQUET,
+    PATH,
+    PATTERN_VIEWS,
+    RELATIONSHIPS,
+    TABLE,
+    TABLES,
+    TO,
+    TO_MODEL,
+    TYPE,
+    VERSION,
+    VIEW,
+)
 import toolz as tz
 import duckdb
 
+# version stamps are unique across all schema dicts in the process,
+# so (query, version) identifies a compiled plan even across schemas.
+_versions = itertools.count(1)
+
+
+def schema_version(schema):
+    return schema.setdefault(VERSION, next(_versions))
+
+
+def _touch(schema):
+    schema[VERSION] = next(_versions)
+    schema.pop(CATALOG, None)
+
+
+def get_catalog(schema):
+    # the compiled catalog is cached on the schema and rebuilt when it changes.
+    version = schema_version(schema)
+    catalog = schema.get(CATALOG)
+    if catalog is None or catalog.version != version:
+        catalog = schema[CATALOG] = Catalog(schema, version)
+    return catalog
+
 
 def show_models(schema, *model_types):
     model_types = set(model_types)
@@ -13,8 +60,8 @@ def show_models(schema, *model_types):
     )
 
 
-def show_tables():
-    return duckdb.sql("show tables;").fetchall()
+def show_tables(con=duckdb):
+    return con.sql("show tables;").fetchall()
 
 
 def add_model(schema, model_type, table, mappings):
@@ -32,60 +79,176 @@ def add_model(schema, model_type, table, mappings):
             filter(lambda m: m[NAME] != model_type, schema.get(MODELS, [])),
         )
     )
+    _touch(schema)
 
 
-def add_csv_table(schema, table_name, csv_path):
-    try:
-        duckdb.sql(
-            f"""
-        create view {table_name} as select * from read_csv_auto("{csv_path}");
-        """
+def add_relationship_model(
+    schema, rel_type, table, from_key, to_key, from_model=None, to_model=None
+):
+    # a link table, each row is an edge from `from_key` to `to_key`. the keys hold
+    # primary field values of the nodes on either side of the relationship.
+    # declaring the node models lets undirected and untyped edges be oriented.
+    if table not in set((t[NAME] for t in schema.get(TABLES, []))):
+        raise ValueError(f"table {table} is not defined in schema")
+    models = set((m[NAME] for m in schema.get(MODELS, [])))
+    for model in (from_model, to_model):
+        if model is not None and model not in models:
+            raise ValueError(f"model {model} is not defined in schema")
+    schema[RELATIONSHIPS] = list(
+        tz.concatv(
+            [
+                {
+                    NAME: rel_type,
+                    TABLE: table,
+                    FROM: from_key,
+                    TO: to_key,
+                    FROM_MODEL: from_model,
+                    TO_MODEL: to_model,
+                }
+            ],
+            filter(lambda r: r[NAME] != rel_type, schema.get(RELATIONSHIPS, [])),
         )
-        schema.setdefault(TABLES, []).append(
+    )
+    _touch(schema)
+
+
+def _set_table(schema, table):
+    # a table added again under the same name replaces the previous definition.
+    schema[TABLES] = [
+        t for t in schema.get(TABLES, []) if t[NAME] != table[NAME]
+    ] + [table]
+
+
+def add_csv_table(
+    schema, table_name, csv_path, con=duckdb, ingest=VIEW, cache_dir=None
+):
+    # ingest=VIEW reads the csv on every query, TABLE loads it once into a native
+    # table and PARQUET into a cached parquet file. both are reloaded when the
+    # size or mtime of the csv changes, and reused across restarts (TABLE only
+    # with a file backed database).
+    if ingest not in (VIEW, TABLE, PARQUET):
+        raise ValueError(f"unknown csv ingestion mode {ingest}")
+    try:
+        if ingest == TABLE:
+            csv_cache.load_table(con, table_name, csv_path)
+        elif ingest == PARQUET:
+            parquet = csv_cache.load_parquet(con, csv_path, cache_dir)
+            con.sql(
+                f"""
+            create or replace view {table_name} as select * from read_parquet({csv_cache._literal(parquet)});
+            """
+            )
+        else:
+            con.sql(
+                f"""
+            create or replace view {table_name} as select * from read_csv_auto("{csv_path}");
+            """
+            )
+        _set_table(
+            schema,
             {
                 NAME: table_name,
                 TYPE: "csv",
-            }
+                PATH: csv_path,
+                INGEST: ingest,
+            },
         )
+        _touch(schema)
     except:
         raise ValueError(f"could not add table {table_name} from {csv_path}")
 
 
-def add_table_from_variable(schema, table_name, var):
-    if not isinstance(var, duckdb.DuckDBPyRelation):
-        raise ValueError(f"var must be a duckdb.DuckDBPyRelation, not {type(var)}")
-    duckdb.register(table_name, var.fetch_arrow_table())
-    schema.setdefault(TABLES, []).append(
+def add_table(schema, table_name, con=duckdb):
+    # adds a native table already created on `con`, e.g. by `create table ...
+    # as`. unlike views and variables it can be appended to.
+    exists = con.execute(
+        "select count(*) from information_schema.tables "
+        "where table_name = ? and table_type = 'BASE TABLE'",
+        [table_name],
+    ).fetchone()[0]
+    if not exists:
+        raise ValueError(f"{table_name} is not a table of the database")
+    _set_table(schema, {NAME: table_name, TYPE: "duckdb_table"})
+    _touch(schema)
+
+
+def _scannable(var):
+    # objects duckdb scans in place: pyarrow tables, datasets and record batch
+    # readers, pandas and polars data frames (lazy frames included). checked by
+    # module so neither pandas nor polars has to be installed.
+    return type(var).__module__.split(".")[0] in ("pyarrow", "pandas", "polars")
+
+
+def add_table_from_variable(schema, table_name, var, con=duckdb):
+    # exposes `var` as a table without copying it. duckdb relations become a view
+    # over their sql, so they stay lazy and are re-bound on `con`; a relation
+    # reading objects only its own connection knows is copied over instead.
+    # returns the object registered on `con`, None for views. registrations are
+    # only visible to `con`.
+    if isinstance(var, duckdb.DuckDBPyRelation):
+        try:
+            con.unregister(table_name)
+            con.execute(
+                f"create or replace view {quote(table_name)} as {var.sql_query()}"
+            )
+            registered = None
+        except duckdb.Error:
+            registered = var.fetch_arrow_table()
+    elif _scannable(var):
+        registered = var
+    else:
+        raise ValueError(
+            "var must be a duckdb relation, a pyarrow table or dataset, "
+            f"or a pandas or polars data frame, not {type(var)}"
+        )
+    if registered is not None:
+        con.register(table_name, registered)
+    _set_table(
+        schema,
         {
             NAME: table_name,
-            TYPE: "duckdb_variable",
-        }
+            TYPE: "duckdb_variable" if registered is not None else "duckdb_view",
+        },
+    )
+    _touch(schema)
+    return registered
+
+
+def set_pattern_view(schema, view):
+    # a pattern view added again under the same name replaces the previous one.
+    schema[PATTERN_VIEWS] = [
+        v for v in schema.get(PATTERN_VIEWS, []) if v[NAME] != view[NAME]
+    ] + [view]
+    _touch(schema)
+
+
+def set_adjacency_index(schema, entry):
+    # one index per relationship, added again it replaces the previous one.
+    schema[ADJACENCY_INDEXES] = [
+        e for e in schema.get(ADJACENCY_INDEXES, []) if e[NAME] != entry[NAME]
+    ] + [entry]
+    _touch(schema)
+
+
+def adjacency_index(schema, rel_type):
+    # the adjacency index entry of a relationship, None when it has none.
+    return next(
+        (e for e in schema.get(ADJACENCY_INDEXES, []) if e[NAME] == rel_type), None
     )
 
 
 def table_name(schema, entity_type):
-    return next((s[TABLE] for s in schema[MODELS] if s[NAME] == entity_type), None)
+    return get_catalog(schema).table_name(entity_type)
 
 
 def get_field(schema, entity_type, column):
     # returns tuple of (raw table name, raw field)
-    for mod in schema[MODELS]:
-        if mod[NAME] != entity_type:
-            continue
-        for col in mod[COLUMNS]:
-            if col[NAME] != column:
-                continue
-            else:
-                return (mod[TABLE], col.get(FIELD) or col[NAME])
-    raise ValueError(f"could not find field {column} in entity {entity_type}")
+    return get_catalog(schema).get_field(entity_type, column)
 
 
 def get_all_fields(schema, entity_type):
     # returns all fields of an entity.
-    for mod in schema[MODELS]:
-        if mod[NAME] != entity_type:
-            continue
-        return [col.get(FIELD) or col[NAME] for col in mod[COLUMNS]]
+    return get_catalog(schema).get_all_fields(entity_type)
 
 
 def find_join_fields(schema, left_entity_types, right_entity_types):
@@ -116,18 +279,19 @@ def find_join_fields(schema, left_entity_types, right_entity_types):
         )
 
 
+def relationship(schema, rel_type):
+    return get_catalog(schema).relationship(rel_type)
+
+
+def relationships_between(schema, left_entity_type, right_entity_type):
+    return get_catalog(schema).relationships_between(
+        left_entity_type, right_entity_type
+    )
+
+
 def get_field_by_table_and_col(schema, table, col):
-    for mod in schema[MODELS]:
-        if mod[TABLE] != table:
-            continue
-        for column in mod[COLUMNS]:
-            if column[NAME] == col:
-                return column.get(FIELD) or column[NAME]
+    return get_catalog(schema).get_field_by_table_and_col(table, col)
 
 
 def primary_field(schema, entity_type):
-    for model in schema[MODELS]:
-        if model[NAME] != entity_type:
-            continue
-        col = tz.first(filter(lambda col: col.get("primary", False), model[COLUMNS]))
-        return col.get(FIELD, col[NAME]) or col[NAME]
+    return get_catalog(schema).primary_field(entity_type)
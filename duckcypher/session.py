@@ -0,0 +1,434 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+import uuid
+import weakref
+
+import duckdb
+
+from duckcypher.constants import (
+    BYTES,
+    CANCELLED,
+    CURSOR,
+    ERROR,
+    EXECUTE_SECONDS,
+    MODELS,
+    PARAMS,
+    PLAN,
+    QUERY,
+    RESULT,
+    ROWS,
+    TABLES,
+    TRANSLATE_SECONDS,
+    VIEW,
+)
+from duckcypher.parser import compile_cypher, normalize_cypher
+from duckcypher.plan_cache import PlanCache
+from duckcypher.result_cache import ResultCache, result_key
+import duckcypher.adjacency as adjacency
+import duckcypher.catalog_store as catalog_store
+import duckcypher.pattern_views as pattern_views
+import duckcypher.schema as schema
+from duckcypher.to_sql import arrow_relation, execute_plan, stream_plan
+from duckcypher.tracing import FETCH, NullTracer, get_tracer
+from duckcypher.traversal import quote
+
+
+def _to_arrow(result, tracer):
+    # EXPLAIN and PROFILE return their report instead of a relation.
+    if isinstance(result, list):
+        return result
+    with get_tracer(tracer).span(FETCH) as span:
+        table = result.fetch_arrow_table()
+        span.set({ROWS: table.num_rows, BYTES: table.nbytes})
+    return table
+
+
+class DuckCypherSession:
+    # an independent graph: its own duckdb connection, model catalog and plan cache.
+    # queries run on one cursor per thread, so several threads can query the same
+    # session concurrently and duckdb parallelizes each of them on its own pool.
+
+    def __init__(
+        self,
+        database=":memory:",
+        config=None,
+        plan_cache_size=256,
+        async_workers=4,
+        tracer=None,
+        result_cache_bytes=0,
+    ):
+        self._con = duckdb.connect(database, config=config or {})
+        # a file backed database keeps its model catalog next to the data, so
+        # reopening it needs no add_* calls.
+        self._persistent = not str(database).startswith(":memory:")
+        stored = catalog_store.load_schema(self._con) if self._persistent else None
+        self.schema = stored or {TABLES: [], MODELS: []}
+        self.plan_cache = PlanCache(plan_cache_size)
+        # opt in: results are kept as arrow tables up to this many bytes, and
+        # served without running the query until a table they read is touched.
+        self.result_cache = (
+            ResultCache(result_cache_bytes) if result_cache_bytes else None
+        )
+        # None follows the process wide tracer, see tracing.set_tracer.
+        self.tracer = tracer
+        self._lock = threading.RLock()
+        # batches change the database wide duckdb threads setting, one at a time.
+        self._batch_lock = threading.Lock()
+        self._local = threading.local()
+        # objects registered on the connection, replayed on every cursor since
+        # registrations (unlike views and tables) are scoped to one connection.
+        self._registered = {}
+        # adjacency indexes by relationship name, opened on first use.
+        self._indexes = {}
+        # run_cypher_async runs on a bounded pool, one cursor per worker thread.
+        self._async_workers = async_workers
+        self._async_pool = None
+        self._async_slots = None
+
+    @property
+    def connection(self):
+        return self._con
+
+    def cursor(self):
+        # returns the cursor of the calling thread.
+        local = self._local
+        if getattr(local, "cursor", None) is None:
+            local.cursor = self._con.cursor()
+            local.registered = {}
+        self._replay(local.cursor, local.registered)
+        return local.cursor
+
+    def _replay(self, cursor, registered):
+        with self._lock:
+            pending = [
+                (name, var)
+                for name, var in self._registered.items()
+                if registered.get(name) is not var
+            ]
+        for name, var in pending:
+            # None marks a name that became a view, the old registration would
+            # shadow it.
+            if var is None:
+                cursor.unregister(name)
+            else:
+                cursor.register(name, var)
+            registered[name] = var
+
+    def show_models(self, *model_types):
+        return schema.show_models(self.schema, *model_types)
+
+    def show_tables(self):
+        return schema.show_tables(self.cursor())
+
+    def _schema_changed(self):
+        self.plan_cache.invalidate()
+        if self._persistent:
+            catalog_store.save_schema(self._con, self.schema)
+
+    def add_model(self, model_type, table, mappings):
+        with self._lock:
+            schema.add_model(self.schema, model_type, table, mappings)
+            self._schema_changed()
+
+    def add_relationship_model(
+        self, rel_type, table, from_key, to_key, from_model=None, to_model=None
+    ):
+        with self._lock:
+            schema.add_relationship_model(
+                self.schema, rel_type, table, from_key, to_key, from_model, to_model
+            )
+            self._schema_changed()
+
+    def add_table_from_csv(self, table_name, csv_path, ingest=VIEW, cache_dir=None):
+        with self._lock:
+            schema.add_csv_table(
+                self.schema, table_name, csv_path, self._con, ingest, cache_dir
+            )
+            self._schema_changed()
+        self.touch(table_name)
+
+    def add_table(self, table_name):
+        # a table created directly on the connection, see schema.add_table.
+        with self._lock:
+            schema.add_table(self.schema, table_name, self.cursor())
+            self._schema_changed()
+        self.touch(table_name)
+
+    def add_table_from_variable(self, table_name, table):
+        with self._lock:
+            self._registered[table_name] = schema.add_table_from_variable(
+                self.schema, table_name, table, self._con
+            )
+            self._schema_changed()
+        self.touch(table_name)
+
+    def add_pattern_view(self, name, pattern):
+        # materializes every match of `pattern`, e.g. "(a:A)--(b:B)--(c:C)", into
+        # the table `name`. queries matching the pattern read it instead of
+        # joining, appends to the tables it reads refresh it.
+        with self._lock:
+            pattern_views.add_pattern_view(self.schema, name, pattern, self.cursor())
+            self._schema_changed()
+
+    def add_adjacency_index(self, rel_type, path=None):
+        # indexes the edges of a relationship as compressed sparse rows, saved
+        # as memory mapped arrays under the directory `path` when given.
+        # variable length and shortestPath edges over it walk the index, appends
+        # to its table are added to it.
+        with self._lock:
+            index = adjacency.add_adjacency_index(
+                self.cursor(), self.schema, rel_type, path, self._indexes
+            )
+            self._schema_changed()
+        return index
+
+    def touch(self, table_name):
+        # marks the table as changed: pattern views reading it are rebuilt and
+        # cached results that read it are not served again. needed after writing
+        # to it directly on the connection.
+        self._table_changed(table_name)
+
+    def _table_changed(self, table_name, appended=None):
+        # refreshes are serialized: each reads the index or view the previous
+        # one left. searches keep reading the index they started with.
+        with self._lock:
+            pattern_views.refresh(self.cursor(), self.schema, table_name, appended)
+            adjacency.refresh(
+                self.cursor(), self.schema, self._indexes, table_name, appended
+            )
+        if self.result_cache is not None:
+            self.result_cache.touch(table_name)
+
+    def append(self, table_name, data):
+        # inserts the rows of `data` (anything add_table_from_variable takes) into
+        # a duckdb table, columns are matched by name. the rows are staged with
+        # the table's columns first, pattern views reading the table join only
+        # them.
+        cursor = self.cursor()
+        name = "_dc_append_" + uuid.uuid4().hex
+        rows = "_dc_rows_" + uuid.uuid4().hex
+        cursor.register(rows, data)
+        cursor.begin()
+        try:
+            cursor.execute(
+                f"create temp table {name} as from {quote(table_name)} limit 0"
+            )
+            cursor.execute(f"insert into {name} by name from {rows}")
+            cursor.execute(f"insert into {quote(table_name)} from {name}")
+            self._table_changed(table_name, appended=name)
+            cursor.execute(f"drop table {name}")
+            cursor.commit()
+        except Exception:
+            cursor.rollback()
+            raise
+        finally:
+            cursor.unregister(rows)
+
+    def head_table(self, table_name, n=10):
+        return self.cursor().sql(f"select * from {table_name} limit {n};")
+
+    def compile_cypher(self, cypher_query, materialize=False):
+        return compile_cypher(
+            self.schema, cypher_query, self.plan_cache, materialize, self.tracer
+        )
+
+    def run_cypher(self, cypher_query, params=None, materialize=False):
+        plan = self.compile_cypher(cypher_query, materialize)
+        tracer = get_tracer(self.tracer)
+        if self.result_cache is None and isinstance(tracer, NullTracer):
+            return execute_plan(plan, params, self.cursor(), tracer, self._indexes)
+        # fetched here so a tracer sees the fetch span with or without the cache.
+        result = self._execute_arrow(plan, params)
+        if isinstance(result, list):
+            return result
+        return arrow_relation(self.cursor(), result)
+
+    def _execute_arrow(self, plan, params):
+        # the result as a pyarrow table, from the result cache when it holds it.
+        key = None
+        if self.result_cache is not None:
+            key = result_key(self.schema, plan, params, self.result_cache)
+            if key is not None:
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    return cached
+        result = _to_arrow(
+            execute_plan(plan, params, self.cursor(), self.tracer, self._indexes),
+            self.tracer,
+        )
+        if key is not None:
+            self.result_cache.put(key, result)
+        return result
+
+    def run_cypher_stream(
+        self, cypher_query, batch_size=1_000_000, params=None, materialize=False
+    ):
+        # the stream keeps a pending result on its cursor, so it gets a cursor of its
+        # own and the thread can keep querying while the stream is consumed.
+        plan = self.compile_cypher(cypher_query, materialize)
+        cursor = self._con.cursor()
+        try:
+            self._replay(cursor, {})
+            yield from stream_plan(
+                plan, batch_size, params, cursor, self.tracer, self._indexes
+            )
+        finally:
+            cursor.close()
+
+    def _run_arrow(self, cypher_query, params, materialize, running):
+        cursor = self.cursor()
+        with self._lock:
+            if running.get(CANCELLED):
+                return None
+            running[CURSOR] = cursor
+        try:
+            # fetched here so the event loop never touches duckdb.
+            return self._execute_arrow(
+                self.compile_cypher(cypher_query, materialize), params
+            )
+        finally:
+            # the worker's cursor runs other jobs next, a late cancel must not
+            # interrupt them.
+            with self._lock:
+                running.pop(CURSOR, None)
+
+    def _async_executor(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_pool is None:
+                self._async_pool = ThreadPoolExecutor(
+                    self._async_workers, thread_name_prefix="duckcypher"
+                )
+                # awaiting callers queue here, not in the executor, once every
+                # worker is busy. asyncio semaphores belong to one event loop, so
+                # every loop awaiting the session gets its own.
+                self._async_slots = weakref.WeakKeyDictionary()
+            slots = self._async_slots.get(loop)
+            if slots is None:
+                slots = self._async_slots[loop] = asyncio.Semaphore(
+                    self._async_workers
+                )
+            return self._async_pool, slots
+
+    async def run_cypher_async(self, cypher_query, params=None, materialize=False):
+        # returns the result as a pyarrow table. cancelling the awaiting task
+        # interrupts the query on its cursor.
+        pool, slots = self._async_executor()
+        await slots.acquire()
+        loop = asyncio.get_running_loop()
+        running = {}
+        try:
+            job = pool.submit(
+                self._run_arrow, cypher_query, params, materialize, running
+            )
+        except BaseException:
+            slots.release()
+            raise
+
+        def release(_):
+            # the slot frees when the worker is done, not when the caller gives up.
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                # the loop was closed meanwhile, its slots went with it.
+                pass
+
+        job.add_done_callback(release)
+        try:
+            return await asyncio.wrap_future(job)
+        except asyncio.CancelledError:
+            # under the lock the job cannot finish and hand its cursor on.
+            with self._lock:
+                running[CANCELLED] = True
+                cursor = running.get(CURSOR)
+                if cursor is not None and not job.done():
+                    cursor.interrupt()
+            raise
+
+    def _execute_batch_entry(self, entry):
+        start = time.perf_counter()
+        try:
+            entry[RESULT] = self._execute_arrow(entry[PLAN], entry[PARAMS])
+        except Exception as error:
+            entry[ERROR] = error
+        entry[EXECUTE_SECONDS] = time.perf_counter() - start
+
+    def run_cypher_batch(self, queries, threads=None, materialize=False):
+        # runs many queries together. `queries` holds cypher strings or
+        # (cypher, params) pairs. all of them are translated first, identical
+        # queries run once, and the rest run on a pool of workers. `threads` is the
+        # budget shared by the workers and duckdb: the duckdb `threads` setting is
+        # lowered to threads // workers while the batch runs. the setting belongs to
+        # the database, so batches run one after another and other queries on the
+        # session run with the lowered setting meanwhile.
+        # returns one dict per query in input order, with the arrow table under
+        # RESULT or the exception under ERROR, plus translation and execution time.
+        entries, order = {}, []
+        for item in queries:
+            cypher_query, params = (item, None) if isinstance(item, str) else item
+            key = (normalize_cypher(cypher_query), repr(sorted((params or {}).items())))
+            if key not in entries:
+                entry = {
+                    QUERY: cypher_query,
+                    PARAMS: params,
+                    PLAN: None,
+                    RESULT: None,
+                    ERROR: None,
+                    TRANSLATE_SECONDS: 0.0,
+                    EXECUTE_SECONDS: 0.0,
+                }
+                start = time.perf_counter()
+                try:
+                    entry[PLAN] = self.compile_cypher(cypher_query, materialize)
+                except Exception as error:
+                    entry[ERROR] = error
+                entry[TRANSLATE_SECONDS] = time.perf_counter() - start
+                entries[key] = entry
+            order.append((cypher_query, entries[key]))
+
+        runnable = [entry for entry in entries.values() if entry[ERROR] is None]
+        budget = threads or os.cpu_count() or 1
+        workers = max(1, min(budget, len(runnable)))
+        cursor = self.cursor()
+        with self._batch_lock:
+            previous = cursor.execute(
+                "select current_setting('threads')"
+            ).fetchone()[0]
+            cursor.execute(f"set threads = {max(1, budget // workers)}")
+            try:
+                with ThreadPoolExecutor(workers, thread_name_prefix="duckcypher") as pool:
+                    list(pool.map(self._execute_batch_entry, runnable))
+            finally:
+                cursor.execute(f"set threads = {previous}")
+        return [
+            {
+                QUERY: cypher_query,
+                RESULT: entry[RESULT],
+                ERROR: entry[ERROR],
+                TRANSLATE_SECONDS: entry[TRANSLATE_SECONDS],
+                EXECUTE_SECONDS: entry[EXECUTE_SECONDS],
+            }
+            for cypher_query, entry in order
+        ]
+
+    def plan_cache_stats(self):
+        return self.plan_cache.stats()
+
+    def result_cache_stats(self):
+        if self.result_cache is None:
+            return None
+        return self.result_cache.stats()
+
+    def close(self):
+        if self._async_pool is not None:
+            self._async_pool.shutdown(wait=True, cancel_futures=True)
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,177 @@
+import pyarrow as pa
+
+from duckcypher.constants import (
+    ALL_SHORTEST_PATHS,
+    DIRECTION,
+    INCOMING,
+    LENGTH,
+    MAX_HOP,
+    MIN_HOP,
+    NODES,
+    OUTGOING,
+    RELATIONSHIP,
+    SHORTEST,
+    SOURCES,
+    TARGETS,
+)
+from duckcypher.traversal import DST, SRC, edges_sql
+
+# shortestPath and allShortestPaths. the search runs breadth first, one level
+# per query against the relationship table, and its result (one row per path:
+# src, dst, length and the ids of the nodes along it) is registered for the
+# stage's sql to join, see to_sql._join. over a relationship with an adjacency
+# index the levels are expanded on its arrays instead.
+
+_REVERSE = {OUTGOING: INCOMING, INCOMING: OUTGOING}
+
+
+def _sql_step(con, relationship, direction):
+    # the edges leaving a frontier, queried from the relationship table.
+    edges = edges_sql(relationship, direction)
+    return lambda frontier: con.execute(
+        f"select {SRC}, {DST} from ({edges}) where {SRC} in (select unnest(?))",
+        [frontier],
+    ).fetchall()
+
+
+def _index_step(index, direction):
+    # the edges leaving a frontier, read from an adjacency index.
+    def step(frontier):
+        src, dst = index.expand(frontier, direction)
+        return zip(src.tolist(), dst.tolist())
+
+    return step
+
+
+def _expand(step, frontier, visited):
+    # the next level of a search: nodes one edge away from the frontier that were
+    # not visited yet, each with its parents in the frontier.
+    level = {}
+    for src, dst in step(frontier):
+        if dst not in visited:
+            level.setdefault(dst, {})[src] = None
+    return level
+
+
+def _walks(parents, node, first_only):
+    # the walks from the root of a search to `node`, root first. the parents of
+    # a node all sit one level closer to the root, so every walk is shortest.
+    walks, pending = [], [[node]]
+    while pending:
+        walk = pending.pop()
+        heads = list(parents[walk[-1]])
+        if not heads:
+            walks.append(walk[::-1])
+            if first_only:
+                break
+            continue
+        pending += [walk + [head] for head in (heads[:1] if first_only else heads)]
+    return walks
+
+
+def _between(forward, backward, source, target, max_hop, first_only):
+    # bidirectional search: the smaller frontier is expanded until a level
+    # reaches a node the other side has visited. every node met at that point
+    # lies on a shortest path.
+    ahead, behind = {source: {}}, {target: {}}
+    ahead_frontier, behind_frontier = [source], [target]
+    length = 0
+    while ahead_frontier and behind_frontier:
+        if max_hop is not None and length >= max_hop:
+            return []
+        if len(ahead_frontier) <= len(behind_frontier):
+            level = _expand(forward, ahead_frontier, ahead)
+            ahead.update(level)
+            ahead_frontier = list(level)
+        else:
+            level = _expand(backward, behind_frontier, behind)
+            behind.update(level)
+            behind_frontier = list(level)
+        length += 1
+        met = [node for node in level if node in ahead and node in behind]
+        if met:
+            paths = [
+                head + tail[::-1][1:]
+                for node in met
+                for head in _walks(ahead, node, first_only)
+                for tail in _walks(behind, node, first_only)
+            ]
+            return paths[:1] if first_only else paths
+    return []
+
+
+def _from(step, root, max_hop, first_only):
+    # single source search, the shortest walks to every node reachable from
+    # root, root first.
+    visited, frontier, length = {root: {}}, [root], 0
+    while frontier and (max_hop is None or length < max_hop):
+        level = _expand(step, frontier, visited)
+        visited.update(level)
+        frontier = list(level)
+        length += 1
+        for node in level:
+            yield from _walks(visited, node, first_only)
+
+
+def anchors(con, search, params, side):
+    # the distinct ids an end of a search starts from.
+    sql, names = search[side]
+    missing = [name for name in names if name not in (params or {})]
+    if missing:
+        raise ValueError(f"missing values for parameters: {missing}")
+    rows = con.execute(sql, [params[name] for name in names]).fetchall()
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def search(con, search, params, index=None):
+    # runs one shortestPath (or allShortestPaths) search, returns its paths as an
+    # arrow table. both ends anchored by property filters meet halfway; with one
+    # end anchored the search walks from it to every node it reaches.
+    first_only = search[SHORTEST] != ALL_SHORTEST_PATHS
+    direction = search[DIRECTION]
+    reverse = _REVERSE.get(direction, direction)
+    if index is None:
+        forward = _sql_step(con, search[RELATIONSHIP], direction)
+        backward = _sql_step(con, search[RELATIONSHIP], reverse)
+    else:
+        forward, backward = _index_step(index, direction), _index_step(index, reverse)
+    min_hop, max_hop = search[MIN_HOP], search[MAX_HOP]
+
+    paths = []
+    if search[SOURCES] and search[TARGETS]:
+        sources = anchors(con, search, params, SOURCES)
+        targets = anchors(con, search, params, TARGETS)
+        for source in sources:
+            for target in targets:
+                if source == target:
+                    if min_hop == 0:
+                        paths.append([source])
+                    continue
+                paths += _between(
+                    forward, backward, source, target, max_hop, first_only
+                )
+        ids = sources + targets
+    elif search[SOURCES]:
+        ids = anchors(con, search, params, SOURCES)
+        for source in ids:
+            if min_hop == 0:
+                paths.append([source])
+            paths += _from(forward, source, max_hop, first_only)
+    else:
+        ids = anchors(con, search, params, TARGETS)
+        for target in ids:
+            if min_hop == 0:
+                paths.append([target])
+            paths += [
+                walk[::-1]
+                for walk in _from(backward, target, max_hop, first_only)
+            ]
+    id_type = pa.array(ids).type
+    return pa.table(
+        {
+            SRC: pa.array([path[0] for path in paths], id_type),
+            DST: pa.array([path[-1] for path in paths], id_type),
+            LENGTH: pa.array([len(path) - 1 for path in paths], pa.int64()),
+            NODES: pa.array(paths, pa.list_(id_type)),
+        }
+    )
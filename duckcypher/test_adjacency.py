@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from duckcypher.adjacency import AdjacencyIndex
+from duckcypher.constants import SQL
+from duckcypher.session import DuckCypherSession
+import duckcypher.test_traversal as traversal
+
+PLACE = {"columns": [{"name": "id", "type": "int", "primary": True}]}
+REACHED = "match (a:Place {id: 1})-[:ROAD*1..3]->(b:Place) return b.id order by b.id"
+
+
+def _road_session(database=":memory:"):
+    session = DuckCypherSession(database)
+    session.connection.execute(
+        "create table places as select range as id from range(1, 8)"
+    )
+    session.connection.execute(
+        "create table roads as select * from "
+        "(values (1, 2), (1, 3), (2, 4), (3, 4), (4, 5), (5, 6)) t(src, dst)"
+    )
+    for table in ["places", "roads"]:
+        session.add_table(table)
+    session.add_model("Place", "places", PLACE)
+    session.add_relationship_model("ROAD", "roads", "src", "dst", "Place", "Place")
+    return session
+
+
+def _rows(index, offsets, neighbors):
+    offsets, neighbors = getattr(index, offsets), getattr(index, neighbors)
+    return [
+        sorted(neighbors[offsets[i] : offsets[i + 1]].tolist())
+        for i in range(index.num_nodes)
+    ]
+
+
+# the variable length and shortestPath tests again, walked on the index.
+class TestIndexedVariableLength(traversal.TestVariableLength):
+    def setup_class(cls):
+        traversal.TestVariableLength.setup_class(cls)
+        cls.session.add_adjacency_index("REPORTS_TO")
+
+
+class TestIndexedShortestPath(traversal.TestShortestPath):
+    def setup_class(cls):
+        traversal.TestShortestPath.setup_class(cls)
+        cls.session.add_adjacency_index("ROAD")
+
+
+class TestAdjacencyIndex:
+    def test_append_matches_rebuild(self):
+        rng = np.random.default_rng(0)
+        src, dst = rng.integers(0, 50, 200), rng.integers(0, 50, 200)
+        first = AdjacencyIndex.from_edges(src[:100], dst[:100])
+        index = first.with_edges(src[100:], dst[100:])
+        built = AdjacencyIndex.from_edges(src, dst)
+        # the index it grew from is left as it was.
+        assert first.num_edges == 100
+        assert index.ids.tolist() == built.ids.tolist()
+        for offsets, neighbors in [
+            ("out_offsets", "out_neighbors"),
+            ("in_offsets", "in_neighbors"),
+        ]:
+            assert _rows(index, offsets, neighbors) == _rows(built, offsets, neighbors)
+
+    def test_reach(self):
+        index = AdjacencyIndex.from_edges([1, 2, 2], [2, 3, 1])
+        src, dst = index.reach([1, 9], "outgoing", 0, 2)
+        # 9 has no edges but reaches itself in zero hops.
+        assert sorted(zip(src.tolist(), dst.tolist())) == [
+            (1, 1),
+            (1, 2),
+            (1, 3),
+            (9, 9),
+        ]
+
+    def test_planner_walks_the_index(self):
+        with _road_session() as session:
+            before = session.run_cypher(REACHED).fetchall()
+            assert "recursive" in session.compile_cypher(REACHED)[0][SQL]
+            session.add_adjacency_index("ROAD")
+            assert "recursive" not in session.compile_cypher(REACHED)[0][SQL]
+            assert session.run_cypher(REACHED).fetchall() == before
+
+    def test_append(self):
+        with _road_session() as session:
+            session.add_adjacency_index("ROAD")
+            session.append("roads", pa.table({"src": [6], "dst": [7]}))
+            session.append("roads", pa.table({"src": [1], "dst": [6]}))
+            assert session.run_cypher(REACHED).fetchall() == [
+                (2,),
+                (3,),
+                (4,),
+                (5,),
+                (6,),
+                (7,),
+            ]
+            session.connection.execute("delete from roads where src = 1 and dst = 6")
+            session.touch("roads")
+            assert session.run_cypher(REACHED).fetchall() == [(2,), (3,), (4,), (5,)]
+
+    def test_appends_while_searching(self):
+        # every search sees the edges of some append or other, never a mix.
+        with _road_session() as session:
+            session.add_adjacency_index("ROAD")
+            session.append("places", pa.table({"id": list(range(100, 140))}))
+            initial = [2, 3, 4, 5]
+
+            def search(_):
+                seen = []
+                for _ in range(30):
+                    ids = [row[0] for row in session.run_cypher(REACHED).fetchall()]
+                    added = ids[len(initial) :]
+                    assert ids[: len(initial)] == initial
+                    assert added == list(range(100, 100 + len(added)))
+                    seen.append(len(added))
+                return seen
+
+            with ThreadPoolExecutor(4) as pool:
+                searches = [pool.submit(search, i) for i in range(3)]
+                for i in range(100, 140):
+                    session.append("roads", pa.table({"src": [1], "dst": [i]}))
+                for done in searches:
+                    assert done.result() == sorted(done.result())
+            assert len(session.run_cypher(REACHED).fetchall()) == len(initial) + 40
+
+    def test_memory_mapped_across_restarts(self, tmp_path):
+        database, path = str(tmp_path / "graph.duckdb"), str(tmp_path / "roads")
+        with _road_session(database) as session:
+            session.add_adjacency_index("ROAD", path)
+        with DuckCypherSession(database) as session:
+            session.append("roads", pa.table({"src": [1], "dst": [6]}))
+            assert session._indexes["ROAD"].num_edges == 7
+            assert session.run_cypher(REACHED).fetchall() == [
+                (2,),
+                (3,),
+                (4,),
+                (5,),
+                (6,),
+            ]
+        index = AdjacencyIndex.load(path)
+        assert isinstance(index.out_neighbors, np.memmap)
+        assert index.num_edges == 7
+
+    def test_rejects_non_integer_ids(self):
+        with pytest.raises(ValueError):
+            AdjacencyIndex.from_edges(["a"], ["b"])
@@ -0,0 +1,123 @@
+import pyarrow as pa
+import pytest
+
+from duckcypher.session import DuckCypherSession
+
+PLACE = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+    ]
+}
+DEGREES = (
+    'call algo.degree("ROAD", $direction) yield d match (p:Place) '
+    "where p.id = d.node return p.name, d.degree order by p.name"
+)
+
+
+def _road_session(result_cache_bytes=0):
+    # a diamond 1 -> {2, 3} -> 4, then a chain 4 -> 5 -> 6, and 7 on its own.
+    session = DuckCypherSession(result_cache_bytes=result_cache_bytes)
+    session.add_table_from_variable(
+        "places", pa.table({"id": [1, 2, 3, 4, 5, 6, 7], "name": list("abcdefg")})
+    )
+    session.add_table_from_variable(
+        "roads", pa.table({"src": [1, 1, 2, 3, 4, 5], "dst": [2, 3, 4, 4, 5, 6]})
+    )
+    session.add_model("Place", "places", PLACE)
+    session.add_relationship_model("ROAD", "roads", "src", "dst", "Place", "Place")
+    return session
+
+
+class TestAlgorithms:
+    def setup_class(cls):
+        cls.session = _road_session()
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _ranks(self, query, params=None):
+        return dict(self.session.run_cypher(query, params).fetchall())
+
+    def test_pagerank(self):
+        ranks = self._ranks(
+            'call algo.pagerank("ROAD") yield r return r.node, r.score'
+        )
+        assert sorted(ranks) == [1, 2, 3, 4, 5, 6, 7]
+        assert sum(ranks.values()) == pytest.approx(1.0)
+        assert ranks[6] > ranks[5] > ranks[4] > ranks[2] > ranks[1]
+        assert ranks[2] == pytest.approx(ranks[3])
+        # nothing leads to 1 or 7, both keep the teleport share only.
+        assert ranks[1] == pytest.approx(ranks[7])
+
+    def test_pagerank_damping(self):
+        query = 'call algo.pagerank("ROAD", $damping) yield r return r.node, r.score'
+        ranks = self._ranks(query, {"damping": 0.0})
+        assert all(rank == pytest.approx(1 / 7) for rank in ranks.values())
+
+    def test_wcc(self):
+        components = self._ranks(
+            'call algo.wcc("ROAD") yield c return c.node, c.component'
+        )
+        assert components == {1: 1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 7}
+
+    def test_degree_joined_to_nodes(self):
+        res = self.session.run_cypher(DEGREES, {"direction": "in"}).fetchall()
+        assert res == [
+            ("a", 0),
+            ("b", 1),
+            ("c", 1),
+            ("d", 2),
+            ("e", 1),
+            ("f", 1),
+            ("g", 0),
+        ]
+        res = self.session.run_cypher(
+            DEGREES, {"direction": "both"}, materialize=True
+        ).fetchall()
+        assert dict(res)["d"] == 3
+
+    def test_later_stage(self):
+        res = self.session.run_cypher(
+            "match (p:Place {id: 4}) return p.id as pid "
+            'call algo.degree("ROAD") yield d where d.node = pid return d.degree'
+        )
+        assert res.fetchall() == [(3,)]
+
+    def test_rejects(self):
+        for query in [
+            'call algo.betweenness("ROAD") yield r return r.node',
+            'call algo.wcc("ROAD") yield c return c.score',
+            'call algo.wcc("ROAD", 1) yield c return c.node',
+            "call algo.wcc(1) yield c return c.node",
+            'call algo.wcc("FLIGHT") yield c return c.node',
+        ]:
+            with pytest.raises(ValueError):
+                self.session.run_cypher(query)
+        with pytest.raises(ValueError):
+            self.session.run_cypher(DEGREES, {"direction": "up"})
+
+
+class TestIndexedAlgorithms:
+    def test_same_results(self):
+        with _road_session() as session:
+            queries = [
+                'call algo.pagerank("ROAD") yield r return r.node, r.score',
+                'call algo.wcc("ROAD") yield c return c.node, c.component',
+            ]
+            before = [sorted(session.run_cypher(q).fetchall()) for q in queries]
+            session.add_adjacency_index("ROAD")
+            after = [sorted(session.run_cypher(q).fetchall()) for q in queries]
+            assert after == before
+
+    def test_cached_results_follow_appends(self):
+        with _road_session(result_cache_bytes=1 << 20) as session:
+            session.connection.execute("create table trails as from roads")
+            session.add_table("trails")
+            session.add_relationship_model(
+                "TRAIL", "trails", "src", "dst", "Place", "Place"
+            )
+            query = 'call algo.wcc("TRAIL") yield c where c.node = 7 return c.component'
+            assert session.run_cypher(query).fetchall() == [(7,)]
+            session.append("trails", pa.table({"src": [6], "dst": [7]}))
+            assert session.run_cypher(query).fetchall() == [(1,)]
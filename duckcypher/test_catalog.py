@@ -0,0 +1,52 @@
+import pytest
+
+from duckcypher.constants import MODELS, NAME, TABLES, TYPE
+import duckcypher.schema as schema
+
+
+def _schema():
+    s = {TABLES: [{NAME: "persons", TYPE: "csv"}], MODELS: []}
+    schema.add_model(
+        s,
+        "Person",
+        "persons",
+        {
+            "columns": [
+                {"name": "id", "type": "int", "primary": True},
+                {"name": "full_name", "field": "name", "type": "string"},
+            ]
+        },
+    )
+    schema.add_model(
+        s, "Home", "persons", {"columns": [{"name": "state", "primary": True}]}
+    )
+    return s
+
+
+class TestCatalog:
+    def test_lookups(self):
+        s = _schema()
+        assert schema.table_name(s, "Person") == "persons"
+        assert schema.table_name(s, "Missing") is None
+        assert schema.get_field(s, "Person", "full_name") == ("persons", "name")
+        assert schema.get_all_fields(s, "Person") == ["id", "name"]
+        assert schema.get_field_by_table_and_col(s, "persons", "state") == "state"
+        assert schema.primary_field(s, "Home") == "state"
+        with pytest.raises(ValueError):
+            schema.get_field(s, "Person", "age")
+
+    def test_built_once_per_version(self):
+        s = _schema()
+        catalog = schema.get_catalog(s)
+        schema.table_name(s, "Person")
+        assert schema.get_catalog(s) is catalog
+        schema.add_model(
+            s, "Person", "persons", {"columns": [{"name": "age", "primary": True}]}
+        )
+        assert schema.get_catalog(s) is not catalog
+        assert schema.primary_field(s, "Person") == "age"
+
+    def test_immutable(self):
+        catalog = schema.get_catalog(_schema())
+        with pytest.raises(TypeError):
+            catalog.models["Other"] = {}
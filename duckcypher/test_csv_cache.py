@@ -0,0 +1,76 @@
+import os
+import shutil
+
+from duckcypher.constants import PARQUET, TABLE
+import duckcypher.csv_cache as csv_cache
+from duckcypher.session import DuckCypherSession
+
+PERSON = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+        {"name": "age", "type": "int"},
+    ]
+}
+QUERY = "match (p:Person) return count(p)"
+
+
+def _append_person(csv_path):
+    with open(csv_path, "a") as f:
+        f.write("11,New Person,50,Texas\n")
+    # a distinct mtime even on coarse grained file systems.
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestCsvCache:
+    def test_native_table_survives_restart(self, tmp_path):
+        csv_path = str(tmp_path / "persons.csv")
+        shutil.copy("data/persons.csv", csv_path)
+        database = str(tmp_path / "graph.duckdb")
+        with DuckCypherSession(database) as session:
+            session.add_table_from_csv("persons", csv_path, ingest=TABLE)
+            session.add_model("Person", "persons", PERSON)
+            assert session.run_cypher(QUERY).fetchall() == [(10,)]
+        with DuckCypherSession(database) as session:
+            # same file, the table loaded by the previous process is reused.
+            assert not csv_cache.load_table(session.connection, "persons", csv_path)
+            _append_person(csv_path)
+            session.add_table_from_csv("persons", csv_path, ingest=TABLE)
+            session.add_model("Person", "persons", PERSON)
+            assert session.run_cypher(QUERY).fetchall() == [(11,)]
+
+    def test_parquet_cache(self, tmp_path):
+        csv_path = str(tmp_path / "persons.csv")
+        shutil.copy("data/persons.csv", csv_path)
+        cache_dir = str(tmp_path / "cache")
+        with DuckCypherSession() as session:
+            session.add_table_from_csv(
+                "persons", csv_path, ingest=PARQUET, cache_dir=cache_dir
+            )
+            session.add_model("Person", "persons", PERSON)
+            assert session.run_cypher(QUERY).fetchall() == [(10,)]
+        first = csv_cache.parquet_path(csv_path, cache_dir)
+        written = os.stat(first).st_mtime_ns
+        with DuckCypherSession() as session:
+            assert csv_cache.load_parquet(session.connection, csv_path, cache_dir) == first
+            assert os.stat(first).st_mtime_ns == written
+            _append_person(csv_path)
+            session.add_table_from_csv(
+                "persons", csv_path, ingest=PARQUET, cache_dir=cache_dir
+            )
+            session.add_model("Person", "persons", PERSON)
+            assert session.run_cypher(QUERY).fetchall() == [(11,)]
+        # the copy of the old version is gone.
+        assert os.listdir(cache_dir) == [
+            os.path.basename(csv_cache.parquet_path(csv_path, cache_dir))
+        ]
+
+    def test_parquet_cache_dir_with_quote(self, tmp_path):
+        cache_dir = str(tmp_path / "o'cache")
+        with DuckCypherSession() as session:
+            session.add_table_from_csv(
+                "persons", "data/persons.csv", ingest=PARQUET, cache_dir=cache_dir
+            )
+            session.add_model("Person", "persons", PERSON)
+            assert session.run_cypher(QUERY).fetchall() == [(10,)]
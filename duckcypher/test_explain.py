@@ -0,0 +1,79 @@
+import pytest
+
+from duckcypher.constants import OPERATOR, OPERATORS, PATTERNS, PLAN, ROWS, SECONDS, SQL
+from duckcypher.session import DuckCypherSession
+
+
+class TestExplain:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        for table in ["persons", "states", "lives_in"]:
+            cls.session.add_table_from_csv(table, f"data/{table}.csv")
+        cls.session.add_model(
+            "Person",
+            "persons",
+            {
+                "columns": [
+                    {"name": "id", "type": "int", "primary": True},
+                    {"name": "name", "type": "string"},
+                    {"name": "age", "type": "int"},
+                ]
+            },
+        )
+        cls.session.add_model(
+            "State",
+            "states",
+            {
+                "columns": [
+                    {"name": "name", "type": "string", "primary": True},
+                    {"name": "short_name", "type": "string"},
+                ]
+            },
+        )
+        cls.session.add_relationship_model(
+            "LIVES_IN", "lives_in", "id", "state", from_model="Person", to_model="State"
+        )
+        cls.query = """match (p:Person)-[:LIVES_IN]->(s:State)
+        where p.age > $age
+        return p.name, s.short_name"""
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _patterns(self, report, operator):
+        return [
+            pattern
+            for op in report[OPERATORS]
+            if operator in op[OPERATOR]
+            for pattern in op[PATTERNS]
+        ]
+
+    def test_profile(self):
+        [report] = self.session.run_cypher("PROFILE " + self.query, {"age": 40})
+        assert report[SQL] == self.session.compile_cypher(self.query)[0][SQL]
+        assert "Query Profiling Information" in report[PLAN]
+        assert all(isinstance(op[ROWS], int) for op in report[OPERATORS])
+        assert all(op[SECONDS] is not None for op in report[OPERATORS])
+        assert "(p)-[:LIVES_IN]->(s)" in self._patterns(report, "JOIN")
+        assert "p.age > $age" in self._patterns(report, "FILTER")
+
+    def test_explain_does_not_profile(self):
+        [report] = self.session.run_cypher("explain " + self.query, {"age": 40})
+        assert report[PLAN]
+        assert all(op[ROWS] is None for op in report[OPERATORS])
+        assert "(p)-[:LIVES_IN]->(s)" in self._patterns(report, "JOIN")
+
+    def test_profile_materialized_stages(self):
+        query = """profile match (p:Person {name: "Mary Anderson"})
+        with p.age as mary_age
+        match (q:Person) where q.age > mary_age
+        return count(q)"""
+        reports = self.session.run_cypher(query, materialize=True)
+        assert len(reports) == 2
+        assert '(p:Person {name: "Mary Anderson"})' in self._patterns(
+            reports[0], "FILTER"
+        )
+
+    def test_explain_cannot_stream(self):
+        with pytest.raises(ValueError):
+            next(self.session.run_cypher_stream("explain " + self.query, params={"age": 1}))
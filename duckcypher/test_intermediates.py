@@ -0,0 +1,93 @@
+import pytest
+
+from duckcypher.constants import BYTES, REGISTRATIONS, SQL, STAGE
+from duckcypher.intermediates import memory_usage
+from duckcypher.session import DuckCypherSession
+from duckcypher.to_sql import execute_plan
+from duckcypher.tracing import EXECUTE, Tracer
+
+NUMBER = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "parity", "type": "int"},
+    ]
+}
+QUERY = """match (n:Number {id: 7})
+with n
+match (m:Number) where m.parity = n.parity and m.id = 9
+with m
+match (k:Number) where k.parity = m.parity and k.id < 10
+return k.id order by k.id asc"""
+
+
+class TestIntermediates:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        cls.session.connection.execute(
+            "create table numbers as "
+            "select range as id, range % 2 as parity from range(1000)"
+        )
+        cls.session.add_table("numbers")
+        cls.session.add_model("Number", "numbers", NUMBER)
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _assert_released(self):
+        assert memory_usage()[REGISTRATIONS] == 0
+        assert self._registered() == []
+
+    def _registered(self):
+        return self.session.cursor().sql(
+            "select view_name from duckdb_views() where view_name like '_dc_with_%'"
+        ).fetchall()
+
+    def test_plans_hold_placeholders(self):
+        first = self.session.compile_cypher(QUERY, materialize=True)
+        self.session.plan_cache.invalidate()
+        second = self.session.compile_cypher(QUERY, materialize=True)
+        assert [stage[SQL] for stage in first] == [stage[SQL] for stage in second]
+        assert not any("_dc_with_" in stage[SQL] for stage in first)
+
+    def test_overlapping_runs(self):
+        # a second run of the same cached plan on the same connection starts
+        # and ends while the first one's intermediate is registered, its
+        # release must leave that intermediate alone.
+        plan = self.session.compile_cypher(QUERY, materialize=True)
+        cursor = self.session.cursor()
+        inner = []
+
+        class Overlapping(Tracer):
+            def span(self, phase, attributes=None):
+                if phase == EXECUTE and (attributes or {}).get(STAGE) == 1 and not inner:
+                    inner.append(execute_plan(plan, con=cursor).fetchall())
+                return super().span(phase, attributes)
+
+        res = execute_plan(plan, con=cursor, tracer=Overlapping()).fetchall()
+        assert res == inner[0] == [(1,), (3,), (5,), (7,), (9,)]
+        self._assert_released()
+
+    def test_released_after_run(self):
+        result = self.session.run_cypher(QUERY, materialize=True)
+        assert result.fetchall() == [(1,), (3,), (5,), (7,), (9,)]
+        self._assert_released()
+
+    def test_released_on_failure(self):
+        query = QUERY.replace("k.id < 10", "k.id < $high")
+        with pytest.raises(ValueError):
+            self.session.run_cypher(query, materialize=True)
+        self._assert_released()
+
+    def test_stream_holds_until_closed(self):
+        stream = self.session.run_cypher_stream(QUERY, 2, materialize=True)
+        assert next(stream).num_rows == 2
+        # only the result the last stage reads is still held.
+        usage = memory_usage()
+        assert usage[REGISTRATIONS] == 1
+        assert usage[BYTES] > 0
+        stream.close()
+        self._assert_released()
+
+    def test_explain_releases(self):
+        self.session.run_cypher("profile " + QUERY, materialize=True)
+        assert memory_usage()[REGISTRATIONS] == 0
@@ -0,0 +1,117 @@
+import duckdb
+import pytest
+
+from duckcypher.constants import MODELS, PARAMS, SQL, TABLES
+from duckcypher.parser import compile_cypher, run_cypher
+import duckcypher.schema as schema
+import duckcypher.to_sql as to_sql
+
+PERSON = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+        {"name": "age", "type": "int"},
+    ]
+}
+
+
+def _person_schema(con):
+    s = {TABLES: [], MODELS: []}
+    schema.add_csv_table(s, "params_persons", "data/persons.csv", con=con)
+    schema.add_model(s, "Person", "params_persons", PERSON)
+    return s
+
+
+class TestParams:
+    def setup_class(cls):
+        cls.schema = {TABLES: [], MODELS: []}
+        schema.add_csv_table(cls.schema, "params_persons", "data/persons.csv")
+        schema.add_model(cls.schema, "Person", "params_persons", PERSON)
+
+    def test_placeholders_in_sql(self):
+        plan = compile_cypher(
+            self.schema,
+            "match (p:Person {name: $name}) where p.age > $age return p.age",
+        )
+        assert plan[0][PARAMS] == ["name", "age"]
+        assert "$1" in plan[0][SQL] and "$2" in plan[0][SQL]
+        assert "Mary" not in plan[0][SQL]
+
+    def test_prepared_statement_is_reused(self):
+        con = duckdb.connect()
+        s = _person_schema(con)
+        query = "match (p:Person {name: $name}) return p.age"
+        assert run_cypher(s, query, {"name": "Mary Anderson"}, con=con).fetchall() == [
+            (32,)
+        ]
+        prepared = list(to_sql._prepared[con])
+        assert len(prepared) == 1
+        assert run_cypher(s, query, {"name": "John Smith"}, con=con).fetchall() == [
+            (24,)
+        ]
+        assert list(to_sql._prepared[con]) == prepared
+
+    def test_prepared_statements_are_capped(self, monkeypatch):
+        monkeypatch.setattr(to_sql, "MAX_PREPARED", 2)
+        con = duckdb.connect()
+        s = _person_schema(con)
+        names = {}
+        for column in ["age", "id", "name", "age"]:
+            run_cypher(
+                s,
+                f"match (p:Person {{name: $name}}) return p.{column}",
+                {"name": "John Smith"},
+                con=con,
+            )
+            names[column] = next(reversed(to_sql._prepared[con]))
+        assert list(to_sql._prepared[con]) == [names["name"], names["age"]]
+        # the least recently used statement was deallocated.
+        with pytest.raises(duckdb.BinderException):
+            con.execute(f"EXECUTE {names['id']}('John Smith')")
+
+    def test_nested_values_and_quotes(self):
+        con = duckdb.connect()
+        con.execute(
+            "create table tagged as select * from (values "
+            "(1, ['it''s', 'a \"b\"'], {'note': 'o''k'}), "
+            "(2, ['x'], {'note': 'y'})) t(id, tags, meta)"
+        )
+        s = {TABLES: [], MODELS: []}
+        schema.add_table(s, "tagged", con)
+        schema.add_model(
+            s,
+            "Tagged",
+            "tagged",
+            {
+                "columns": [
+                    {"name": "id", "primary": True},
+                    {"name": "tags"},
+                    {"name": "meta"},
+                ]
+            },
+        )
+        query = "match (t:Tagged) where t.tags = $tags and t.meta = $meta return t.id"
+        for tags, meta, expected in [
+            (["it's", 'a "b"'], {"note": "o'k"}, [(1,)]),
+            (["x"], {"note": "y"}, [(2,)]),
+            (["x"], {"note": "o'k"}, []),
+        ]:
+            res = run_cypher(s, query, {"tags": tags, "meta": meta}, con=con)
+            assert res.fetchall() == expected
+        # one statement, bound three times.
+        assert len(to_sql._prepared[con]) == 1
+
+    def test_param_in_second_stage(self):
+        res = run_cypher(
+            self.schema,
+            """match (p:Person {name: $name})
+            with p.age as age
+            match (q:Person) where q.age > age and q.age < $cap
+            return q.name""",
+            {"name": "Mary Anderson", "cap": 40},
+        ).fetchall()
+        assert sorted(res) == [("Jennifer Davis",)]
+
+    def test_missing_param(self):
+        with pytest.raises(ValueError):
+            run_cypher(self.schema, "match (p:Person {name: $name}) return p.age")
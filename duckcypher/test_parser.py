@@ -0,0 +1,48 @@
+from duckcypher.constants import AND, OR, WHERE
+from duckcypher.parser import _DuckCypherGrammar, _DuckCypherTransformer
+
+
+def _transform(cypher_q):
+    t = _DuckCypherTransformer({})
+    t.transform(_DuckCypherGrammar.parse(cypher_q))
+    return t._query
+
+
+def _where(cypher_q):
+    return next(clause[WHERE] for clause in _transform(cypher_q) if WHERE in clause)
+
+
+class TestLalrGrammar:
+    def test_and_binds_tighter_than_or(self):
+        where = _where(
+            "match (a:P) where a.x = 1 or a.y = 2 and a.z = 3 return a.x"
+        )
+        assert where[0] == OR
+        assert where[2][0] == AND
+
+    def test_parenthesized_condition(self):
+        where = _where(
+            "match (a:P) where (a.x = 1 or a.y = 2) and a.z = 3 return a.x"
+        )
+        assert where[0] == AND
+        assert where[1][0] == OR
+
+    def test_null_literal(self):
+        assert _where("match (a:P) where a.x = NULL return a.x")[2] is None
+
+    def test_edge_forms(self):
+        for edge in [
+            "--",
+            "-->",
+            "<--",
+            "-[]-",
+            "-[r]->",
+            "<-[:KNOWS]-",
+            "-[r:KNOWS*1..3]-",
+            "-[*2]->",
+        ]:
+            assert _transform(f"match (a:P){edge}(b:P) return a.x")
+
+    def test_keyword_prefixed_identifiers(self):
+        query = _transform("match (orders:P) return orders.order_id, orders.country")
+        assert query[-1]["return"][0]["entity_id"] == "orders.order_id"
@@ -0,0 +1,159 @@
+import pyarrow as pa
+import pytest
+
+from duckcypher.constants import SQL
+from duckcypher.session import DuckCypherSession
+
+CUSTOMER = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "first_name", "type": "string"},
+    ]
+}
+COMPANY = {"columns": [{"name": "company", "type": "string", "primary": True}]}
+INFO = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "age", "type": "int"},
+    ]
+}
+PERSON = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+    ]
+}
+OLDEST = """match (info:CustomerInfo)--(c:Customer)--(g:Company {company: "google"})
+return c.first_name, info.age order by info.age desc limit 1"""
+KNOWN = "match (a:Person)-[:KNOWS]->(b:Person) where a.id = 1 return count(b)"
+
+
+def _customer_session(database=":memory:"):
+    session = DuckCypherSession(database)
+    session.connection.execute(
+        "create table customers as select * from (values "
+        "(1, 'ann', 'google'), (2, 'bob', 'apple'), (3, 'cid', 'google')"
+        ") t(id, first_name, company)"
+    )
+    session.connection.execute(
+        "create table infos as select * from "
+        "(values (1, 30), (2, 50), (3, 40)) t(id, age)"
+    )
+    for table in ["customers", "infos"]:
+        session.add_table(table)
+    session.add_model("Customer", "customers", CUSTOMER)
+    session.add_model("Company", "customers", COMPANY)
+    session.add_model("CustomerInfo", "infos", INFO)
+    return session
+
+
+def _person_session():
+    session = DuckCypherSession()
+    session.connection.execute(
+        "create table persons as select * from (values (1, 'a'), (2, 'b')) t(id, name)"
+    )
+    session.connection.execute(
+        "create table knows as select * from (values (1, 2)) t(src, dst)"
+    )
+    for table in ["persons", "knows"]:
+        session.add_table(table)
+    session.add_model("Person", "persons", PERSON)
+    session.add_relationship_model("KNOWS", "knows", "src", "dst", "Person", "Person")
+    return session
+
+
+class TestPatternViews:
+    def test_query_reads_the_view(self):
+        with _customer_session() as session:
+            before = session.run_cypher(OLDEST)
+            session.add_pattern_view(
+                "customer_view", "(i:CustomerInfo)--(c:Customer)--(g:Company)"
+            )
+            assert '"customer_view"' in session.compile_cypher(OLDEST)[0][SQL]
+            after = session.run_cypher(OLDEST)
+            assert after.columns == before.columns
+            assert after.fetchall() == [("cid", 40)]
+
+    def test_other_patterns_are_untouched(self):
+        with _customer_session() as session:
+            session.add_pattern_view(
+                "customer_view", "(i:CustomerInfo)--(c:Customer)--(g:Company)"
+            )
+            query = "match (i:CustomerInfo)--(c:Customer) return count(c)"
+            assert "customer_view" not in session.compile_cypher(query)[0][SQL]
+
+    def test_incremental_append(self):
+        with _customer_session() as session:
+            session.add_pattern_view(
+                "customer_view", "(i:CustomerInfo)--(c:Customer)--(g:Company)"
+            )
+            session.append(
+                "customers",
+                pa.table({"company": ["google"], "first_name": ["dan"], "id": [4]}),
+            )
+            # no info for dan yet, the join adds nothing.
+            assert session.run_cypher(OLDEST).fetchall() == [("cid", 40)]
+            session.append("infos", pa.table({"id": [4], "age": [60]}))
+            assert session.run_cypher(OLDEST).fetchall() == [("dan", 60)]
+            count = session.connection.sql("select count(*) from customer_view")
+            assert count.fetchall() == [(4,)]
+
+    def test_touch_rebuilds(self):
+        with _customer_session() as session:
+            session.add_pattern_view(
+                "customer_view", "(i:CustomerInfo)--(c:Customer)--(g:Company)"
+            )
+            session.connection.execute("update infos set age = 99 where id = 1")
+            session.touch("infos")
+            assert session.run_cypher(OLDEST).fetchall() == [("ann", 99)]
+
+    def test_self_join_is_rebuilt(self):
+        with _person_session() as session:
+            session.add_pattern_view("known", "(a:Person)-[:KNOWS]->(b:Person)")
+            assert '"known"' in session.compile_cypher(KNOWN)[0][SQL]
+            assert session.run_cypher(KNOWN).fetchall() == [(1,)]
+            # the view reads knows once, only the new edge is joined. it leads
+            # to a person that does not exist yet.
+            session.append("knows", pa.table({"src": [1], "dst": [3]}))
+            assert session.run_cypher(KNOWN).fetchall() == [(1,)]
+            # persons is read twice, appending to it rebuilds the view.
+            session.append("persons", pa.table({"id": [3], "name": ["c"]}))
+            assert session.run_cypher(KNOWN).fetchall() == [(2,)]
+
+    def test_survives_restart(self, tmp_path):
+        database = str(tmp_path / "graph.duckdb")
+        with _customer_session(database) as session:
+            session.add_pattern_view(
+                "customer_view", "(i:CustomerInfo)--(c:Customer)--(g:Company)"
+            )
+        with DuckCypherSession(database) as session:
+            assert '"customer_view"' in session.compile_cypher(OLDEST)[0][SQL]
+            assert session.run_cypher(OLDEST).fetchall() == [("cid", 40)]
+
+    def test_rejects(self):
+        with _customer_session() as session:
+            for pattern in [
+                "(c:Customer)",
+                "(c:Customer)--(x)",
+                '(c:Customer {id: 1})--(g:Company)',
+                "(a:Person)-[:KNOWS*1..2]->(b:Person)",
+            ]:
+                with pytest.raises(ValueError):
+                    session.add_pattern_view("view", pattern)
+            with pytest.raises(ValueError):
+                session.add_pattern_view("infos", "(i:CustomerInfo)--(c:Customer)")
+
+    def test_rejects_csv_read_on_every_query(self, tmp_path):
+        # the view would not see edits to the csv.
+        csv_path = str(tmp_path / "infos.csv")
+        with open(csv_path, "w") as f:
+            f.write("id,age\n1,30\n2,50\n3,40\n")
+        with _customer_session() as session:
+            session.add_table_from_csv("csv_infos", csv_path)
+            session.add_model("CustomerInfo", "csv_infos", INFO)
+            with pytest.raises(ValueError):
+                session.add_pattern_view("view", "(i:CustomerInfo)--(c:Customer)")
+            session.add_table_from_csv("table_infos", csv_path, ingest="table")
+            session.add_model("CustomerInfo", "table_infos", INFO)
+            session.add_pattern_view("view", "(i:CustomerInfo)--(c:Customer)")
+            assert session.run_cypher(OLDEST).fetchall() == [("cid", 40)]
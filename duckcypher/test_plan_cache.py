@@ -0,0 +1,139 @@
+from duckcypher.constants import (
+    EVICTIONS,
+    HITS,
+    INVALIDATIONS,
+    MISSES,
+    MODELS,
+    SIZE,
+    TABLES,
+)
+from duckcypher.parser import normalize_cypher, run_cypher
+import duckcypher.parser as parser
+from duckcypher.plan_cache import PlanCache
+import duckcypher.schema as schema
+
+
+def _person_schema(table_name):
+    s = {TABLES: [], MODELS: []}
+    schema.add_csv_table(s, table_name, "data/persons.csv")
+    schema.add_model(
+        s,
+        "Person",
+        table_name,
+        {
+            "columns": [
+                {"name": "id", "type": "int", "primary": True},
+                {"name": "name", "type": "string"},
+                {"name": "age", "type": "int"},
+            ]
+        },
+    )
+    return s
+
+
+class TestNormalize:
+    def test_whitespace_and_keywords(self):
+        assert normalize_cypher(
+            "MATCH  (p:Person)\n   RETURN p.name"
+        ) == normalize_cypher("match (p:Person) return p.name")
+
+    def test_string_literals_are_kept(self):
+        assert normalize_cypher('match (p {name: "A  b"}) return p') != normalize_cypher(
+            'match (p {name: "a b"}) return p'
+        )
+
+    def test_identifiers_keep_case(self):
+        assert normalize_cypher("match (p:Person) return p") != normalize_cypher(
+            "match (p:person) return p"
+        )
+
+    def test_later_keywords_fold(self):
+        assert normalize_cypher(
+            'EXPLAIN CALL algo.wcc("ROAD") YIELD c RETURN c.node'
+        ) == normalize_cypher('explain call algo.wcc("ROAD") yield c return c.node')
+        assert normalize_cypher(
+            "MATCH p = SHORTESTPATH((a:A)-[:R*]->(b:A)) RETURN b.id"
+        ) == normalize_cypher("match p = shortestpath((a:A)-[:R*]->(b:A)) return b.id")
+
+    def test_keyword_like_names_keep_case(self):
+        # only words lexed as keywords fold, not aliases, variables or labels.
+        for first, second in [
+            ("return p.name as Count", "return p.name as count"),
+            ("MATCH (Match:Person) RETURN Match.name", "match (match:Person) return match.name"),
+            ("match (p:Limit) return p", "match (p:limit) return p"),
+        ]:
+            assert normalize_cypher(first) != normalize_cypher(second)
+
+    def test_repeated_text_is_not_parsed(self, monkeypatch):
+        query = "MATCH (p:Person) WHERE p.age > 30 RETURN p.name AS Name"
+        key = normalize_cypher(query)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("parsed")
+
+        monkeypatch.setattr(parser._DuckCypherGrammar, "parse_interactive", fail)
+        assert normalize_cypher(query) == key
+        assert normalize_cypher(query.replace(" WHERE", "\n    WHERE")) == key
+
+
+class TestPlanCache:
+    def setup_class(cls):
+        cls.schema = _person_schema("plan_cache_persons")
+
+    def test_hit_on_normalized_query(self):
+        cache = PlanCache()
+        first = run_cypher(
+            self.schema, "match (p:Person) where p.age > 40 return p.name", cache=cache
+        ).fetchall()
+        second = run_cypher(
+            self.schema, "MATCH (p:Person)\n WHERE p.age > 40\n RETURN p.name", cache=cache
+        ).fetchall()
+        assert first == second
+        stats = cache.stats()
+        assert stats[HITS] == 1
+        assert stats[MISSES] == 1
+        assert stats[SIZE] == 1
+
+    def test_lru_eviction(self):
+        cache = PlanCache(maxsize=2)
+        for query in [
+            "match (p:Person) return p.name",
+            "match (p:Person) return p.age",
+            "match (p:Person) return p.id",
+            "match (p:Person) return p.name",
+        ]:
+            run_cypher(self.schema, query, cache=cache)
+        stats = cache.stats()
+        assert stats[EVICTIONS] == 2
+        assert stats[MISSES] == 4
+        assert stats[SIZE] == 2
+
+    def test_schema_change_misses(self):
+        s = _person_schema("plan_cache_persons_versioned")
+        cache = PlanCache()
+        query = "match (p:Person) return p.name"
+        run_cypher(s, query, cache=cache)
+        schema.add_model(
+            s,
+            "Person",
+            "plan_cache_persons_versioned",
+            {"columns": [{"name": "name", "type": "string", "primary": True}]},
+        )
+        run_cypher(s, query, cache=cache)
+        assert cache.stats()[MISSES] == 2
+
+    def test_alias_case_is_kept(self):
+        cache = PlanCache()
+        for alias in ["Count", "count", "COUNT"]:
+            res = run_cypher(
+                self.schema, f"match (p:Person) return p.name as {alias}", cache=cache
+            )
+            assert [column[0] for column in res.description] == [alias]
+        assert cache.stats()[MISSES] == 3
+
+    def test_invalidate(self):
+        cache = PlanCache()
+        run_cypher(self.schema, "match (p:Person) return p.name", cache=cache)
+        cache.invalidate()
+        assert len(cache) == 0
+        assert cache.stats()[INVALIDATIONS] == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from duckcypher.session import DuckCypherSession
+
+
+class TestRelationshipModels:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        for table in ["persons", "states", "lives_in"]:
+            cls.session.add_table_from_csv(table, f"data/{table}.csv")
+        cls.session.add_model(
+            "Person",
+            "persons",
+            {
+                "columns": [
+                    {"name": "id", "type": "int", "primary": True},
+                    {"name": "name", "type": "string"},
+                    {"name": "age", "type": "int"},
+                ]
+            },
+        )
+        cls.session.add_model(
+            "State",
+            "states",
+            {
+                "columns": [
+                    {"name": "name", "type": "string", "primary": True},
+                    {"name": "short_name", "type": "string"},
+                ]
+            },
+        )
+        cls.session.add_relationship_model(
+            "LIVES_IN", "lives_in", "id", "state", from_model="Person", to_model="State"
+        )
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _rows(self, query):
+        return sorted(self.session.run_cypher(query).fetchall())
+
+    def test_typed_edge_joins_through_link_table(self):
+        assert self._rows(
+            'match (p:Person {name: "Mary Anderson"})-[:LIVES_IN]->(s:State) return s.short_name'
+        ) == [("TX",)]
+        sql = self.session.compile_cypher(
+            "match (p:Person)-[r:LIVES_IN]->(s:State) return s.short_name"
+        )[0]["sql"]
+        assert '"p"."id"="r"."id"' in sql
+        assert '"r"."state"="s"."name"' in sql
+
+    def test_incoming_edge(self):
+        assert self._rows(
+            'match (s:State {short_name: "OR"})<-[:LIVES_IN]-(p:Person) return p.name'
+        ) == [("John Smith",)]
+
+    def test_undirected_edge_is_oriented_by_models(self):
+        assert self._rows(
+            'match (s:State {short_name: "OR"})-[:LIVES_IN]-(p:Person) return p.name'
+        ) == [("John Smith",)]
+
+    def test_untyped_edge_uses_unique_relationship(self):
+        assert self._rows(
+            'match (p:Person)--(s:State) where p.age > 45 return p.name, s.short_name'
+        ) == [("Robert Brown", "WY"), ("Samantha Clark", "NE"), ("Sarah Johnson", "TN")]
+
+    def test_unknown_relationship(self):
+        with pytest.raises(ValueError):
+            self.session.run_cypher("match (p:Person)-[:WORKS_AT]->(s:State) return p.name")
+
+    def test_unknown_model(self):
+        with pytest.raises(ValueError):
+            self.session.add_relationship_model(
+                "WORKS_AT", "lives_in", "id", "state", from_model="Company"
+            )
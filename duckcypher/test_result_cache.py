@@ -0,0 +1,128 @@
+import os
+import shutil
+
+import pyarrow as pa
+import pytest
+
+from duckcypher.constants import (
+    BYTES,
+    EVICTIONS,
+    HITS,
+    MISSES,
+    PHASE,
+    SIZE,
+)
+from duckcypher.result_cache import ResultCache
+from duckcypher.session import DuckCypherSession
+from duckcypher.tracing import EXECUTE, RecordingTracer
+
+NUMBER = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "parity", "type": "int"},
+    ]
+}
+PERSON = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+        {"name": "age", "type": "int"},
+    ]
+}
+COUNT = "match (n:Number) where n.parity = $parity return count(n)"
+
+
+def _number_session(tracer=None):
+    session = DuckCypherSession(result_cache_bytes=1 << 20, tracer=tracer)
+    session.connection.execute(
+        "create table numbers as select range as id, range % 2 as parity from range(10)"
+    )
+    session.add_table("numbers")
+    session.add_model("Number", "numbers", NUMBER)
+    return session
+
+
+def _count(session, parity=0):
+    return session.run_cypher(COUNT, {"parity": parity}).fetchall()[0][0]
+
+
+class TestResultCache:
+    def test_disabled_by_default(self):
+        with DuckCypherSession() as session:
+            assert session.result_cache is None
+            assert session.result_cache_stats() is None
+
+    def test_hit_skips_duckdb(self):
+        tracer = RecordingTracer()
+        with _number_session(tracer) as session:
+            assert _count(session) == 5
+            executed = len([s for s in tracer.spans if s[PHASE] == EXECUTE])
+            assert _count(session) == 5
+            assert len([s for s in tracer.spans if s[PHASE] == EXECUTE]) == executed
+            # other parameter values are other results.
+            assert _count(session, 1) == 5
+            assert session.result_cache_stats()[HITS] == 1
+            assert session.result_cache_stats()[MISSES] == 2
+
+    def test_append_and_touch(self):
+        with _number_session() as session:
+            assert _count(session) == 5
+            session.append("numbers", pa.table({"parity": [0], "id": [10]}))
+            assert _count(session) == 6
+            # writes behind the session's back need a touch.
+            session.connection.execute("insert into numbers values (12, 0)")
+            assert _count(session) == 6
+            session.touch("numbers")
+            assert _count(session) == 7
+
+    def test_reregistration(self):
+        with _number_session() as session:
+            session.add_table_from_variable(
+                "numbers", pa.table({"id": [1, 2], "parity": [0, 0]})
+            )
+            assert _count(session) == 2
+            session.add_table_from_variable(
+                "numbers", pa.table({"id": [1], "parity": [0]})
+            )
+            assert _count(session) == 1
+
+    def test_csv_view_follows_the_file(self, tmp_path):
+        csv_path = str(tmp_path / "persons.csv")
+        shutil.copy("data/persons.csv", csv_path)
+        with DuckCypherSession(result_cache_bytes=1 << 20) as session:
+            session.add_table_from_csv("persons", csv_path)
+            session.add_model("Person", "persons", PERSON)
+            query = "match (p:Person) return count(p)"
+            assert session.run_cypher(query).fetchall() == [(10,)]
+            with open(csv_path, "a") as f:
+                f.write("11,New Person,50,Texas\n")
+            stat = os.stat(csv_path)
+            os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert session.run_cypher(query).fetchall() == [(11,)]
+
+    def test_arrow_paths_share_the_cache(self):
+        with _number_session() as session:
+            session.run_cypher_batch([(COUNT, {"parity": 0})])
+            assert session.run_cypher(COUNT, {"parity": 0}).fetchall() == [(5,)]
+            assert session.result_cache_stats()[HITS] == 1
+
+    def test_memory_cap(self):
+        table = pa.table({"id": list(range(100))})
+        cache = ResultCache(table.nbytes * 2)
+        cache.put("a", table)
+        cache.put("b", table)
+        assert cache.get("a") is table
+        cache.put("c", table)
+        # b was the least recently used.
+        assert cache.get("b") is None
+        stats = cache.stats()
+        assert stats[SIZE] == 2
+        assert stats[EVICTIONS] == 1
+        assert stats[BYTES] == table.nbytes * 2
+        # results larger than the cap are not kept.
+        cache.put("d", pa.table({"id": list(range(1000))}))
+        assert cache.get("d") is None
+
+    def test_rejects_empty_cap(self):
+        with pytest.raises(ValueError):
+            ResultCache(0)
@@ -0,0 +1,281 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+from duckcypher.constants import (
+    ERROR,
+    EXECUTE_SECONDS,
+    NAME,
+    RESULT,
+    TABLE,
+    TABLES,
+    TRANSLATE_SECONDS,
+)
+from duckcypher.session import DuckCypherSession
+
+PERSON = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "name", "type": "string"},
+        {"name": "age", "type": "int"},
+    ]
+}
+
+
+def _person_session():
+    session = DuckCypherSession()
+    session.add_table_from_csv("persons", "data/persons.csv")
+    session.add_model("Person", "persons", PERSON)
+    return session
+
+
+def _person_session_at(database):
+    session = DuckCypherSession(database)
+    session.add_table_from_csv("persons", "data/persons.csv", ingest=TABLE)
+    session.add_model("Person", "persons", PERSON)
+    return session
+
+
+class TestSession:
+    def test_sessions_are_independent(self):
+        with _person_session() as first, DuckCypherSession() as second:
+            second.add_table_from_variable(
+                "persons",
+                duckdb.sql("select 1 as id, 'Solo' as name, 99 as age"),
+            )
+            second.add_model("Person", "persons", PERSON)
+            query = "match (p:Person) return count(p)"
+            assert first.run_cypher(query).fetchall() == [(10,)]
+            assert second.run_cypher(query).fetchall() == [(1,)]
+            assert first.show_tables() == [("persons",)]
+
+    def test_concurrent_queries(self):
+        with _person_session() as session:
+            query = "match (p:Person) where p.age > $age return count(p)"
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                counts = list(
+                    pool.map(
+                        lambda age: session.run_cypher(query, {"age": age}).fetchall()[0][0],
+                        [0, 30, 40, 50] * 8,
+                    )
+                )
+            assert counts == [10, 7, 5, 1] * 8
+
+    def test_registered_variables_visible_from_other_threads(self):
+        with DuckCypherSession() as session:
+            session.add_table_from_variable(
+                "ages", duckdb.sql("select range as id, range * 10 as age from range(5)")
+            )
+            session.add_model(
+                "Age",
+                "ages",
+                {"columns": [{"name": "id", "primary": True}, {"name": "age"}]},
+            )
+            query = "match (a:Age) where a.age >= 20 return count(a)"
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                assert pool.submit(
+                    lambda: session.run_cypher(query).fetchall()
+                ).result() == [(3,)]
+            assert session.run_cypher(query, materialize=True).fetchall() == [(3,)]
+
+
+class TestAsync:
+    def test_gather(self):
+        async def run(session):
+            query = "match (p:Person) where p.age > $age return count(p)"
+            tables = await asyncio.gather(
+                *[session.run_cypher_async(query, {"age": age}) for age in [0, 30, 40, 50]]
+            )
+            return [table.column(0)[0].as_py() for table in tables]
+
+        with _person_session() as session:
+            assert asyncio.run(run(session)) == [10, 7, 5, 1]
+
+    def test_several_event_loops(self):
+        async def run(session):
+            query = "match (p:Person) where p.age > $age return count(p)"
+            tables = await asyncio.gather(
+                *[session.run_cypher_async(query, {"age": age}) for age in range(0, 60, 5)]
+            )
+            return [table.column(0)[0].as_py() for table in tables]
+
+        with DuckCypherSession(async_workers=2) as session:
+            session.add_table_from_csv("persons", "data/persons.csv")
+            session.add_model("Person", "persons", PERSON)
+            first = asyncio.run(run(session))
+            assert asyncio.run(run(session)) == first
+            assert first[0] == 10 and first[-1] == 0
+
+    def test_cancel_interrupts_query(self):
+        async def run(session):
+            # a walk around a 20000 node cycle, far too long to finish here.
+            task = asyncio.create_task(
+                session.run_cypher_async(
+                    "match (a:Node)-[:NEXT*1..100000]->(b:Node) return count(b)"
+                )
+            )
+            await asyncio.sleep(0.2)
+            task.cancel()
+            start = time.perf_counter()
+            # the single worker only frees up once the query was interrupted.
+            table = await session.run_cypher_async("match (n:Node) return count(n)")
+            assert task.cancelled()
+            return table.column(0)[0].as_py(), time.perf_counter() - start
+
+        with DuckCypherSession(async_workers=1) as session:
+            session.connection.execute(
+                "create table nodes as "
+                "select range as id, (range + 1) % 20000 as next from range(20000)"
+            )
+            session.add_table("nodes")
+            session.add_model(
+                "Node",
+                "nodes",
+                {"columns": [{"name": "id", "primary": True}, {"name": "next"}]},
+            )
+            session.add_relationship_model("NEXT", "nodes", "id", "next")
+            count, seconds = asyncio.run(run(session))
+            assert count == 20000
+            assert seconds < 10
+
+    def test_cancel_after_completion(self):
+        interrupted = []
+
+        class Recording:
+            # the thread's cursor, with its interrupts recorded.
+            def __init__(self, cursor):
+                self._cursor = cursor
+
+            def interrupt(self):
+                interrupted.append(self._cursor)
+                self._cursor.interrupt()
+
+            def __getattr__(self, name):
+                return getattr(self._cursor, name)
+
+        async def run(session):
+            query = "match (p:Person) return count(p)"
+            task = asyncio.create_task(session.run_cypher_async(query))
+            await asyncio.sleep(0)
+            # the job finishes while the loop is blocked, before the task
+            # receives its result.
+            time.sleep(0.5)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            table = await session.run_cypher_async(query)
+            return table.column(0)[0].as_py()
+
+        with _person_session() as session:
+            cursor = session.cursor
+            session.cursor = lambda: Recording(cursor())
+            assert asyncio.run(run(session)) == 10
+            assert interrupted == []
+
+
+class TestBatch:
+    def test_input_order_duplicates_and_errors(self):
+        query = "match (p:Person) where p.age > $age return count(p)"
+        with _person_session() as session:
+            threads = session.cursor().execute(
+                "select current_setting('threads')"
+            ).fetchone()[0]
+            results = session.run_cypher_batch(
+                [
+                    (query, {"age": 40}),
+                    "match (p:Person) return count(p)",
+                    "match (p:Person return p",
+                    (query, {"age": 30}),
+                    (query, {"age": 40}),
+                    (query, {}),
+                ],
+                threads=2,
+            )
+            counts = [
+                r[RESULT].column(0)[0].as_py() if r[ERROR] is None else None
+                for r in results
+            ]
+            assert counts == [5, 10, None, 7, 5, None]
+            assert results[0][RESULT] is results[4][RESULT]
+            assert isinstance(results[5][ERROR], ValueError)
+            assert all(r[TRANSLATE_SECONDS] >= 0 for r in results)
+            assert results[1][EXECUTE_SECONDS] > 0
+            # the duckdb thread budget is restored afterwards.
+            assert session.cursor().execute(
+                "select current_setting('threads')"
+            ).fetchone()[0] == threads
+
+    def test_batches_do_not_overlap(self):
+        query = "match (p:Person) return count(p)"
+        with _person_session() as session:
+            threads = session.cursor().execute(
+                "select current_setting('threads')"
+            ).fetchone()[0]
+            execute, other, seen = session._execute_batch_entry, [], []
+
+            def first(entry):
+                if not other:
+                    other.append(
+                        threading.Thread(
+                            target=session.run_cypher_batch,
+                            args=([query],),
+                            kwargs={"threads": 4},
+                        )
+                    )
+                    other[0].start()
+                    other[0].join(0.5)
+                    # the second batch waits instead of changing the setting.
+                    seen.append(other[0].is_alive())
+                    seen.append(
+                        session.cursor().execute(
+                            "select current_setting('threads')"
+                        ).fetchone()[0]
+                    )
+                execute(entry)
+
+            session._execute_batch_entry = first
+            session.run_cypher_batch([query], threads=1)
+            other[0].join()
+            assert seen == [True, 1]
+            assert session.cursor().execute(
+                "select current_setting('threads')"
+            ).fetchone()[0] == threads
+
+
+class TestPersistence:
+    def test_catalog_survives_reopen(self, tmp_path):
+        database = str(tmp_path / "graph.duckdb")
+        with _person_session_at(database) as session:
+            session.add_table_from_variable("scratch", pa.table({"id": [1]}))
+            session.add_table_from_variable("ones", duckdb.sql("select 1 as id"))
+            models = session.show_models()
+        with DuckCypherSession(database) as session:
+            assert session.show_models() == models
+            # registered variables do not outlive their connection, views do.
+            assert [t[NAME] for t in session.schema[TABLES]] == ["persons", "ones"]
+            assert session.run_cypher(
+                "match (p:Person) where p.age > 40 return count(p)"
+            ).fetchall() == [(5,)]
+
+    def test_added_tables_survive_reopen(self, tmp_path):
+        database = str(tmp_path / "graph.duckdb")
+        with DuckCypherSession(database) as session:
+            session.connection.execute("create table numbers as from range(3)")
+            session.add_table("numbers")
+            for missing in ["nothing", "numbers_view"]:
+                session.connection.execute(
+                    "create or replace view numbers_view as from numbers"
+                )
+                with pytest.raises(ValueError):
+                    session.add_table(missing)
+        with DuckCypherSession(database) as session:
+            assert [t[NAME] for t in session.schema[TABLES]] == ["numbers"]
+            session.append("numbers", pa.table({"range": [3]}))
+
+    def test_in_memory_sessions_store_nothing(self):
+        with _person_session() as session:
+            assert session.show_tables() == [("persons",)]
@@ -0,0 +1,88 @@
+import pyarrow as pa
+
+import duckcypher
+from duckcypher.session import DuckCypherSession
+
+NUMBER = {
+    "columns": [
+        {"name": "id", "type": "int", "primary": True},
+        {"name": "parity", "type": "int"},
+    ]
+}
+
+
+class TestStream:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        cls.session.connection.execute(
+            "create table numbers as "
+            "select range as id, range % 2 as parity from range(100000)"
+        )
+        cls.session.add_table("numbers")
+        cls.session.add_model("Number", "numbers", NUMBER)
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def test_batches_bounded_by_batch_size(self):
+        batches = list(
+            self.session.run_cypher_stream("match (n:Number) return n.id", 4096)
+        )
+        assert all(isinstance(batch, pa.RecordBatch) for batch in batches)
+        assert all(batch.num_rows <= 4096 for batch in batches)
+        assert sum(batch.num_rows for batch in batches) == 100000
+
+    def test_params(self):
+        stream = self.session.run_cypher_stream(
+            "match (n:Number) where n.parity = $parity return n.id",
+            1000,
+            params={"parity": 1},
+        )
+        ids = pa.Table.from_batches(list(stream)).column(0).to_pylist()
+        assert len(ids) == 50000
+        assert all(i % 2 == 1 for i in ids)
+
+    def test_early_close(self):
+        stream = self.session.run_cypher_stream("match (n:Number) return n.id", 100)
+        assert next(stream).num_rows <= 100
+        stream.close()
+        # the session keeps working after the stream was cancelled.
+        assert self.session.run_cypher(
+            "match (n:Number) return count(n)"
+        ).fetchall() == [(100000,)]
+
+    def test_materialized_plan(self):
+        query = """match (n:Number {id: 7})
+        with n
+        match (m:Number) where m.parity = n.parity and m.id < 10
+        return m.id order by m.id asc"""
+        batches = list(self.session.run_cypher_stream(query, 2, materialize=True))
+        assert pa.Table.from_batches(batches).column(0).to_pylist() == [1, 3, 5, 7, 9]
+
+
+class TestModuleStream:
+    def setup_class(cls):
+        ids = list(range(10000))
+        duckcypher.add_table_from_variable(
+            "stream_numbers", pa.table({"id": ids, "parity": [i % 2 for i in ids]})
+        )
+        duckcypher.add_model("StreamNumber", "stream_numbers", NUMBER)
+        duckcypher.add_table_from_csv("stream_persons", "data/persons.csv")
+        duckcypher.add_model(
+            "StreamPerson",
+            "stream_persons",
+            {"columns": [{"name": "id", "primary": True}, {"name": "name"}]},
+        )
+
+    def test_registered_tables(self):
+        stream = duckcypher.run_cypher_stream("match (n:StreamNumber) return n.id", 1000)
+        assert sum(batch.num_rows for batch in stream) == 10000
+
+    def test_early_close(self):
+        stream = duckcypher.run_cypher_stream("match (p:StreamPerson) return p.name", 1)
+        assert next(stream).num_rows == 1
+        stream.close()
+        # the default connection was not interrupted.
+        assert duckcypher.run_cypher(
+            "match (p:StreamPerson) return count(p)"
+        ).fetchall() == [(10,)]
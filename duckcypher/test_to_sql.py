@@ -0,0 +1,80 @@
+from duckcypher.constants import MODELS, SOURCE, SQL, TABLES
+from duckcypher.parser import compile_cypher, run_cypher
+import duckcypher.schema as schema
+
+
+def _persons_schema(prefix):
+    s = {TABLES: [], MODELS: []}
+    schema.add_csv_table(s, f"{prefix}_persons", "data/persons.csv")
+    schema.add_csv_table(s, f"{prefix}_states", "data/states.csv")
+    schema.add_model(
+        s,
+        "Person",
+        f"{prefix}_persons",
+        {
+            "columns": [
+                {"name": "id", "type": "int", "primary": True},
+                {"name": "name", "type": "string"},
+                {"name": "age", "type": "int"},
+            ]
+        },
+    )
+    schema.add_model(
+        s,
+        "Home",
+        f"{prefix}_persons",
+        {"columns": [{"name": "state", "type": "string", "primary": True}]},
+    )
+    schema.add_model(
+        s,
+        "State",
+        f"{prefix}_states",
+        {
+            "columns": [
+                {"name": "name", "type": "string", "primary": True},
+                {"name": "short_name", "type": "string"},
+            ]
+        },
+    )
+    return s
+
+
+class TestWithPipeline:
+    def setup_class(cls):
+        cls.schema = _persons_schema("pipeline")
+        cls.queries = [
+            """match (p:Person {name: "Mary Anderson"})
+            with p
+            match (q:Person) where q.age > p.age
+            return q.name order by q.name asc""",
+            """match (p:Person {name: "Mary Anderson"})
+            with p.age as mary_age
+            match (q:Person) -- (h:Home) -- (s:State)
+            where q.age > mary_age and s.short_name <> "WY"
+            return q.name, s.short_name order by q.name asc""",
+            """match (p:Person {name: "Mary Anderson"})
+            with p.age as mary_age
+            match (q:Person {name: "John Smith"}) where q.age < mary_age
+            with q
+            match (r:Person) where r.age > q.age
+            return count(r)""",
+        ]
+
+    def test_single_statement_with_ctes(self):
+        plan = compile_cypher(self.schema, self.queries[2], cache=None)
+        assert len(plan) == 1
+        assert plan[0][SOURCE] is None
+        assert plan[0][SQL].startswith("WITH _dc_stage_0 AS")
+        assert "_dc_stage_1 AS" in plan[0][SQL]
+
+    def test_materialize_fallback(self):
+        plan = compile_cypher(self.schema, self.queries[2], cache=None, materialize=True)
+        assert len(plan) == 3
+        assert all(stage[SOURCE] for stage in plan[1:])
+
+    def test_same_results_as_materialized(self):
+        for query in self.queries:
+            assert (
+                run_cypher(self.schema, query).fetchall()
+                == run_cypher(self.schema, query, materialize=True).fetchall()
+            )
@@ -0,0 +1,100 @@
+import asyncio
+
+from duckcypher.constants import BYTES, PHASE, ROWS, SECONDS, STAGE
+from duckcypher.parser import compile_cypher
+from duckcypher.session import DuckCypherSession
+from duckcypher.test_to_sql import _persons_schema
+from duckcypher.tracing import (
+    EXECUTE,
+    FETCH,
+    PARSE,
+    REGISTER,
+    TRANSFORM,
+    TRANSLATE,
+    NullTracer,
+    RecordingTracer,
+    Tracer,
+    get_tracer,
+    set_tracer,
+)
+
+
+class TestTracing:
+    def setup_class(cls):
+        cls.tracer = RecordingTracer()
+        cls.session = DuckCypherSession(tracer=cls.tracer)
+        cls.session.add_table_from_csv("persons", "data/persons.csv")
+        cls.session.add_model(
+            "Person",
+            "persons",
+            {
+                "columns": [
+                    {"name": "id", "type": "int", "primary": True},
+                    {"name": "name", "type": "string"},
+                    {"name": "age", "type": "int"},
+                ]
+            },
+        )
+        cls.query = """match (p:Person {name: "Mary Anderson"})
+        with p.age as mary_age
+        match (q:Person) where q.age > mary_age
+        return q.name"""
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def setup_method(self):
+        self.tracer.spans.clear()
+
+    def test_materialized_stages(self):
+        asyncio.run(self.session.run_cypher_async(self.query, materialize=True))
+        phases = [(span[PHASE], span.get(STAGE)) for span in self.tracer.spans]
+        assert phases == [
+            (PARSE, None),
+            (TRANSFORM, None),
+            (TRANSLATE, None),
+            (EXECUTE, 0),
+            (REGISTER, 1),
+            (EXECUTE, 1),
+            (FETCH, None),
+        ]
+        assert all(span[SECONDS] >= 0 for span in self.tracer.spans)
+        execute, register, fetch = (
+            self.tracer.spans[3],
+            self.tracer.spans[4],
+            self.tracer.spans[6],
+        )
+        assert execute[ROWS] == register[ROWS] == 1
+        assert execute[BYTES] == register[BYTES] > 0
+        assert fetch[ROWS] == 6
+
+    def test_single_stage_execution_is_timed(self):
+        query = "match (p:Person) where p.age > 30 return p.name"
+        assert len(self.session.run_cypher(query).fetchall()) == 7
+        execute, fetch = [
+            span for span in self.tracer.spans if span[PHASE] in (EXECUTE, FETCH)
+        ]
+        assert execute[PHASE] == EXECUTE and fetch[PHASE] == FETCH
+        assert execute[ROWS] == fetch[ROWS] == 7
+        assert execute[SECONDS] + fetch[SECONDS] > 0
+
+    def test_cached_plan_skips_translation(self):
+        self.session.compile_cypher(self.query)
+        self.tracer.spans.clear()
+        self.session.compile_cypher(self.query)
+        assert self.tracer.spans == []
+
+    def test_stream(self):
+        list(self.session.run_cypher_stream(self.query, 1))
+        fetch = [span for span in self.tracer.spans if span[PHASE] == FETCH]
+        assert fetch[0][ROWS] == 6
+
+    def test_process_wide_tracer(self):
+        spans = []
+        previous = set_tracer(Tracer(spans.append))
+        try:
+            compile_cypher(_persons_schema("tracing"), self.query, cache=None)
+        finally:
+            set_tracer(previous)
+        assert [span[PHASE] for span in spans] == [PARSE, TRANSFORM, TRANSLATE]
+        assert isinstance(get_tracer(), NullTracer)
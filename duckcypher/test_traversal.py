@@ -0,0 +1,139 @@
+import pyarrow as pa
+import pytest
+
+from duckcypher.session import DuckCypherSession
+
+
+class TestVariableLength:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        cls.session.add_table_from_csv("employees", "data/employees.csv")
+        cls.session.add_model(
+            "Employee",
+            "employees",
+            {
+                "columns": [
+                    {"name": "id", "field": "employee_id", "primary": True},
+                    {"name": "name"},
+                    {"name": "manager"},
+                ]
+            },
+        )
+        cls.session.add_relationship_model(
+            "REPORTS_TO", "employees", "employee_id", "manager"
+        )
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _names(self, query):
+        return sorted(row[0] for row in self.session.run_cypher(query).fetchall())
+
+    def test_bounded_hops(self):
+        assert self._names(
+            'match (e:Employee {name: "Mike Brown"})-[:REPORTS_TO*1..5]->(m:Employee) return m.name'
+        ) == ["Bob Johnson", "John Smith"]
+        assert self._names(
+            'match (e:Employee {name: "Mike Brown"})-[:REPORTS_TO*1]->(m:Employee) return m.name'
+        ) == ["Bob Johnson"]
+
+    def test_exact_hops_anchored_on_right(self):
+        assert self._names(
+            'match (e:Employee)-[:REPORTS_TO*2]->(m:Employee {name: "John Smith"}) return e.name'
+        ) == ["Alice Green", "Mary Jones", "Mike Brown", "Tom Davis"]
+
+    def test_incoming(self):
+        assert self._names(
+            'match (m:Employee {name: "Jane Doe"})<-[:REPORTS_TO*1..3]-(e:Employee) return e.name'
+        ) == ["Mary Jones", "Tom Davis"]
+
+    def test_zero_hops(self):
+        assert self._names(
+            'match (e:Employee {name: "Jane Doe"})-[r*0..1]->(m:Employee) return m.name'
+        ) == ["Jane Doe", "John Smith"]
+
+    def test_one_row_per_pair(self):
+        res = self.session.run_cypher(
+            "match (e:Employee)-[:REPORTS_TO*1..9]-(m:Employee) return count(m)"
+        ).fetchall()
+        # undirected reachability in a connected 7 node tree, self pairs included.
+        assert res == [(49,)]
+
+    def test_unknown_relationship(self):
+        with pytest.raises(ValueError):
+            self.session.run_cypher(
+                "match (e:Employee)-[:MANAGES*1..2]->(m:Employee) return m.name"
+            )
+
+
+class TestShortestPath:
+    def setup_class(cls):
+        cls.session = DuckCypherSession()
+        # a diamond 1 -> {2, 3} -> 4, then a chain 4 -> 5 -> 6, and 7 on its own.
+        cls.session.add_table_from_variable(
+            "places", pa.table({"id": [1, 2, 3, 4, 5, 6, 7]})
+        )
+        cls.session.add_table_from_variable(
+            "roads",
+            pa.table({"src": [1, 1, 2, 3, 4, 5], "dst": [2, 3, 4, 4, 5, 6]}),
+        )
+        cls.session.add_model(
+            "Place", "places", {"columns": [{"name": "id", "primary": True}]}
+        )
+        cls.session.add_relationship_model(
+            "ROAD", "roads", "src", "dst", from_model="Place", to_model="Place"
+        )
+
+    def teardown_class(cls):
+        cls.session.close()
+
+    def _rows(self, query, params=None):
+        return sorted(self.session.run_cypher(query, params).fetchall())
+
+    def test_shortest_path(self):
+        assert self._rows(
+            "match p = shortestPath((a:Place {id: 1})-[:ROAD*..5]->(b:Place {id: 6})) "
+            "return p.length"
+        ) == [(4,)]
+
+    def test_all_shortest_paths(self):
+        assert self._rows(
+            "match p = allShortestPaths((a:Place {id: 1})-[:ROAD*]->(b:Place {id: 5})) "
+            "return p.nodes"
+        ) == [([1, 2, 4, 5],), ([1, 3, 4, 5],)]
+
+    def test_bounded(self):
+        assert self._rows(
+            "match p = shortestPath((a:Place {id: 1})-[:ROAD*..3]->(b:Place {id: 6})) "
+            "return p.length"
+        ) == []
+
+    def test_direction(self):
+        assert self._rows(
+            "match p = shortestPath((a:Place {id: 6})-[:ROAD*]->(b:Place {id: 1})) "
+            "return p.length"
+        ) == []
+        assert self._rows(
+            "match p = shortestPath((a:Place {id: 6})-[:ROAD*]-(b:Place {id: 1})) "
+            "return p.nodes"
+        ) in ([([6, 5, 4, 2, 1],)], [([6, 5, 4, 3, 1],)])
+
+    def test_one_end_anchored(self):
+        # every place reachable from 4, and every place reaching 4.
+        assert self._rows(
+            "match p = shortestPath((a:Place {id: 4})-[:ROAD*]->(b:Place)) "
+            "return b.id, p.length"
+        ) == [(5, 1), (6, 2)]
+        assert self._rows(
+            "match p = allShortestPaths((a:Place)-[:ROAD*0..]->(b:Place {id: $id})) "
+            "where p.length < 2 return a.id",
+            {"id": 4},
+        ) == [(2,), (3,), (4,)]
+
+    def test_unbounded_needs_shortest_path(self):
+        with pytest.raises(ValueError):
+            self.session.run_cypher("match (a:Place)-[:ROAD*]->(b:Place) return b.id")
+        with pytest.raises(ValueError):
+            self.session.run_cypher(
+                "match p = shortestPath((a:Place)-[:ROAD*]->(b:Place)) return b.id"
+            )
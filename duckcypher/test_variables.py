@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+from duckcypher.constants import NAME, TABLES, TYPE
+from duckcypher.session import DuckCypherSession
+
+NUMBER = {"columns": [{"name": "id", "type": "int", "primary": True}]}
+QUERY = "match (n:Number) where n.id > 1 return count(n)"
+
+
+def _count(session, var):
+    session.add_table_from_variable("numbers", var)
+    session.add_model("Number", "numbers", NUMBER)
+    return session.run_cypher(QUERY).fetchall()[0][0]
+
+
+class TestVariables:
+    def _assert_scanned_in_place(self, sources):
+        for source in sources:
+            with DuckCypherSession() as session:
+                assert _count(session, source) == 2
+                assert session.schema[TABLES][-1][TYPE] == "duckdb_variable"
+
+    def test_arrow(self):
+        table = pa.table({"id": [1, 2, 3]})
+        self._assert_scanned_in_place([table, ds.dataset(table)])
+
+    def test_pandas(self):
+        pd = pytest.importorskip("pandas")
+        self._assert_scanned_in_place([pd.DataFrame({"id": [1, 2, 3]})])
+
+    def test_polars(self):
+        pl = pytest.importorskip("polars")
+        frame = pl.DataFrame({"id": [1, 2, 3]})
+        self._assert_scanned_in_place([frame, frame.lazy()])
+
+    def test_relation_stays_lazy(self):
+        with DuckCypherSession() as session:
+            session.connection.execute("create table raw as select 1 as id")
+            relation = session.connection.sql("select id from raw")
+            assert _count(session, relation) == 0
+            assert session.schema[TABLES][-1] == {NAME: "numbers", TYPE: "duckdb_view"}
+            # the view reads the table at query time.
+            session.connection.execute("insert into raw values (2), (3)")
+            assert session.run_cypher(QUERY).fetchall() == [(2,)]
+
+    def test_relation_of_another_connection_is_copied(self):
+        other = duckdb.connect()
+        other.execute("create table only_here as select range as id from range(1, 4)")
+        with DuckCypherSession() as session:
+            assert _count(session, other.sql("select id from only_here")) == 2
+            assert session.schema[TABLES][-1][TYPE] == "duckdb_variable"
+        other.close()
+
+    def test_view_replaces_registration_on_every_cursor(self):
+        with DuckCypherSession() as session:
+            assert _count(session, pa.table({"id": [1, 2, 3]})) == 2
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                count = lambda: session.run_cypher(QUERY).fetchall()[0][0]
+                assert pool.submit(count).result() == 2
+                session.add_table_from_variable(
+                    "numbers", duckdb.sql("select range as id from range(10)")
+                )
+                assert count() == 8
+                assert pool.submit(count).result() == 8
+
+    def test_rejects_unknown(self):
+        with DuckCypherSession() as session:
+            with pytest.raises(ValueError):
+                session.add_table_from_variable("numbers", [1, 2, 3])
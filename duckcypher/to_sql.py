@@ -1,40 +1,112 @@
-import random
-import string
-from tkinter import CURRENT
+from collections import OrderedDict
+import hashlib
+import json
+import weakref
 import toolz as tz
 import duckdb
 from duckcypher.constants import (
     ALIAS,
     AND,
+    ARGS,
+    BYTES,
+    CALL,
     COLUMN,
+    COLUMNS,
+    CURRENT,
     DIRECTION,
+    EDGE,
+    EDGES,
     ENTITY_ID,
     ENTITY_TYPES,
+    FIELDS,
     FILTERS,
+    FROM,
+    FROM_MODEL,
+    INCOMING,
+    INDEX,
+    LENGTH,
     LIMIT,
     MATCH,
+    MAX_HOP,
+    MIN_HOP,
+    MODE,
+    NAME,
+    NODE,
+    NODES,
+    NODE_TABLES,
     NODE_TYPE,
     OP,
+    OPERATORS,
     OR,
     ORDER_BY,
+    OUTGOING,
+    PARAM,
+    PARAMS,
+    PATH,
+    PATH_ALIAS,
+    PATTERN,
+    PATTERNS,
+    PATTERN_VIEWS,
+    PLAN,
+    PROCEDURE,
+    PROFILE,
+    QUERIES,
     QUERY,
-    RESULT,
+    RELATIONSHIP,
     RETURN,
     RETURN_ALIASES,
+    ROWS,
+    SEARCH,
+    SEARCHES,
+    SHORTEST,
+    SOURCE,
+    SOURCES,
     SQL,
+    STAGE,
     TABLE,
+    TABLES,
+    TARGETS,
+    TO,
+    TO_MODEL,
     TYPE,
+    UNDIRECTED,
     WHERE,
 )
-from pypika import Field, Table, Query, functions as fn, Order
+from pypika import Field, Parameter, Table, Query, functions as fn, Order
 
 from duckcypher.schema import (
+    adjacency_index,
     find_join_fields,
     get_all_fields,
+    get_catalog,
     get_field,
     primary_field,
+    relationship,
+    relationships_between,
     table_name,
 )
+from duckcypher.explain import condition_text, conditions, edge_pattern, node_pattern
+from duckcypher.intermediates import Registrations, placeholders
+import duckcypher.adjacency as adjacency
+import duckcypher.algorithms as algorithms
+import duckcypher.explain as explain
+import duckcypher.shortest_paths as shortest_paths
+from duckcypher.tracing import (
+    EXECUTE,
+    FETCH,
+    REGISTER,
+    SEARCH as SEARCH_PHASE,
+    NullTracer,
+    get_tracer,
+)
+from duckcypher.traversal import (
+    DST,
+    SRC,
+    RawSubquery,
+    edges_sql,
+    quote,
+    variable_length_sql,
+)
 
 
 def _aggregate_op_to_fn(op):
@@ -55,34 +127,49 @@ def _aggregate_op_to_fn(op):
 
 
 def _split_query(query_list):
+    # a stage starts at each CALL, and at each MATCH that does not follow one.
     queries = []
     for q in query_list:
-        if q[TYPE] == MATCH:
+        if q[TYPE] == CALL or (
+            q[TYPE] == MATCH and not (queries and list(queries[-1]) == [CALL])
+        ):
             queries.append({})
-        queries[-1].update({q[TYPE]: q[q[TYPE]]})
-    return queries
+        queries[-1].update({k: v for k, v in q.items() if k != TYPE})
+    return [{MATCH: [], EDGES: [], **query} for query in queries]
 
 
-def _process_single_query(schema, query, previous_result):
+def _compile_single_query(schema, query, previous_stage, source, params, names):
+    # returns the stage and its unrendered query, previous results are read from `source`.
+    # `names` gives the placeholders of the results its searches register.
     previous_table = None
-    if previous_result:
-        table_alias = shortuuid()
-        duckdb.register(table_alias, previous_result[RESULT].fetch_arrow_table())
-        table = Table(table_alias)
+    if previous_stage:
         previous_table = {
-            TABLE: table,
-            ENTITY_TYPES: previous_result[ENTITY_TYPES],
+            TABLE: Table(source),
+            ENTITY_TYPES: previous_stage[ENTITY_TYPES],
             CURRENT: False,
             RETURN_ALIASES: list(
                 tz.thread_last(
-                    previous_result[QUERY][RETURN],
+                    previous_stage[QUERY][RETURN],
                     (filter, lambda ret: ret.get(ALIAS) is not None),
                     (map, lambda ret: ret[ALIAS]),
                 )
             ),
         }
 
-    sql = _process_match_query(
+    searches, edges = _searches(schema, query, names)
+    call_table = None
+    if query.get(CALL):
+        search = _procedure_search(schema, query[CALL], names)
+        searches.append(search)
+        alias = query[CALL][ALIAS]
+        call_table = {
+            CURRENT: True,
+            TABLE: Table(search[NAME]).as_(alias),
+            EDGE: None,
+            ENTITY_TYPES: {alias: search[PROCEDURE]},
+            CALL: search,
+        }
+    q = _process_match_query(
         schema,
         query[MATCH],
         query.get(WHERE),
@@ -90,32 +177,471 @@ def _process_single_query(schema, query, previous_result):
         query.get(LIMIT),
         query.get(ORDER_BY),
         previous_table,
+        params,
+        edges,
+        call_table,
     )
 
-    return {
-        SQL: sql,  # this is for debugging purposes
-        RESULT: duckdb.sql(sql),
+    stage = {
+        SQL: q.get_sql(),
+        PARAMS: params,
+        SOURCE: source if previous_stage else None,
+        QUERY: query,
+        SEARCHES: searches,
         ENTITY_TYPES: {
-            **(previous_result[ENTITY_TYPES] if previous_result else {}),
+            **(previous_stage[ENTITY_TYPES] if previous_stage else {}),
             **{entity[ALIAS]: entity[TYPE] for entity in query[MATCH]},
+            **(call_table[ENTITY_TYPES] if call_table else {}),
         },
     }
+    return stage, q
+
+
+def _anchor(schema, entity):
+    # the sql returning the ids an end of a shortestPath starts from, with the
+    # names of its parameters. None without property filters.
+    names = []
+    sql = _anchor_sql(schema, entity, names)
+    return None if sql is None else (sql, names)
+
+
+def _searches(schema, query, names):
+    # the searches a stage runs before its sql: one per shortestPath of the
+    # query, and one per variable length edge over a relationship with an
+    # adjacency index. returns them with a copy of the query's edges, where
+    # each searched edge has the placeholder its result is registered under.
+    searches = []
+    match, edges = query[MATCH], [dict(edge) for edge in query.get(EDGES) or []]
+    for left, edge, right in zip(match, edges, match[1:]):
+        if edge.get(SHORTEST):
+            if edge[MIN_HOP] is None or edge[MIN_HOP] > 1:
+                raise ValueError(
+                    "shortestPath needs a variable length edge from 0 or 1 hops"
+                )
+            if not (left[TYPE] and right[TYPE]):
+                raise ValueError("shortestPath needs typed nodes on both ends")
+        elif not (_is_variable_length(edge) and left[TYPE] and right[TYPE]):
+            continue
+        rel = _edge_relationship(schema, edge, left[TYPE], right[TYPE])
+        index = adjacency_index(schema, rel[NAME]) if rel is not None else None
+        sources, targets = _anchor(schema, left), _anchor(schema, right)
+        if edge.get(SHORTEST):
+            if sources is None and targets is None:
+                raise ValueError(
+                    "shortestPath needs property filters on one end at least"
+                )
+        elif index is None or edge[MAX_HOP] is None:
+            # joined as a recursive cte, see _variable_length_paths.
+            continue
+        edge[NAME] = names()
+        searches.append(
+            {
+                NAME: edge[NAME],
+                SHORTEST: edge.get(SHORTEST),
+                RELATIONSHIP: rel,
+                INDEX: index,
+                DIRECTION: edge[DIRECTION],
+                MIN_HOP: edge[MIN_HOP],
+                MAX_HOP: edge[MAX_HOP],
+                SOURCES: sources,
+                TARGETS: targets,
+            }
+        )
+    return searches, edges
+
 
+def _procedure_search(schema, call, names):
+    # the procedure of a CALL, run before the stage's sql like a search. its
+    # first argument names the relationship it walks.
+    procedure, args = call[PROCEDURE], call[ARGS]
+    if procedure not in algorithms.PROCEDURES:
+        raise ValueError(
+            f"unknown procedure {procedure}, expected one of "
+            f"{sorted(algorithms.PROCEDURES)}"
+        )
+    options = algorithms.PROCEDURES[procedure][2]
+    if not args or not isinstance(args[0], str):
+        raise ValueError(f"{procedure} needs a relationship type first")
+    if len(args) - 1 > len(options):
+        raise ValueError(f"{procedure} takes a relationship type and {options}")
+    rel = relationship(schema, args[0])
+    # nodes of the models the relationship connects count even without edges.
+    node_tables = list(
+        dict.fromkeys(
+            (table_name(schema, model), primary_field(schema, model))
+            for model in (rel.get(FROM_MODEL), rel.get(TO_MODEL))
+            if model
+        )
+    )
+    return {
+        NAME: names(),
+        PROCEDURE: procedure,
+        SHORTEST: None,
+        RELATIONSHIP: rel,
+        INDEX: adjacency_index(schema, rel[NAME]),
+        ARGS: args[1:],
+        NODE_TABLES: node_tables,
+        PARAMS: [arg[PARAM] for arg in args[1:] if isinstance(arg, dict)],
+    }
 
-def process_query(schema, query_list):
+
+def _stage_name(i):
+    return f"_dc_stage_{i}"
+
+
+def compile_query(schema, query_list, materialize=False, mode=None):
+    # returns a plan, a list of stages each holding the generated sql.
+    # by default every match ... with stage becomes a cte of one single statement,
+    # materialize=True runs the stages one by one and registers each result instead.
+    # mode (EXPLAIN or PROFILE) makes the plan report on itself when executed.
     queries = _split_query(query_list)
-    query_results = []
-    for query in queries:
-        query_results.append(
+    names = placeholders()
+    if materialize:
+        plan = []
+        for query in queries:
+            stage, _q = _compile_single_query(
+                schema, query, plan[-1] if plan else None, names(), [], names
+            )
+            plan.append({**stage, QUERIES: [query]})
+    else:
+        params = []
+        stage, q = None, None
+        ctes, searches = [], []
+        for i, query in enumerate(queries):
+            if q is not None:
+                ctes.append((_stage_name(i - 1), q))
+            stage, q = _compile_single_query(
+                schema, query, stage, _stage_name(i - 1), params, names
+            )
+            searches += stage[SEARCHES]
+        for name, cte in ctes:
+            q = q.with_(cte, name)
+        plan = [
             {
-                **_process_single_query(
-                    schema, query, query_results[-1] if query_results else None
-                ),
-                QUERY: query,
+                **stage,
+                SQL: q.get_sql(),
+                SOURCE: None,
+                QUERIES: queries,
+                SEARCHES: searches,
             }
+        ]
+    plan = [{**stage, TABLES: _stage_tables(schema, stage)} for stage in plan]
+    if mode:
+        plan = [{**stage, PATTERNS: _stage_patterns(schema, stage)} for stage in plan]
+        plan[-1][MODE] = mode
+    return plan
+
+
+def _stage_tables(schema, stage):
+    # the tables a stage reads, results of earlier stages aside.
+    tables = set()
+    for query in stage[QUERIES]:
+        match, edges = query[MATCH], query.get(EDGES) or []
+        tables |= {
+            table_name(schema, entity[TYPE]) for entity in match if entity[TYPE]
+        }
+        for left, edge, right in zip(match, edges, match[1:]):
+            if left[TYPE] and right[TYPE]:
+                rel = _edge_relationship(schema, edge, left[TYPE], right[TYPE])
+                if rel is not None:
+                    tables.add(rel[TABLE])
+    for search in stage[SEARCHES]:
+        if search.get(PROCEDURE):
+            tables.add(search[RELATIONSHIP][TABLE])
+            tables |= {table for table, _key in search[NODE_TABLES]}
+    return sorted(tables)
+
+
+def _tables_of(schema, table):
+    # the table and, for csv backed views, the file the scan reads.
+    path = get_catalog(schema).tables.get(table, {}).get(PATH)
+    return {table, path} if path else {table}
+
+
+def _stage_patterns(schema, stage):
+    # the node, edge and where patterns of a stage with the tables and columns
+    # they touch, used to attribute duckdb operators back to the cypher query.
+    entity_types = stage[ENTITY_TYPES]
+    patterns = []
+    for query in stage[QUERIES]:
+        match, edges = query[MATCH], query.get(EDGES) or []
+        for entity in match:
+            tables, columns = set(), set()
+            if entity[TYPE]:
+                tables = _tables_of(schema, table_name(schema, entity[TYPE]))
+                columns = {
+                    get_field(schema, entity[TYPE], col)[1]
+                    for col in (entity[FILTERS] or {})
+                }
+            patterns.append(
+                {TYPE: NODE, PATTERN: node_pattern(entity), TABLES: tables, COLUMNS: columns}
+            )
+        for left, edge, right in zip(match, edges, match[1:]):
+            tables, columns = set(), set()
+            if left[TYPE] and right[TYPE]:
+                rel = _edge_relationship(schema, edge, left[TYPE], right[TYPE])
+                if rel is not None:
+                    tables = _tables_of(schema, rel[TABLE])
+                    columns = {
+                        primary_field(schema, left[TYPE]),
+                        rel[FROM],
+                        rel[TO],
+                        primary_field(schema, right[TYPE]),
+                        SRC,
+                        DST,
+                    }
+                elif left[TYPE] != right[TYPE]:
+                    columns = set(find_join_fields(schema, [left[TYPE]], [right[TYPE]]))
+            patterns.append(
+                {
+                    TYPE: EDGE,
+                    PATTERN: edge_pattern(left, edge, right),
+                    TABLES: tables,
+                    COLUMNS: columns,
+                }
+            )
+        if query.get(WHERE):
+            for condition in conditions(query[WHERE]):
+                tables, columns = set(), set()
+                for side in (condition[0], condition[2]):
+                    if not isinstance(side, str) or "." not in side:
+                        continue
+                    alias, col = side.split(".", 1)
+                    if entity_types.get(alias):
+                        tables |= _tables_of(
+                            schema, table_name(schema, entity_types[alias])
+                        )
+                        columns.add(get_field(schema, entity_types[alias], col)[1])
+                patterns.append(
+                    {
+                        TYPE: WHERE,
+                        PATTERN: condition_text(condition, entity_types),
+                        TABLES: tables,
+                        COLUMNS: columns,
+                    }
+                )
+    return patterns
+
+
+# names of the statements prepared on each connection, least recently used first.
+_prepared = weakref.WeakKeyDictionary()
+# statements kept prepared per connection, older ones are deallocated. plans
+# evicted from the plan cache or compiled for an older schema age out this way.
+MAX_PREPARED = 256
+
+
+def _prepare(con, sql, bindings):
+    # prepared once per distinct sql and connection, later calls only bind new values.
+    # EXECUTE takes no parameters, so the values are bound to connection variables
+    # and the returned EXECUTE statement reads them: its text is the same for every
+    # binding.
+    name = "duckcypher_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+    prepared = _prepared.setdefault(con, OrderedDict())
+    if name in prepared:
+        prepared.move_to_end(name)
+    else:
+        con.execute(f"PREPARE {name} AS {sql}")
+        prepared[name] = True
+        while len(prepared) > MAX_PREPARED:
+            oldest, _ = prepared.popitem(last=False)
+            con.execute(f"DEALLOCATE {oldest}")
+    args = []
+    for i, value in enumerate(bindings, 1):
+        con.execute(f"SET VARIABLE duckcypher_arg_{i} = ?", [value])
+        args.append(f"getvariable('duckcypher_arg_{i}')")
+    return f"EXECUTE {name}({', '.join(args)})"
+
+
+def _bind_params(names, params):
+    missing = [name for name in names if name not in (params or {})]
+    if missing:
+        raise ValueError(f"missing values for parameters: {missing}")
+    return [params[name] for name in names]
+
+
+def _stage_statement(con, stage, params, scope=None):
+    # the statement running the stage and the values it binds. sql reading
+    # intermediate results names them differently on every run, so it is not
+    # prepared.
+    sql = stage[SQL] if scope is None else scope.bind(stage[SQL])
+    if not stage[PARAMS]:
+        return sql, None
+    bindings = _bind_params(stage[PARAMS], params)
+    if sql != stage[SQL]:
+        return sql, bindings
+    return _prepare(con, sql, bindings), None
+
+
+def _run_searches(stage, params, con, tracer, scope, i, indexes):
+    # the searches of a stage, registered for its sql to join.
+    for search in stage[SEARCHES]:
+        with tracer.span(SEARCH_PHASE, {STAGE: i}) as span:
+            index = None
+            if search[INDEX] is not None:
+                index = adjacency.get_index(
+                    con, search[INDEX], search[RELATIONSHIP], indexes
+                )
+            if search.get(PROCEDURE):
+                paths = algorithms.run(con, search, params, index)
+            elif search[SHORTEST]:
+                paths = shortest_paths.search(con, search, params, index)
+            else:
+                paths = adjacency.reach(con, index, search, params)
+            span.set({ROWS: paths.num_rows, BYTES: paths.nbytes})
+        scope.register(search[NAME], paths)
+
+
+def _run_leading_stages(plan, params, con, tracer, scope, indexes=None):
+    # runs every stage but the last one, each result is materialized and registered
+    # in `scope` for the next stage, and released once that stage has run.
+    # returns the statement of the last stage.
+    table = None
+    for i, stage in enumerate(plan):
+        if stage[SOURCE]:
+            with tracer.span(
+                REGISTER, {STAGE: i, ROWS: table.num_rows, BYTES: table.nbytes}
+            ):
+                scope.register(stage[SOURCE], table)
+            table = None
+        _run_searches(stage, params, con, tracer, scope, i, indexes)
+        statement, bindings = _stage_statement(con, stage, params, scope)
+        if i < len(plan) - 1:
+            with tracer.span(EXECUTE, {STAGE: i}) as span:
+                table = con.sql(statement, params=bindings).fetch_arrow_table()
+                span.set({ROWS: table.num_rows, BYTES: table.nbytes})
+            if stage[SOURCE]:
+                scope.release(stage[SOURCE])
+    return statement, bindings
+
+
+def execute_plan(plan, params=None, con=duckdb, tracer=None, indexes=None):
+    # `indexes` keeps the adjacency indexes opened by searches, relationship name
+    # to index, see adjacency.get_index.
+    if plan[-1].get(MODE):
+        return explain_plan(plan, params, con, indexes)
+    tracer = get_tracer(tracer)
+    if len(plan) == 1 and not plan[0][SEARCHES]:
+        # the relation is lazy unless it runs a prepared statement. a tracer that
+        # records spans gets the query run and fetched inside the execute span,
+        # building the relation alone takes no time.
+        statement, _bindings = _stage_statement(con, plan[0], params)
+        if isinstance(tracer, NullTracer):
+            return con.sql(statement)
+        with tracer.span(EXECUTE, {STAGE: 0}) as span:
+            table = con.sql(statement).fetch_arrow_table()
+            span.set({ROWS: table.num_rows, BYTES: table.nbytes})
+        return arrow_relation(con, table)
+    # the last stage reads registered results, so it is fetched before the
+    # registrations are dropped and handed back as a relation over the table.
+    with Registrations(con) as scope:
+        statement, bindings = _run_leading_stages(
+            plan, params, con, tracer, scope, indexes
+        )
+        with tracer.span(EXECUTE, {STAGE: len(plan) - 1}) as span:
+            table = con.sql(statement, params=bindings).fetch_arrow_table()
+            span.set({ROWS: table.num_rows, BYTES: table.nbytes})
+    return arrow_relation(con, table)
+
+
+def arrow_relation(con, table):
+    # a relation over an arrow table. duckdb cannot scan an arrow table whose
+    # column names repeat (e.g. a.name and b.name), those are scanned by
+    # position and renamed back.
+    names = table.column_names
+    if len(set(names)) == len(names):
+        return con.from_arrow(table)
+    positional = table.rename_columns([f"_dc_{i}" for i in range(len(names))])
+    return con.from_arrow(positional).select(
+        ", ".join(f"_dc_{i} as {quote(name)}" for i, name in enumerate(names))
+    )
+
+
+def explain_plan(plan, params=None, con=duckdb, indexes=None):
+    # EXPLAIN reports duckdb's physical plan without running the query, PROFILE
+    # runs it under EXPLAIN ANALYZE. returns, per stage, its sql, duckdb's plan as
+    # text and its operators with row counts, timings and the cypher patterns they
+    # come from.
+    profile = plan[-1][MODE] == PROFILE
+    reports, result = [], None
+    with Registrations(con) as scope:
+        for i, stage in enumerate(plan):
+            if stage[SOURCE]:
+                scope.register(stage[SOURCE], result.fetch_arrow_table())
+            _run_searches(stage, params, con, NullTracer(), scope, i, indexes)
+            statement, bindings = _stage_statement(con, stage, params, scope)
+            if profile:
+                con.execute("set enable_profiling = 'no_output'")
+                try:
+                    text = con.execute(
+                        f"explain analyze {statement}", bindings
+                    ).fetchall()[0][1]
+                    tree = json.loads(con.get_profiling_information(format="json"))
+                finally:
+                    con.execute("reset enable_profiling")
+            else:
+                text = con.execute(f"explain {statement}", bindings).fetchall()[0][1]
+                tree = json.loads(
+                    con.execute(
+                        f"explain (format json) {statement}", bindings
+                    ).fetchall()[0][1]
+                )
+            reports.append(
+                {
+                    SQL: stage[SQL],
+                    PLAN: text,
+                    OPERATORS: explain.operators(tree, stage[PATTERNS]),
+                }
+            )
+            if i < len(plan) - 1:
+                # the next stage reads this one's result.
+                result = con.sql(statement, params=bindings)
+    return reports
+
+
+def _record_batch_reader(con, batch_size):
+    # to_arrow_reader replaces fetch_record_batch in newer duckdb releases.
+    if hasattr(con, "to_arrow_reader"):
+        return con.to_arrow_reader(batch_size)
+    return con.fetch_record_batch(batch_size)
+
+
+def stream_plan(
+    plan, batch_size, params=None, con=duckdb, tracer=None, indexes=None
+):
+    # yields the result of the plan as pyarrow record batches of at most batch_size
+    # rows. the last stage is executed, not wrapped in a relation (relations over
+    # EXECUTE materialize), so duckdb produces rows only as batches are pulled.
+    # earlier stages of a materialized plan still run to completion.
+    # closing the generator before the last batch interrupts the query on `con`, so
+    # streams get a cursor of their own.
+    if plan[-1].get(MODE):
+        raise ValueError("EXPLAIN and PROFILE queries cannot be streamed")
+    tracer = get_tracer(tracer)
+    # intermediate results stay registered until the stream ends or is closed.
+    with Registrations(con) as scope:
+        statement, bindings = _run_leading_stages(
+            plan, params, con, tracer, scope, indexes
         )
+        with tracer.span(EXECUTE, {STAGE: len(plan) - 1}):
+            con.execute(statement, bindings)
+        reader = _record_batch_reader(con, batch_size)
+        rows = size = 0
+        finished = False
+        try:
+            with tracer.span(FETCH, {STAGE: len(plan) - 1}) as span:
+                for batch in reader:
+                    rows, size = rows + batch.num_rows, size + batch.nbytes
+                    span.set({ROWS: rows, BYTES: size})
+                    yield batch
+            finished = True
+        finally:
+            reader.close()
+            if not finished:
+                con.interrupt()
+
 
-    return query_results[-1][RESULT]
+def process_query(schema, query_list, params=None, materialize=False, con=duckdb):
+    return execute_plan(compile_query(schema, query_list, materialize), params, con)
 
 
 def _split_entity_id(entity_id):
@@ -125,9 +651,6 @@ def _split_entity_id(entity_id):
         return tuple(entity_id.split("."))
 
 
-def shortuuid(k=4) -> str:
-    return "".join(random.choices(string.ascii_lowercase, k=k))
-
 def _process_single_match(schema, match, return_clause): 
     join_tables = []
     alias_to_node_types = dict(tz.thread_last(
@@ -138,27 +661,38 @@ def _process_single_match(schema, match, return_clause):
         ... 
         
 
+def _value(val, params):
+    # literals are inlined, {PARAM: name} becomes a positional placeholder.
+    if not (isinstance(val, dict) and PARAM in val):
+        return val
+    if val[PARAM] not in params:
+        params.append(val[PARAM])
+    return Parameter(f"${params.index(val[PARAM]) + 1}")
+
+
 def _process_match_query(
-    schema, match, where, return_clause, limit, order_by, previous_table
+    schema,
+    match,
+    where,
+    return_clause,
+    limit,
+    order_by,
+    previous_table,
+    params,
+    edges=None,
+    call_table=None,
 ):
-    join_tables = _find_join_tables(schema, match)
+    join_tables = []
+    if match:
+        join_tables = _use_pattern_views(
+            schema, _find_join_tables(schema, match, edges)
+        )
+    if call_table:
+        join_tables.append(call_table)
     if previous_table:
         join_tables.append(previous_table)
 
-    q = Query.from_(join_tables[0][TABLE])
-    for i, join_table in enumerate(join_tables[1:], start=1):
-        if not join_table[CURRENT]:
-            continue
-        left, right = find_join_fields(
-            schema,
-            list(join_tables[i - 1][ENTITY_TYPES].values()),
-            list(join_table[ENTITY_TYPES].values()),
-        )
-
-        q = q.join(join_table[TABLE]).on(
-            Field(left, table=join_tables[i - 1][TABLE])
-            == Field(right, table=join_table[TABLE])
-        )
+    q = _join(schema, join_tables, match, params)
     # handle node match exact match where conditions.
     for entity in match:
         entity_alias = entity[ALIAS]
@@ -168,10 +702,13 @@ def _process_match_query(
                 _ignored, field = get_field(
                     schema, target_join_table[ENTITY_TYPES][entity_alias], col
                 )
-                q = q.where(Field(field, table=target_join_table[TABLE]) == val)
+                q = q.where(
+                    _field(target_join_table, entity_alias, field)
+                    == _value(val, params)
+                )
     if where:
         # handle explicit where clause
-        q = q.where(_process_where(schema, join_tables, where))
+        q = q.where(_process_where(schema, join_tables, where, params))
     # handle return clause
     select_terms = []
     for ret in return_clause:
@@ -188,15 +725,15 @@ def _process_match_query(
         elif col == "*" and not op:
             select_terms += list(
                 tz.thread_last(
-                    get_all_fields(schema, target_table[ENTITY_TYPES][entity_alias]),
-                    (map, lambda x: Field(x, table=target_table[TABLE])),
+                    _get_all_fields(schema, target_table[ENTITY_TYPES][entity_alias]),
+                    (map, lambda x: _named_field(target_table, entity_alias, x)),
                 )
             )
         else:
-            _ignored, field = get_field(
+            _ignored, field = _get_field(
                 schema, target_table[ENTITY_TYPES][entity_alias], col
             )
-            sql_field = _aggregate_op_to_fn(op)(Field(field, table=target_table[TABLE]))
+            sql_field = _named_field(target_table, entity_alias, field, op)
             select_terms.append(
                 sql_field.as_(field_alias) if field_alias else sql_field
             )
@@ -211,11 +748,98 @@ def _process_match_query(
             order_by[DIRECTION],
         )
         target_table = _find_target_join_table(join_tables, entity_alias)
-        _ignored, field = get_field(
+        _ignored, field = _get_field(
             schema, target_table[ENTITY_TYPES][entity_alias], column
         )
-        q = q.orderby(Field(field, table=target_table[TABLE]), order=Order.asc if direction == "asc" else Order.desc)
-    return q.get_sql()
+        q = q.orderby(_field(target_table, entity_alias, field), order=Order.asc if direction == "asc" else Order.desc)
+    return q
+
+
+# the entity type of a shortestPath variable, its fields are the length of the
+# path and the ids of the nodes along it.
+_PATH = "_path"
+
+
+def _get_field(schema, entity_type, column):
+    if entity_type in algorithms.PROCEDURES:
+        # the rows a CALL yields.
+        if column not in algorithms.columns(entity_type):
+            raise ValueError(
+                f"{entity_type} yields {algorithms.columns(entity_type)}, not {column}"
+            )
+        return None, column
+    if entity_type != _PATH:
+        return get_field(schema, entity_type, column)
+    if column not in (LENGTH, NODES):
+        raise ValueError(f"a path has a {LENGTH} and {NODES}, not {column}")
+    return None, column
+
+
+def _get_all_fields(schema, entity_type):
+    if entity_type in algorithms.PROCEDURES:
+        return list(algorithms.columns(entity_type))
+    if entity_type == _PATH:
+        return [LENGTH, NODES]
+    return get_all_fields(schema, entity_type)
+
+
+def _join(schema, join_tables, match, params):
+    # the FROM clause: every current join table joined to the one before it.
+    q = Query.from_(join_tables[0][TABLE])
+    for i, join_table in enumerate(join_tables[1:], start=1):
+        if not join_table[CURRENT]:
+            continue
+        if join_table.get(CALL):
+            # related to the matched nodes by the where clause, if at all.
+            q = q.join(join_table[TABLE]).cross()
+            continue
+        if join_table.get(SEARCH) or join_tables[i - 1].get(SEARCH):
+            q = _join_path(schema, q, join_tables[i - 1], join_table)
+            continue
+        if join_table.get(EDGE):
+            q = _join_edge(schema, q, match, join_tables[i - 1], join_table, params)
+            continue
+        left, right = find_join_fields(
+            schema,
+            list(join_tables[i - 1][ENTITY_TYPES].values()),
+            list(join_table[ENTITY_TYPES].values()),
+        )
+        q = q.join(join_table[TABLE]).on(
+            _field(join_tables[i - 1], list(join_tables[i - 1][ENTITY_TYPES])[-1], left)
+            == _field(join_table, list(join_table[ENTITY_TYPES])[0], right)
+        )
+    return q
+
+
+def _join_path(schema, q, left_table, right_table):
+    # the paths of a shortestPath search sit between its two nodes, joined on
+    # their first and last node.
+    if right_table.get(SEARCH):
+        alias, entity_type = list(left_table[ENTITY_TYPES].items())[-1]
+        return q.join(right_table[TABLE]).on(
+            _field(left_table, alias, primary_field(schema, entity_type))
+            == Field(SRC, table=right_table[TABLE])
+        )
+    alias, entity_type = list(right_table[ENTITY_TYPES].items())[0]
+    return q.join(right_table[TABLE]).on(
+        Field(DST, table=left_table[TABLE])
+        == _field(right_table, alias, primary_field(schema, entity_type))
+    )
+
+
+def _field(join_table, alias, field):
+    # a field of the entity `alias` in its join table. in a pattern view every
+    # entity has its own copy of the fields, see _use_pattern_views.
+    columns = join_table.get(FIELDS, {}).get(alias)
+    return Field(columns[field] if columns else field, table=join_table[TABLE])
+
+
+def _named_field(join_table, alias, field, op=None):
+    # a returned field, named as it would be without a pattern view.
+    sql_field = _aggregate_op_to_fn(op)(_field(join_table, alias, field))
+    if alias not in join_table.get(FIELDS, {}):
+        return sql_field
+    return sql_field.as_(f"{op}({alias}.{field})" if op else field)
 
 
 def _find_target_join_table(join_tables, entity_alias):
@@ -227,13 +851,34 @@ def get_primary_field(schema, entity_type, table):
     return Field(id_field, table=table)
 
 
-def _find_join_tables(schema, entities):
+def _is_variable_length(edge):
+    return edge is not None and edge[MIN_HOP] is not None
+
+
+def _edge_relationship(schema, edge, left_entity_type, right_entity_type):
+    # the relationship an edge goes through, None when the nodes are joined on
+    # their primary fields instead.
+    if edge is None:
+        return None
+    if edge[TYPE] is not None or _is_variable_length(edge):
+        return relationship(schema, edge[TYPE])
+    # an untyped edge uses the relationship declared between the two models, if unique.
+    candidates = relationships_between(schema, left_entity_type, right_entity_type)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _find_join_tables(schema, entities, edges=None):
     # return a list [{table, aliases}]
+    edges = edges or []
     split_entities = [[entities[0]]]
+    split_edges = [None]
 
     # try merge adjacent sources backed by the same table.
-    for entity in entities[1:]:
-        if all(
+    for i, entity in enumerate(entities[1:]):
+        edge = edges[i] if i < len(edges) else None
+        if _edge_relationship(schema, edge, entities[i][TYPE], entity[TYPE]) is None:
+            edge = None
+        if edge is None and all(
             table_name(schema, entity[TYPE]) == table_name(schema, src[TYPE])
             and entity[TYPE] != src[TYPE]
             for src in split_entities[-1]
@@ -242,8 +887,23 @@ def _find_join_tables(schema, entities):
             split_entities[-1].append(entity)
         else:
             split_entities.append([entity])
+            # an edge with a relationship is joined through it, not on primary fields.
+            split_edges.append(edge)
     join_tables = []
-    for split in split_entities:
+    for split, edge in zip(split_entities, split_edges):
+        if edge is not None and edge.get(SHORTEST):
+            # the registered result of the search, see _searches.
+            alias = edge[PATH_ALIAS] or f"_{join_tables[-1][TABLE].alias}_path"
+            join_tables.append(
+                {
+                    CURRENT: True,
+                    TABLE: Table(edge[NAME]).as_(alias),
+                    EDGE: None,
+                    ENTITY_TYPES: {alias: _PATH},
+                    SEARCH: edge,
+                }
+            )
+            edge = None
         # each split entity group is backed by the same table.
         first_alias = split[0][ALIAS]
         first_entity_type = split[0][TYPE]
@@ -252,6 +912,7 @@ def _find_join_tables(schema, entities):
             {
                 CURRENT: True,
                 TABLE: table,
+                EDGE: edge,
                 ENTITY_TYPES: dict(
                     map(lambda entity: (entity[ALIAS], entity[TYPE]), split)
                 ),
@@ -260,37 +921,240 @@ def _find_join_tables(schema, entities):
     return join_tables
 
 
-def _process_where(schema, join_tables, where):
+def _edge_signature(schema, edge, left_entity_type, right_entity_type):
+    # the relationship an edge goes through and which way, None without one.
+    rel = _edge_relationship(schema, edge, left_entity_type, right_entity_type)
+    if rel is None:
+        return None
+    return (
+        rel[NAME],
+        _orientation(rel, edge[DIRECTION], left_entity_type, right_entity_type),
+        edge[MIN_HOP],
+        edge[MAX_HOP],
+    )
+
+
+def _signature(schema, join_tables):
+    # per join table, its entity types and how it is joined to the one before.
+    signature = []
+    for i, join_table in enumerate(join_tables):
+        edge = None
+        if i and join_table.get(EDGE):
+            edge = _edge_signature(
+                schema,
+                join_table[EDGE],
+                list(join_tables[i - 1][ENTITY_TYPES].values())[-1],
+                list(join_table[ENTITY_TYPES].values())[0],
+            )
+        signature.append((tuple(join_table[ENTITY_TYPES].values()), edge))
+    return signature
+
+
+def _view_column(position, field):
+    # the column of the entity at `position` of a pattern view holding `field`.
+    return f"e{position}_{field}"
+
+
+def _matches(signature, view_signature):
+    # the edge into the first join table is outside the pattern.
+    return (
+        signature[0][0] == view_signature[0][0]
+        and signature[1:] == view_signature[1:]
+    )
+
+
+def _use_pattern_views(schema, join_tables):
+    # every run of join tables matching a pattern view is read from the table
+    # the view is materialized in, instead of joining the tables again. each
+    # entity of the run keeps its alias, its fields map to the view's columns.
+    for view in schema.get(PATTERN_VIEWS, []):
+        view_signature = _signature(
+            schema, _find_join_tables(schema, view[MATCH], view[EDGES])
+        )
+        n = len(view_signature)
+        start = 0
+        while start + n <= len(join_tables):
+            run = join_tables[start : start + n]
+            if any(FIELDS in join_table for join_table in run) or not _matches(
+                _signature(schema, run), view_signature
+            ):
+                start += 1
+                continue
+            entity_types = {
+                alias: entity_type
+                for join_table in run
+                for alias, entity_type in join_table[ENTITY_TYPES].items()
+            }
+            fields = {
+                alias: {
+                    field: _view_column(position, field)
+                    for field in get_all_fields(schema, entity_type)
+                }
+                for position, (alias, entity_type) in enumerate(entity_types.items())
+            }
+            merged = {
+                CURRENT: True,
+                TABLE: Table(view[NAME]).as_(next(iter(entity_types))),
+                EDGE: run[0][EDGE],
+                ENTITY_TYPES: entity_types,
+                FIELDS: fields,
+            }
+            join_tables = join_tables[:start] + [merged] + join_tables[start + n :]
+            start += 1
+    return join_tables
+
+
+def pattern_view_sql(schema, view):
+    # every match of a pattern view, the fields of each entity in columns of
+    # their own.
+    join_tables = _find_join_tables(schema, view[MATCH], view[EDGES])
+    q = _join(schema, join_tables, view[MATCH], [])
+    terms = []
+    for position, entity in enumerate(view[MATCH]):
+        target = _find_target_join_table(join_tables, entity[ALIAS])
+        terms += [
+            Field(field, table=target[TABLE]).as_(_view_column(position, field))
+            for field in get_all_fields(schema, entity[TYPE])
+        ]
+    return q.select(*terms).get_sql()
+
+
+def pattern_view_tables(schema, view):
+    # how many times the view's join reads each table.
+    join_tables = _find_join_tables(schema, view[MATCH], view[EDGES])
+    counts = {}
+    for i, join_table in enumerate(join_tables):
+        tables = [table_name(schema, next(iter(join_table[ENTITY_TYPES].values())))]
+        if i and join_table.get(EDGE):
+            rel = _edge_relationship(
+                schema,
+                join_table[EDGE],
+                list(join_tables[i - 1][ENTITY_TYPES].values())[-1],
+                list(join_table[ENTITY_TYPES].values())[0],
+            )
+            if rel is not None:
+                tables.append(rel[TABLE])
+        for table in tables:
+            counts[table] = counts.get(table, 0) + 1
+    return counts
+
+
+def _anchor_sql(schema, entity, params):
+    # the ids of a node that has property filters, None when any node qualifies.
+    if not entity[FILTERS]:
+        return None
+    q = Query.from_(Table(table_name(schema, entity[TYPE]))).select(
+        Field(primary_field(schema, entity[TYPE]))
+    )
+    for col, val in entity[FILTERS].items():
+        _ignored, field = get_field(schema, entity[TYPE], col)
+        q = q.where(Field(field) == _value(val, params))
+    return q.get_sql()
+
+
+def _orientation(rel, direction, left_entity_type, right_entity_type):
+    # which way a fixed length edge goes, undirected edges are oriented by the
+    # models declared on the relationship when they tell.
+    if direction != UNDIRECTED:
+        return direction
+    ends = (rel.get(FROM_MODEL), rel.get(TO_MODEL))
+    if ends == (left_entity_type, right_entity_type) and ends[0] != ends[1]:
+        return OUTGOING
+    if ends == (right_entity_type, left_entity_type) and ends[0] != ends[1]:
+        return INCOMING
+    return UNDIRECTED
+
+
+def _join_edge(schema, q, match, left_table, right_table, params):
+    edge = right_table[EDGE]
+    # the edge connects the last node of the left group and the first of the right.
+    left_alias, left_type = list(left_table[ENTITY_TYPES].items())[-1]
+    right_alias, right_type = list(right_table[ENTITY_TYPES].items())[0]
+    if left_type is None or right_type is None:
+        raise ValueError("edges through relationships need typed nodes on both ends")
+    rel = _edge_relationship(schema, edge, left_type, right_type)
+    alias = edge[ALIAS] or f"_{left_alias}_{right_alias}"
+    if _is_variable_length(edge):
+        link, left_key, right_key = _variable_length_paths(
+            schema, match, rel, edge, alias, left_alias, right_alias, params
+        )
+    else:
+        orientation = _orientation(rel, edge[DIRECTION], left_type, right_type)
+        if orientation == OUTGOING:
+            link, left_key, right_key = Table(rel[TABLE]).as_(alias), rel[FROM], rel[TO]
+        elif orientation == INCOMING:
+            link, left_key, right_key = Table(rel[TABLE]).as_(alias), rel[TO], rel[FROM]
+        else:
+            # both directions of the link table, still a plain equi-join.
+            link = RawSubquery(edges_sql(rel, UNDIRECTED), alias)
+            left_key, right_key = SRC, DST
+    q = q.join(link).on(
+        _field(left_table, left_alias, primary_field(schema, left_type))
+        == Field(left_key, table=link)
+    )
+    return q.join(right_table[TABLE]).on(
+        Field(right_key, table=link)
+        == _field(right_table, right_alias, primary_field(schema, right_type))
+    )
+
+
+def _variable_length_paths(
+    schema, match, rel, edge, alias, left_alias, right_alias, params
+):
+    # returns the paths subquery and its columns matching the left and right node.
+    if edge.get(NAME):
+        # walked on the adjacency index, see _searches.
+        return Table(edge[NAME]).as_(alias), SRC, DST
+    if edge[MAX_HOP] is None:
+        raise ValueError(
+            "variable length edges without an upper bound need shortestPath"
+        )
+    entities = {entity[ALIAS]: entity for entity in match}
+    direction = edge[DIRECTION]
+    anchor = _anchor_sql(schema, entities[left_alias], params)
+    reverse = anchor is None and bool(entities[right_alias][FILTERS])
+    if reverse:
+        # only the right end is filtered, walk backwards from it instead.
+        anchor = _anchor_sql(schema, entities[right_alias], params)
+        direction = {OUTGOING: INCOMING, INCOMING: OUTGOING}.get(direction, direction)
+    paths = RawSubquery(
+        variable_length_sql(rel, direction, edge[MIN_HOP], edge[MAX_HOP], anchor),
+        alias,
+    )
+    return (paths, DST, SRC) if reverse else (paths, SRC, DST)
+
+
+def _process_where(schema, join_tables, where, params):
     if where is None:
         raise ValueError("where clause cannot be None")
 
     if where[0] == AND:
-        return _process_where(schema, join_tables, where[1]) & _process_where(
-            schema, join_tables, where[2]
+        return _process_where(schema, join_tables, where[1], params) & _process_where(
+            schema, join_tables, where[2], params
         )
     elif where[0] == OR:
-        return _process_where(schema, join_tables, where[1]) | _process_where(
-            schema, join_tables, where[2]
+        return _process_where(schema, join_tables, where[1], params) | _process_where(
+            schema, join_tables, where[2], params
         )
     else:
         # TODO: handle subquery is on the left hand side.
         entity_id, op, entity_id_or_value = where
         entity, col = entity_id.split(".")
         target = tz.first(filter(lambda t: entity in t[ENTITY_TYPES], join_tables))
-        left_field = Field(
-            get_field(schema, target[ENTITY_TYPES][entity], col)[1], table=target[TABLE]
+        left_field = _field(
+            target, entity, _get_field(schema, target[ENTITY_TYPES][entity], col)[1]
         )
         if isinstance(entity_id_or_value, str) and "." in entity_id_or_value:
             entity, col = entity_id_or_value.split(".")
             target = tz.first(filter(lambda t: entity in t[ENTITY_TYPES], join_tables))
-            field = get_field(schema, target[ENTITY_TYPES][entity], col)[1]
+            field = _get_field(schema, target[ENTITY_TYPES][entity], col)[1]
             table = None
             if not target[CURRENT]:
                 right_field = Query.from_(target[TABLE]).select(
                     Field(field, table=target[TABLE])
                 )
             else:
-                right_field = Field(field, table=target[TABLE])
+                right_field = _field(target, entity, field)
         elif isinstance(entity_id_or_value, str) and (
             join_table := _refers_to_previous_alias(entity_id_or_value, join_tables)
         ):
@@ -299,7 +1163,7 @@ def _process_where(schema, join_tables, where):
                 Field(entity_id_or_value, table=join_table[TABLE])
             )
         else:
-            right_field = entity_id_or_value
+            right_field = _value(entity_id_or_value, params)
         return _condition_op_to_fn(op)(left_field, right_field)
 
 
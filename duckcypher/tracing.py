@@ -0,0 +1,99 @@
+import time
+
+from duckcypher.constants import ERROR, PHASE, SECONDS
+
+# phases of the query pipeline, in order.
+PARSE = "parse"
+TRANSFORM = "transform"
+TRANSLATE = "translate"
+EXECUTE = "execute"
+REGISTER = "register"
+FETCH = "fetch"
+SEARCH = "search"
+
+
+class _Span:
+    __slots__ = ("_tracer", "_start", "record")
+
+    def __init__(self, tracer, phase, attributes):
+        self._tracer = tracer
+        self.record = {PHASE: phase, **attributes}
+
+    def set(self, attributes):
+        self.record.update(attributes)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record[SECONDS] = time.perf_counter() - self._start
+        # a generator closed early is not a failure.
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.record[ERROR] = exc
+        self._tracer.on_span(self.record)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    # receives one span per phase of the pipeline (and per WITH stage for
+    # execute, register and fetch), a dict holding PHASE, SECONDS and, where the
+    # phase knows them, STAGE, ROWS and BYTES. subclasses override on_span, or
+    # pass a callback.
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def span(self, phase, attributes=None):
+        return _Span(self, phase, attributes or {})
+
+    def on_span(self, span):
+        if self.callback is not None:
+            self.callback(span)
+
+
+class NullTracer(Tracer):
+    # the default, every span is the same inert object.
+    def span(self, phase, attributes=None):
+        return _NULL_SPAN
+
+
+class RecordingTracer(Tracer):
+    # keeps every span, mostly for tests and ad hoc measurements.
+    def __init__(self):
+        super().__init__()
+        self.spans = []
+
+    def on_span(self, span):
+        self.spans.append(span)
+
+
+_tracer = NullTracer()
+
+
+def get_tracer(tracer=None):
+    # the given tracer, or the process wide one when None.
+    return tracer if tracer is not None else _tracer
+
+
+def set_tracer(tracer):
+    # installs the process wide tracer, None restores the no-op one. returns the
+    # previous tracer.
+    global _tracer
+    previous, _tracer = _tracer, tracer if tracer is not None else NullTracer()
+    return previous
@@ -0,0 +1,81 @@
+from pypika.queries import Selectable
+from pypika.utils import format_alias_sql
+
+from duckcypher.constants import FROM, INCOMING, OUTGOING, TABLE, TO
+
+SRC = "src"
+DST = "dst"
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class RawSubquery(Selectable):
+    # lets hand written sql (e.g. recursive ctes, which pypika cannot build) be
+    # joined and referenced by Field like any other pypika table.
+    def __init__(self, sql, alias):
+        super().__init__(alias)
+        self.sql = sql
+
+    def get_sql(self, with_alias=False, subquery=False, quote_char='"', **kwargs):
+        sql = f"({self.sql})"
+        if with_alias:
+            return format_alias_sql(sql, self.alias, quote_char=quote_char, **kwargs)
+        return sql
+
+
+def edges_sql(relationship, direction):
+    # every edge as a (src, dst) pair in the traversal direction.
+    table, from_key, to_key = (
+        quote(relationship[TABLE]),
+        quote(relationship[FROM]),
+        quote(relationship[TO]),
+    )
+    forward = (
+        f"select {from_key} as {SRC}, {to_key} as {DST} from {table} "
+        f"where {from_key} is not null and {to_key} is not null"
+    )
+    backward = (
+        f"select {to_key} as {SRC}, {from_key} as {DST} from {table} "
+        f"where {from_key} is not null and {to_key} is not null"
+    )
+    if direction == OUTGOING:
+        return forward
+    if direction == INCOMING:
+        return backward
+    return f"{forward} union {backward}"
+
+
+# pairs (src, dst) connected by a walk of min_hop..max_hop edges, one row per pair.
+# the walk is expanded level by level in a recursive cte: `union` keeps every level's
+# frontier a set of distinct (src, dst) so dense graphs do not multiply duplicate
+# walks, and the recursion stops at max_hop. `anchor_sql`, a query returning the
+# candidate start ids, restricts the first level.
+def variable_length_sql(relationship, direction, min_hop, max_hop, anchor_sql=None):
+    edges = edges_sql(relationship, direction)
+    anchor = f" where {SRC} in ({anchor_sql})" if anchor_sql else ""
+    sql = (
+        f"with recursive _dc_edges as ({edges}), "
+        f"_dc_hops({SRC}, {DST}, depth) as ("
+        f"select {SRC}, {DST}, 1 from _dc_edges{anchor} "
+        f"union "
+        f"select _dc_hops.{SRC}, _dc_edges.{DST}, _dc_hops.depth + 1 from _dc_hops "
+        f"join _dc_edges on _dc_edges.{SRC} = _dc_hops.{DST} "
+        f"where _dc_hops.depth < {max_hop}"
+        f") "
+    )
+    selects = []
+    if max_hop > 0:
+        selects.append(
+            f"select distinct {SRC}, {DST} from _dc_hops where depth >= {max(min_hop, 1)}"
+        )
+    if min_hop == 0:
+        # zero hops, every start node reaches itself.
+        starts = (
+            f"select * from ({anchor_sql}) anchor({SRC})"
+            if anchor_sql
+            else f"select {SRC} from _dc_edges union select {DST} from _dc_edges"
+        )
+        selects.append(f"select {SRC}, {SRC} as {DST} from ({starts}) starts")
+    return sql + " union ".join(selects)
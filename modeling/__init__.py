@@ -1,11 +1,16 @@
 from gettext import find
+import glob
+import hashlib
+import json
 import os
+import re
+import shutil
 import tempfile
+import uuid
+import weakref
 from typing import Dict
 import kuzu
 import duckdb
-import random
-import string
 import toolz as tz
 from duckcypher.constants import (
     DATA,
@@ -18,6 +23,7 @@ from duckcypher.constants import (
     NODES,
     PRIMARY,
     PROPERTIES,
+    SOURCES,
     TABLES,
     TO,
     TYPE,
@@ -25,6 +31,7 @@ from duckcypher.constants import (
 import logging
 import pyarrow.parquet as pq
 
+import duckcypher.csv_cache as csv_cache
 from duckcypher.schema import primary_field
 
 
@@ -32,33 +39,147 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 
-def _random_id(k=8):
-    return "".join(random.choices(string.ascii_letters, k=k))
-
-
 def _create_directory_if_not_exists(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
 
 TESTDB_ROOT = "./testdbs"
+# databases kept under TESTDB_ROOT, the least recently used beyond it are removed.
+MAX_DATABASES = int(os.environ.get("DUCKCYPHER_MAX_KUZU_DATABASES", 8))
+DATABASE_FILE = "graph.kuzu"
+MANIFEST_FILE = "manifest.json"
+
+# kuzu databases opened by this process, by path, so a reopen reuses them and a
+# rebuild can close them first.
+_databases = {}
+# connections handed out per database path, collect_garbage leaves a database
+# alone while any of them is still referenced.
+_connections = {}
+
+
+def schema_key(schema: Dict):
+    # hash of the nodes, edges and data mappings, names the database directory.
+    shape = {key: schema.get(key, []) for key in (NODES, EDGES, DATA)}
+    encoded = json.dumps(shape, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def _source_files(data_mappings):
+    # files named by a string literal in a duckdb command, globs expanded.
+    paths = set()
+    for mapping in data_mappings:
+        for command in mapping[DUCKDB]:
+            for literal in re.findall(r"'((?:[^']|'')*)'", command):
+                literal = literal.replace("''", "'")
+                paths.update(p for p in glob.glob(literal) if os.path.isfile(p))
+    return sorted(paths)
+
+
+def sources_key(schema: Dict):
+    # hash of the size and mtime of every file the data mappings read. data
+    # read from anything else is not tracked, pass rebuild=True after changing it.
+    prints = [csv_cache.fingerprint(path) for path in _source_files(schema.get(DATA, []))]
+    return hashlib.sha1(json.dumps(prints).encode()).hexdigest()[:16]
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    # written aside and renamed, a database without one is rebuilt.
+    pending = os.path.join(directory, f"{MANIFEST_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(pending, "w") as f:
+        json.dump(manifest, f)
+    os.replace(pending, os.path.join(directory, MANIFEST_FILE))
+
+
+def _close(path):
+    _connections.pop(path, None)
+    database = _databases.pop(path, None)
+    if database is not None:
+        database.close()
+
+
+def _connect(path):
+    conn = kuzu.Connection(_databases[path])
+    _connections.setdefault(path, weakref.WeakSet()).add(conn)
+    return conn
 
 
-def load_from_schema(schema: Dict):
-    # returns a kuzu connection
+def _in_use(path):
+    return len(_connections.get(os.path.join(path, DATABASE_FILE), ())) > 0
+
+
+def _remove(path):
+    _close(os.path.join(path, DATABASE_FILE))
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def collect_garbage(root=TESTDB_ROOT, max_databases=MAX_DATABASES, keep=()):
+    # removes all but the max_databases most recently used databases, by the
+    # mtime of their manifest. databases of the old testdb-<random> layout are
+    # never reused and go first. databases with connections still in use by this
+    # process are skipped. returns the removed paths.
+    entries = []
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if name.startswith("testdb-"):
+            entries.append((-1, path))
+        elif os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+            entries.append((os.stat(os.path.join(path, MANIFEST_FILE)).st_mtime_ns, path))
+    entries.sort(reverse=True)
+    kept = {os.path.abspath(path) for path in keep}
+    removed = []
+    for _used, path in entries[max_databases:]:
+        if os.path.abspath(path) not in kept and not _in_use(path):
+            _remove(path)
+            removed.append(path)
+    return removed
+
+
+def load_from_schema(
+    schema: Dict, root=TESTDB_ROOT, max_databases=MAX_DATABASES, rebuild=False
+):
+    # returns a kuzu connection. the database lives in a directory named after
+    # schema_key and is reopened as is while sources_key still matches, it is
+    # rebuilt in place otherwise. connections from an earlier call with the
+    # same schema are closed by a rebuild.
     nodes, edges, data = (
         schema[NODES],
         schema.get(EDGES, []),
         schema.get(DATA, []),
     )
-    # todo: reuse table?
-    # create testdbs folder if not exists
-    _create_directory_if_not_exists(TESTDB_ROOT)
-    db = kuzu.Database(os.path.join(TESTDB_ROOT, f"testdb-{_random_id()}"))
-    conn = kuzu.Connection(db)
-    _create_nodes(conn, nodes)
-    _create_edges(conn, edges)
-    _copy_data(conn, data)
+    directory = os.path.join(root, schema_key(schema))
+    path = os.path.join(directory, DATABASE_FILE)
+    manifest = {SOURCES: sources_key(schema)}
+    if rebuild or _read_manifest(directory) != manifest:
+        log.info(f"building kuzu database: {directory}")
+        _remove(directory)
+        _create_directory_if_not_exists(directory)
+        _databases[path] = kuzu.Database(path)
+        conn = _connect(path)
+        _create_nodes(conn, nodes)
+        _create_edges(conn, edges)
+        _copy_data(conn, data)
+        conn.execute("CHECKPOINT")
+        _write_manifest(directory, manifest)
+    else:
+        log.info(f"reusing kuzu database: {directory}")
+        if path not in _databases:
+            _databases[path] = kuzu.Database(path)
+        conn = _connect(path)
+        # marks it used for collect_garbage.
+        os.utime(os.path.join(directory, MANIFEST_FILE))
+    collect_garbage(root, max_databases, keep=[directory])
     return conn
 
 
@@ -68,7 +189,7 @@ def _copy_data(conn, data_mappings):
         with tempfile.NamedTemporaryFile(suffix=".parquet") as temp_file:
             for command in duckdb_commands[:-1]:
                 duckdb.execute(command)
-            final_result = duckdb.execute(duckdb_commands[-1]).arrow()
+            final_result = duckdb.execute(duckdb_commands[-1]).fetch_arrow_table()
             pq.write_table(final_result, temp_file.name)
             conn.execute(f"COPY {node_or_edge} FROM '{temp_file.name}'")
 
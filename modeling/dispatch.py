@@ -0,0 +1,249 @@
+import json
+
+from duckcypher.constants import (
+    AGGREGATES,
+    ALIAS,
+    CALL,
+    COLUMNS,
+    DUCKDB,
+    EDGES,
+    ENTITY_ID,
+    FROM_MODEL,
+    HOPS,
+    KUZU,
+    MATCH,
+    MAX_HOP,
+    MIN_HOP,
+    NAME,
+    NODES,
+    OP,
+    REASON,
+    RELATIONSHIPS,
+    RETURN,
+    ROUTE,
+    SHORTEST,
+    STAGES,
+    TO_MODEL,
+    TYPE,
+    VARIABLE_LENGTH,
+)
+from duckcypher.parser import _KEYWORDS, _DuckCypherGrammar, _DuckCypherTransformer
+from duckcypher.schema import adjacency_index, show_models
+
+# routes each query to kuzu or to duckdb by its shape. kuzu walks deep fixed
+# length patterns with its own joins, duckdb is better at shallow joins. results
+# come back as arrow either way, their schema metadata holds the routing
+# decision under ROUTE_METADATA.
+#
+# a query only goes to kuzu when both engines return the same rows for it. kuzu
+# expands a variable length edge into one row per walk where duckcypher returns
+# one row per pair of nodes it connects, so kuzu runs those queries with a
+# WITH DISTINCT over the variables of the pattern before the RETURN. that needs
+# every node and fixed length edge of the pattern named, and an upper bound on
+# every variable length edge (kuzu caps unbounded ones at 30 hops). every label
+# and relationship type of the query must also exist in the kuzu database with
+# the same properties and ends as in the session.
+
+ROUTE_METADATA = b"duckcypher.route"
+_RETURN = next(name for name, word in _KEYWORDS.items() if word == "return")
+
+
+def _parse(schema, cypher_query):
+    # the clauses of the query as _DuckCypherTransformer leaves them, and its
+    # EXPLAIN or PROFILE mode.
+    t = _DuckCypherTransformer(schema)
+    t.transform(_DuckCypherGrammar.parse(cypher_query))
+    return t._query, t._mode
+
+
+def _returns(clauses):
+    return [ret for clause in clauses if clause[TYPE] == RETURN for ret in clause[RETURN]]
+
+
+def _edges(clauses):
+    return [edge for clause in clauses if clause[TYPE] == MATCH for edge in clause[EDGES]]
+
+
+def _shape(clauses):
+    # hops counts variable length edges at their upper bound, None when one
+    # has none.
+    edges = _edges(clauses)
+    lengths = [1 if edge[MIN_HOP] is None else edge[MAX_HOP] for edge in edges]
+    hops = None if None in lengths else sum(lengths)
+    return {
+        HOPS: hops,
+        VARIABLE_LENGTH: any(edge[MIN_HOP] is not None for edge in edges),
+        AGGREGATES: sum(1 for ret in _returns(clauses) if ret.get(OP)),
+        STAGES: sum(1 for clause in clauses if clause[TYPE] == RETURN),
+    }
+
+
+def _duckdb_only(schema, clauses, mode):
+    # why the query cannot run on kuzu, None when it can.
+    if mode:
+        return "EXPLAIN and PROFILE report on duckdb plans"
+    if any(clause[TYPE] == CALL for clause in clauses):
+        return "CALL procedures run on duckdb"
+    edges = _edges(clauses)
+    if any(edge.get(SHORTEST) for edge in edges):
+        return "shortestPath runs on duckdb"
+    if sum(1 for clause in clauses if clause[TYPE] == RETURN) > 1:
+        return "multi stage queries chain duckdb results"
+    if any(
+        not ret.get(OP) and "." not in ret[ENTITY_ID] for ret in _returns(clauses)
+    ):
+        return "whole nodes are returned as duckdb columns"
+    if any(
+        edge[MIN_HOP] is not None and edge[TYPE] and adjacency_index(schema, edge[TYPE])
+        for edge in edges
+    ):
+        return "variable length edges over an adjacency index"
+    return None
+
+
+def _pattern_variables(clauses):
+    # the variables telling walks over the same nodes apart, None when a node or
+    # fixed length edge is anonymous.
+    variables = []
+    for clause in clauses:
+        if clause[TYPE] != MATCH:
+            continue
+        for node in clause[MATCH]:
+            variables.append(node[ALIAS])
+        for edge in clause[EDGES]:
+            if edge[MIN_HOP] is None:
+                variables.append(edge[ALIAS])
+    if None in variables:
+        return None
+    return list(dict.fromkeys(variables))
+
+
+def _kuzu_query(cypher_query, clauses):
+    # the query as kuzu runs it: with one row per pair of nodes its variable
+    # length edges connect, not one per walk.
+    if not _shape(clauses)[VARIABLE_LENGTH]:
+        return cypher_query
+    start = next(
+        token.start_pos
+        for token in _DuckCypherGrammar.parse_interactive(cypher_query).iter_parse()
+        if token.type == _RETURN
+    )
+    distinct = ", ".join(_pattern_variables(clauses))
+    return f"{cypher_query[:start]}WITH DISTINCT {distinct} {cypher_query[start:]}"
+
+
+def kuzu_tables(kuzu_connection):
+    # the node tables of a kuzu database with their properties, and the rel
+    # tables with the node tables they connect.
+    def rows(query):
+        return kuzu_connection.execute(query).get_as_arrow().to_pylist()
+
+    tables = {NODES: {}, RELATIONSHIPS: {}}
+    for table in rows("CALL show_tables() RETURN *"):
+        name = table["name"]
+        if table["type"] == "NODE":
+            properties = rows(f"CALL table_info('{name}') RETURN *")
+            tables[NODES][name] = {p["name"] for p in properties}
+        elif table["type"] == "REL":
+            ends = rows(f"CALL show_connection('{name}') RETURN *")
+            tables[RELATIONSHIPS][name] = {
+                (end["source table name"], end["destination table name"])
+                for end in ends
+            }
+    return tables
+
+
+def _unmirrored(schema, clauses, tables):
+    # why kuzu does not hold the graph the query reads, None when it does.
+    rels = {rel[NAME]: rel for rel in schema.get(RELATIONSHIPS, [])}
+    for clause in clauses:
+        if clause[TYPE] != MATCH:
+            continue
+        for node in clause[MATCH]:
+            models = show_models(schema, node[TYPE]) if node[TYPE] else []
+            if not models:
+                return "untyped or unknown nodes"
+            columns = {column[NAME] for column in models[0].get(COLUMNS, [])}
+            if not columns <= tables[NODES].get(node[TYPE], set()):
+                return f"{node[TYPE]} differs in kuzu"
+        for edge in clause[EDGES]:
+            rel = rels.get(edge[TYPE])
+            if rel is None:
+                return "untyped or unknown edges"
+            ends = (rel[FROM_MODEL], rel[TO_MODEL])
+            if ends not in tables[RELATIONSHIPS].get(edge[TYPE], set()):
+                return f"{edge[TYPE]} differs in kuzu"
+    return None
+
+
+def _decide(schema, clauses, mode, kuzu_hops, tables):
+    shape = _shape(clauses)
+    reason = _duckdb_only(schema, clauses, mode)
+    if reason is None and shape[VARIABLE_LENGTH]:
+        if shape[HOPS] is None:
+            reason = "kuzu caps unbounded variable length edges"
+        elif _pattern_variables(clauses) is None:
+            reason = "anonymous nodes or edges around variable length edges"
+    if reason is None and shape[HOPS] < kuzu_hops:
+        reason = "shallow join"
+    if reason is None:
+        reason = _unmirrored(schema, clauses, tables)
+    if reason is None:
+        return {**shape, ROUTE: KUZU, REASON: f"{shape[HOPS]} hops"}
+    return {**shape, ROUTE: DUCKDB, REASON: reason}
+
+
+def classify(schema, cypher_query, tables, kuzu_hops=3):
+    # the routing decision of a query: its shape, the backend and why. `tables`
+    # describes the kuzu database, see kuzu_tables.
+    return _decide(schema, *_parse(schema, cypher_query), kuzu_hops, tables)
+
+
+def _column_names(clauses):
+    # the returned columns named as written, the same whichever backend ran.
+    names = []
+    for ret in _returns(clauses):
+        expression = ret.get(ENTITY_ID, "*")
+        if ret.get(OP):
+            expression = f"{ret[OP]}({expression})"
+        names.append(ret.get(ALIAS) or expression)
+    return names
+
+
+def route_of(table):
+    # the routing decision recorded on a result of HybridDispatcher.run.
+    return json.loads(table.schema.metadata[ROUTE_METADATA])
+
+
+class HybridDispatcher:
+    # runs queries on a DuckCypherSession or on a kuzu connection over the same
+    # graph, e.g. one built by modeling.load_from_schema. queries with at least
+    # `kuzu_hops` hops, variable length edges counted at their upper bound, go
+    # to kuzu, see the top of the module.
+    def __init__(self, session, kuzu_connection, kuzu_hops=3):
+        self.session = session
+        self.kuzu = kuzu_connection
+        self.kuzu_hops = kuzu_hops
+        self.tables = kuzu_tables(kuzu_connection)
+
+    def classify(self, cypher_query):
+        return classify(self.session.schema, cypher_query, self.tables, self.kuzu_hops)
+
+    def run(self, cypher_query, params=None):
+        # returns the result as a pyarrow table.
+        clauses, mode = _parse(self.session.schema, cypher_query)
+        if mode:
+            raise ValueError("EXPLAIN and PROFILE reports run on the session")
+        decision = _decide(
+            self.session.schema, clauses, mode, self.kuzu_hops, self.tables
+        )
+        if decision[ROUTE] == KUZU:
+            table = self.kuzu.execute(
+                _kuzu_query(cypher_query, clauses), params or {}
+            ).get_as_arrow()
+        else:
+            table = self.session.run_cypher(cypher_query, params).fetch_arrow_table()
+        table = table.rename_columns(_column_names(clauses))
+        return table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), ROUTE_METADATA: json.dumps(decision)}
+        )
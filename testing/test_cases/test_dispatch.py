@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from modeling import load_from_schema
+from modeling.dispatch import HybridDispatcher, route_of
+from duckcypher.session import DuckCypherSession
+
+
+def _kuzu_schema(places, roads, properties=("id", "name")):
+    types = {"id": "int64", "name": "string"}
+    return {
+        "nodes": [
+            {
+                "name": "Place",
+                "properties": [
+                    {"name": name, "type": types[name], "primary": name == "id"}
+                    for name in properties
+                ],
+            }
+        ],
+        "edges": [{"name": "ROAD", "from": "Place", "to": "Place"}],
+        "data": [
+            {
+                "type": "Place",
+                "duckdb": [
+                    f"select {', '.join(properties)} from read_csv_auto('{places}')"
+                ],
+            },
+            {"type": "ROAD", "duckdb": [f"select src, dst from read_csv_auto('{roads}')"]},
+        ],
+    }
+
+
+# a diamond 1 -> {2, 3} -> 4, then a chain 4 -> 5 -> 6: two paths lead from 1
+# to each of 4, 5 and 6.
+DEEP = (
+    "match (a:Place {id: 1})-[:ROAD]->(b:Place)-[:ROAD]->(c:Place)-[:ROAD]->(d:Place) "
+    "return b.name, d.name as last"
+)
+REACHED = "match (a:Place {id: 1})-[:ROAD*1..4]->(d:Place) return d.name"
+# routed to kuzu, which must return the rows duckcypher returns for them.
+ON_KUZU = [
+    DEEP,
+    REACHED,
+    DEEP.replace("return b.name, d.name as last", "return count(d)"),
+    REACHED.replace("return d.name", "return count(d)"),
+    "match (a:Place)-[:ROAD*1..3]->(d:Place) return count(d)",
+    "match (a:Place {id: 1})-[:ROAD*1..2]->(d:Place)-[r:ROAD]->(e:Place) "
+    "return d.name, e.name",
+]
+
+
+def _rows(table):
+    # by position, session results may repeat a column name.
+    return sorted(zip(*(column.to_pylist() for column in table.columns)))
+
+
+class TestDispatch:
+    def setup_class(cls):
+        cls.directory = tempfile.mkdtemp()
+        places = os.path.join(cls.directory, "places.csv")
+        roads = os.path.join(cls.directory, "roads.csv")
+        with open(places, "w") as f:
+            f.write("id,name\n1,a\n2,b\n3,c\n4,d\n5,e\n6,f\n")
+        with open(roads, "w") as f:
+            f.write("src,dst\n1,2\n1,3\n2,4\n3,4\n4,5\n5,6\n")
+        cls.session = DuckCypherSession()
+        cls.session.add_table_from_csv("places", places)
+        cls.session.add_table_from_csv("roads", roads)
+        cls.session.add_model(
+            "Place",
+            "places",
+            {"columns": [{"name": "id", "primary": True}, {"name": "name"}]},
+        )
+        cls.session.add_relationship_model(
+            "ROAD", "roads", "src", "dst", "Place", "Place"
+        )
+        # kuzu databases go to a root of their own, collect_garbage prunes it.
+        cls.root = os.path.join(cls.directory, "dbs")
+        cls.kuzu_schema = _kuzu_schema(places, roads)
+        cls.dispatcher = HybridDispatcher(
+            cls.session, load_from_schema(cls.kuzu_schema, cls.root)
+        )
+        cls.places, cls.roads = places, roads
+
+    def teardown_class(cls):
+        cls.session.close()
+        shutil.rmtree(cls.directory)
+
+    def _route(self, query):
+        return self.dispatcher.classify(query)["route"]
+
+    def test_classify(self):
+        for query in ON_KUZU:
+            assert self._route(query) == "kuzu"
+        shallow = "match (a:Place)-[:ROAD]->(b:Place)-[:ROAD]->(c:Place) return c.name"
+        assert self._route(shallow) == "duckdb"
+        assert HybridDispatcher(
+            self.session, self.dispatcher.kuzu, kuzu_hops=2
+        ).classify(shallow)["route"] == "kuzu"
+
+    def test_duckdb_only(self):
+        for query in [
+            REACHED.replace("*1..4", "*"),
+            "match (a:Place {id: 1})-[:ROAD*1..4]->(:Place) return a.name",
+            'call algo.degree("ROAD") yield d return d.node, d.degree',
+            "match p = shortestPath((a:Place {id: 1})-[:ROAD*]->(b:Place {id: 6})) "
+            "return b.name",
+            DEEP.replace("return b.name, d.name as last", "return d"),
+        ]:
+            assert self._route(query) == "duckdb"
+
+    def test_same_results_on_either_route(self):
+        shallow = "match (a:Place)-[:ROAD]->(b:Place) return a.name, b.name"
+        for query, route in [(query, "kuzu") for query in ON_KUZU] + [
+            (shallow, "duckdb")
+        ]:
+            res = self.dispatcher.run(query)
+            assert route_of(res)["route"] == route
+            expected = self.session.run_cypher(query).fetch_arrow_table()
+            assert _rows(res) == _rows(expected)
+        res = self.dispatcher.run(DEEP)
+        assert res.column_names == ["b.name", "last"]
+        assert _rows(res) == [("b", "e"), ("c", "e")]
+        # kuzu walks 1 -> 4 twice, the dispatcher returns the pair once.
+        kuzu = self.dispatcher.kuzu.execute(REACHED).get_as_arrow()
+        assert kuzu.num_rows > self.dispatcher.run(REACHED).num_rows
+
+    def test_params(self):
+        res = self.dispatcher.run(DEEP.replace("{id: 1}", "{id: $start}"), {"start": 1})
+        assert route_of(res)["route"] == "kuzu"
+        assert _rows(res) == [("b", "e"), ("c", "e")]
+
+    def test_models_must_match(self):
+        conn = load_from_schema(
+            _kuzu_schema(self.places, self.roads, ("id",)), self.root
+        )
+        decision = HybridDispatcher(self.session, conn).classify(DEEP)
+        assert decision["route"] == "duckdb"
+        assert "Place" in decision["reason"]
+
+    def test_explain_rejected(self):
+        with pytest.raises(ValueError):
+            self.dispatcher.run("explain " + DEEP)
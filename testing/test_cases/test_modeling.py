@@ -1,6 +1,11 @@
+import json
+import os
+import subprocess
+import sys
 from typing import Dict
 import yaml
-from modeling import load_from_schema
+import modeling
+from modeling import load_from_schema, schema_key
 
 
 def _load_yaml(path: str) -> Dict:
@@ -59,3 +64,118 @@ class TestModeling:
             "match (e:Employee {name: 'Jane Doe' }) -[:REPORTS_TO]-> (m:Employee)  return m.name"
         ).get_as_df()
         assert res.iloc[0, 0] == "John Smith"
+
+
+def _people_schema(csv_path):
+    return {
+        "nodes": [
+            {
+                "name": "Person",
+                "properties": [
+                    {"name": "name", "primary": True, "type": "string"},
+                    {"name": "age", "type": "int64"},
+                ],
+            }
+        ],
+        "data": [
+            {
+                "type": "Person",
+                "duckdb": [f"select name, age from read_csv_auto('{csv_path}')"],
+            }
+        ],
+    }
+
+
+def _names(conn):
+    res = conn.execute("match (p:Person) return p.name order by p.name")
+    return res.get_as_df().iloc[:, 0].tolist()
+
+
+class TestDatabaseReuse:
+    def test_reopened_while_sources_match(self, tmp_path):
+        root, csv_path = str(tmp_path / "dbs"), str(tmp_path / "people.csv")
+        with open(csv_path, "w") as f:
+            f.write("name,age\nann,30\nbob,40\n")
+        schema = _people_schema(csv_path)
+        assert _names(load_from_schema(schema, root)) == ["ann", "bob"]
+        database = os.path.join(root, schema_key(schema), modeling.DATABASE_FILE)
+        built = os.stat(database).st_mtime_ns
+        # reopened, not reloaded: copying the rows twice would break the key.
+        assert _names(load_from_schema(schema, root)) == ["ann", "bob"]
+        assert os.stat(database).st_mtime_ns == built
+
+    def test_stale_rebuilt_in_place(self, tmp_path):
+        root, csv_path = str(tmp_path / "dbs"), str(tmp_path / "people.csv")
+        with open(csv_path, "w") as f:
+            f.write("name,age\nann,30\n")
+        schema = _people_schema(csv_path)
+        load_from_schema(schema, root)
+        with open(csv_path, "a") as f:
+            f.write("cy,50\n")
+        assert _names(load_from_schema(schema, root)) == ["ann", "cy"]
+        assert os.listdir(root) == [schema_key(schema)]
+
+    def test_reopened_across_processes(self, tmp_path):
+        # a process that did not build the database reads it from disk.
+        root, csv_path = str(tmp_path / "dbs"), str(tmp_path / "people.csv")
+        with open(csv_path, "w") as f:
+            f.write("name,age\nann,30\n")
+        schema = _people_schema(csv_path)
+        load_from_schema(schema, root)
+        database = os.path.join(root, schema_key(schema), modeling.DATABASE_FILE)
+        modeling._close(database)
+        script = (
+            "import json, sys\n"
+            "from modeling import load_from_schema\n"
+            "conn = load_from_schema(json.loads(sys.argv[1]), sys.argv[2])\n"
+            "res = conn.execute('match (p:Person) return p.name order by p.name')\n"
+            "print(json.dumps(res.get_as_df().iloc[:, 0].tolist()))\n"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        res = subprocess.run(
+            [sys.executable, "-c", script, json.dumps(schema), root],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        assert json.loads(res.stdout) == ["ann"]
+        # reopened, not rebuilt.
+        assert "reusing kuzu database" in res.stderr
+
+    def test_least_recently_used_collected(self, tmp_path):
+        root = str(tmp_path / "dbs")
+        os.makedirs(os.path.join(root, "testdb-legacy"))
+        schemas = []
+        for i in range(3):
+            csv_path = str(tmp_path / f"people{i}.csv")
+            with open(csv_path, "w") as f:
+                f.write(f"name,age\np{i},{i}\n")
+            schemas.append(_people_schema(csv_path))
+        for schema in schemas[:2]:
+            load_from_schema(schema, root, max_databases=2)
+        assert len(os.listdir(root)) == 2
+        # the first is used again after the second, the second goes.
+        manifest = os.path.join(root, schema_key(schemas[0]), modeling.MANIFEST_FILE)
+        os.utime(manifest, ns=(0, os.stat(manifest).st_mtime_ns + 10**9))
+        load_from_schema(schemas[2], root, max_databases=2)
+        assert sorted(os.listdir(root)) == sorted(
+            schema_key(schema) for schema in [schemas[0], schemas[2]]
+        )
+
+    def test_open_databases_kept(self, tmp_path):
+        root = str(tmp_path / "dbs")
+        schemas = []
+        for i in range(3):
+            csv_path = str(tmp_path / f"people{i}.csv")
+            with open(csv_path, "w") as f:
+                f.write(f"name,age\np{i},{i}\n")
+            schemas.append(_people_schema(csv_path))
+        first = load_from_schema(schemas[0], root, max_databases=1)
+        load_from_schema(schemas[1], root, max_databases=1)
+        # still referenced, so not collected.
+        assert _names(first) == ["p0"]
+        assert len(os.listdir(root)) == 2
+        del first
+        load_from_schema(schemas[2], root, max_databases=1)
+        assert os.listdir(root) == [schema_key(schemas[2])]